@@ -0,0 +1,123 @@
+from bisect import insort
+import json
+import os
+import threading
+
+
+class ArtifactIndex:
+    # Name of the manifest file kept in every indexed directory
+    MANIFEST = ".artifact_index.json"
+    # One shared index per directory, so DataHandler and BurndownChart never scan the same folder twice
+    _indexes = {}
+    _indexes_lock = threading.Lock()
+
+    def __init__(self, directory):
+        """
+        In-memory index of the files in a directory (the "Tasks ...", "Proposed ..." and "Progress ..." files),
+        sorted by creation time. The file times are persisted to a small manifest file, and the directory is
+        only listed again when its modification time changes (i.e. a file was created, deleted or renamed).
+
+        Parameters:
+            directory - the folder the files are saved in
+        """
+        self.directory = os.path.abspath(directory)
+        self.manifest = os.path.join(self.directory, self.MANIFEST)
+        # file name -> creation time
+        self.files = {}
+        # word -> sorted list of (creation time, file name) of the files containing that word
+        self._matches = {}
+        self._dir_mtime = None
+        # The index can be used from several threads (see 'DataHandler' async loaders)
+        self.lock = threading.RLock()
+        if os.path.exists(self.manifest):
+            with open(self.manifest) as f:
+                self.files = json.load(f)
+
+    @classmethod
+    def for_directory(cls, directory):
+        """Returns the shared index of a directory, creating it the first time"""
+        directory = os.path.abspath(directory)
+        with cls._indexes_lock:
+            if directory not in cls._indexes:
+                cls._indexes[directory] = cls(directory)
+            return cls._indexes[directory]
+
+    @staticmethod
+    def directory_of(path):
+        """Turns a search path such as 'C:\\Users\\owner\\project\\*' into the directory it looks in"""
+        directory = path.rstrip("*").rstrip("\\/")
+        return directory if directory else "."
+
+    def latest(self, first_word):
+        """
+        Gets the name of the most recently created file that has 'first_word' in its name
+
+        Returns:
+            str - file name, or None if there is no such file
+        """
+        with self.lock:
+            self.refresh()
+            if first_word not in self._matches:
+                # First lookup of this word, every later one is a dictionary access
+                self._matches[first_word] = sorted((t, name) for name, t in self.files.items() if first_word in name)
+            matches = self._matches[first_word]
+            return matches[-1][1] if matches else None
+
+    def refresh(self):
+        """Picks up files created, deleted or renamed since the last refresh. Only new files are stat'ed"""
+        with self.lock:
+            self._refresh()
+
+    def _refresh(self):
+        mtime = os.stat(self.directory).st_mtime_ns
+        if mtime == self._dir_mtime:
+            return
+        names = set(os.listdir(self.directory))
+        names.discard(self.MANIFEST)
+        changed = False
+        for name in set(self.files) - names:
+            self._remove(name)
+            changed = True
+        for name in names - set(self.files):
+            try:
+                ctime = os.stat(os.path.join(self.directory, name)).st_ctime
+            except FileNotFoundError:
+                # Deleted (or renamed, like the temporary files of 'write_snapshot') since the listing
+                continue
+            self._insert(name, ctime)
+            changed = True
+        if changed or not os.path.exists(self.manifest):
+            self._save_manifest()
+        # Taking the time after the manifest is written, so writing it does not trigger another listing
+        self._dir_mtime = os.stat(self.directory).st_mtime_ns
+
+    def add(self, file):
+        """
+        Registers a file that was just written (new, or overwritten with the same name), so it becomes the
+        latest file right away. Files outside the indexed directory are ignored
+        """
+        path = os.path.abspath(file)
+        if os.path.dirname(path) != self.directory:
+            return
+        name = os.path.basename(path)
+        with self.lock:
+            if name in self.files:
+                self._remove(name)
+            self._insert(name, os.stat(path).st_ctime)
+            self._save_manifest()
+
+    def _insert(self, name, ctime):
+        self.files[name] = ctime
+        for word, matches in self._matches.items():
+            if word in name:
+                insort(matches, (ctime, name))
+
+    def _remove(self, name):
+        ctime = self.files.pop(name)
+        for word, matches in self._matches.items():
+            if word in name:
+                matches.remove((ctime, name))
+
+    def _save_manifest(self):
+        with open(self.manifest, "w") as f:
+            json.dump(self.files, f)
@@ -0,0 +1,378 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from datetime import datetime
+import numpy as np
+import pandas as pd
+from time import perf_counter
+from daypacker import pack, PACKERS
+from burndownchart import BurndownChart
+from datahandler import DataHandler
+from filecache import FileCache
+from events import NullSink
+from dates import to_day, format_days
+
+# Sizes of the to-do lists the suite runs on
+SIZES = (1000, 10000, 100000, 1000000)
+
+# Entry points timed by 'run_suite', in the order they run
+ENTRIES = ("see_new_plan", "_day_blocks", "update_tasks", "check_plan_progress", "check_bdc_progress")
+
+# Most milliseconds the imports of a command line run may take: the command line itself ('--help'), and
+# everything a command that does not draw a chart imports (pandas being most of it)
+STARTUP_BUDGETS = {"cli": 50, "cli, datahandler, burndownchart": 1000}
+
+# Modules no command may import before a chart is drawn
+LAZY_MODULES = ("matplotlib",)
+
+
+def random_etas(n, seed=0):
+    """Task hours in the sizes people actually write in their to-do list (quarter hours up to a full day)"""
+    rng = np.random.default_rng(seed)
+    return rng.choice([0.25, 0.5, 1, 1.5, 2, 3, 4, 5], n, p=[0.15, 0.2, 0.25, 0.1, 0.12, 0.1, 0.05, 0.03])
+
+
+def random_tasks(n, seed=0):
+    """To-do list dataframe (same columns as the csv) with 'n' incomplete tasks"""
+    return pd.DataFrame({"Completed": np.zeros(n, dtype=bool),
+                         "Task": [f"Task {i}" for i in range(n)],
+                         "ETA": random_etas(n, seed),
+                         "Day": ""})
+
+
+def bench_packers(n=100000, max_hours=6, seed=0):
+    """
+    Runs every packer in 'daypacker.PACKERS' on the same 'n' tasks
+
+    Returns:
+        df - one row per strategy with the run time, the number of days and the hours left unused
+    """
+    eta = random_etas(n, seed)
+    rows = []
+    for strategy in PACKERS:
+        start = perf_counter()
+        result = pack(eta, max_hours, strategy)
+        seconds = perf_counter() - start
+        rows.append([strategy, seconds, result.days, result.hours_wasted.sum(), result.utilization])
+    df = pd.DataFrame(rows, columns=["Strategy", "Seconds", "Days", "Hours Wasted", "Utilization"])
+    return df.sort_values(by=["Days", "Seconds"]).reset_index(drop=True)
+
+
+def bench_plan_scaling(sizes=(1000, 10000, 100000, 1000000), max_hours=6, strategy="greedy"):
+    """
+    Times 'see_new_plan' from 1k to 1M tasks. If plan generation is linear, the time per thousand tasks
+    should stay roughly flat as the size grows
+
+    Returns:
+        df - one row per size with the run time and the run time per thousand tasks
+    """
+    bdc = BurndownChart(max_hours)
+    rows = []
+    for n in sizes:
+        df = random_tasks(n)
+        start = perf_counter()
+        bdc.see_new_plan(df, "2020-09-10", strategy=strategy)
+        seconds = perf_counter() - start
+        rows.append([n, seconds, seconds / n * 1000])
+    return pd.DataFrame(rows, columns=["Tasks", "Seconds", "Seconds per 1k Tasks"])
+
+
+def import_times(modules):
+    """
+    Imports 'modules' in a new interpreter with 'python -X importtime'
+
+    Parameters:
+        modules - e.g. "cli, datahandler"
+
+    Returns:
+        df - one row per module imported (including the ones imported by others), with its own import time
+             and the time with everything it imported ("Cumulative ms"), slowest first
+    """
+    run = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {modules}"], capture_output=True,
+                         text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    if run.returncode != 0:
+        raise Exception(f"Importing {modules} failed:\n{run.stderr}")
+    rows = []
+    for line in run.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line or "self [us]" in line:
+            continue
+        own, cumulative, name = line[len("import time:"):].split("|")
+        # Depth of the import is the indentation of the name
+        rows.append([name.strip(), (len(name) - len(name.lstrip()) - 1) // 2, int(own) / 1000, int(cumulative) / 1000])
+    df = pd.DataFrame(rows, columns=["Module", "Depth", "Own ms", "Cumulative ms"])
+    return df.sort_values("Cumulative ms", ascending=False).reset_index(drop=True)
+
+
+def check_startup(budgets=None, repeat=3):
+    """
+    Checks the import time of the command line against STARTUP_BUDGETS (best of 'repeat' runs, so a cold disk
+    cache does not count), and that none of LAZY_MODULES is imported
+
+    Returns:
+        df - one row per budget, with the time measured and whether it is within budget
+    """
+    if budgets is None:
+        budgets = STARTUP_BUDGETS
+    rows = []
+    for modules, budget in budgets.items():
+        best, lazy = None, []
+        for _ in range(repeat):
+            times = import_times(modules)
+            total = times.loc[times["Depth"] == 0, "Cumulative ms"].sum()
+            best = total if best is None else min(best, total)
+            lazy = [i for i in times["Module"] if i.split(".")[0] in LAZY_MODULES]
+        rows.append([modules, best, budget, ", ".join(sorted({i.split(".")[0] for i in lazy})),
+                     best <= budget and not lazy])
+    return pd.DataFrame(rows, columns=["Imports", "ms", "Budget ms", "Loaded Too Early", "OK"])
+
+
+def generate_backlog(n, seed=0, completed=0.3, start_date="2020-09-01", spread_days=60, recurring=0.02):
+    """
+    Realistic to-do list: quarter-hour to full-day ETAs, a share of the tasks already completed on dates spread
+    over the days before 'start_date', and a few recurring tasks (same name a few times, e.g. "Weekly review")
+
+    Parameters:
+        n - number of tasks
+        seed - seed of the random generator, the same seed always gives the same list
+        completed - share of the tasks already completed
+        start_date - day the project is planned from, completed tasks are done before it
+        spread_days - number of days the completion dates are spread over
+        recurring - share of the tasks whose name shows up 2 to 4 times
+
+    Returns:
+        df - dataframe with the columns of the to-do list csv
+    """
+    rng = np.random.default_rng(seed)
+    names = np.array([f"Task {i}" for i in range(n)], dtype=object)
+    # Recurring tasks take the name of a task a few rows before them
+    repeats = np.flatnonzero(rng.random(n) < recurring)
+    repeats = repeats[repeats >= 4]
+    names[repeats] = names[repeats - rng.integers(1, 4, len(repeats))]
+    done = rng.random(n) < completed
+    days = to_day(start_date) - rng.integers(1, spread_days + 1, n)
+    df = pd.DataFrame({"Completed": done,
+                       "Task": names,
+                       "ETA": random_etas(n, seed),
+                       "Day": np.where(done, format_days(days), '')})
+    # Completed tasks first, like the to-do list is read
+    return pd.concat([df[df["Completed"]], df[~df["Completed"]]]).reset_index(drop=True)
+
+
+def churn(df, seed=0, completed=0.1, added=0.02, removed=0.01, eta_changed=0.02, start_date="2020-09-01", days=14):
+    """
+    Next version of a to-do list: some incomplete tasks get completed over the 'days' days from 'start_date',
+    some are removed or re-estimated, and new tasks are added at the end
+
+    Parameters:
+        df - to-do list
+        seed - seed of the random generator
+        completed, added, removed, eta_changed - shares of the tasks of 'df' that change that way
+
+    Returns:
+        df - the new to-do list
+    """
+    rng = np.random.default_rng(seed + 1)
+    df = df.copy()
+    incomplete = np.flatnonzero(~df["Completed"].to_numpy(dtype=bool))
+    done = incomplete[rng.random(len(incomplete)) < completed]
+    df.loc[done, "Completed"] = True
+    df.loc[done, "Day"] = format_days(to_day(start_date) + rng.integers(0, days, len(done)))
+    changed = incomplete[rng.random(len(incomplete)) < eta_changed]
+    df.loc[changed, "ETA"] = random_etas(len(changed), seed + 2)
+    gone = incomplete[rng.random(len(incomplete)) < removed]
+    df = df.drop(np.setdiff1d(gone, done)).reset_index(drop=True)
+    n_new = int(len(df) * added)
+    new = pd.DataFrame({"Completed": False,
+                        "Task": [f"New task {seed} {i}" for i in range(n_new)],
+                        "ETA": random_etas(n_new, seed + 3),
+                        "Day": ''})
+    return pd.concat([df, new], ignore_index=True)
+
+
+class BenchProject:
+    def __init__(self, n, seed=0, max_hours=8, start_date="2020-09-01", directory=None):
+        """
+        Project directory set up the way a real one is after some work: a saved task list, a saved Proposed
+        plan, and a to-do list that changed since (see 'generate_backlog' and 'churn'). Every entry point of
+        the suite can run on it as is
+
+        Parameters:
+            n - number of tasks
+            seed - seed of the generator
+            max_hours - max hours in a workday
+            start_date - start date of the plan
+            directory - where the files are written (a new temporary directory by default)
+        """
+        self.n = n
+        self.start_date = start_date
+        self.directory = tempfile.mkdtemp(prefix="burndown-bench-") if directory is None else directory
+        self.file = "todo.csv"
+        self.chart = BurndownChart(max_hours)
+        self.chart.file = self.file
+        self.before = generate_backlog(n, seed, start_date=start_date)
+        self.after = churn(self.before, seed, start_date=start_date)
+
+        self.before.to_csv(os.path.join(self.directory, self.file), index=False)
+        datahandler = self.datahandler()
+        datahandler.save_data(datahandler.get_tasks_file())
+        self.chart.save_new_plan(datahandler, self.chart.see_new_plan(datahandler.get_tasks_file(), start_date),
+                                 confirm=True)
+        self.after.to_csv(os.path.join(self.directory, self.file), index=False)
+        # Progress file for 'check_bdc_progress'
+        self.chart.check_plan_progress(self.datahandler())
+
+    def datahandler(self):
+        """DataHandler on the project with an empty cache (every entry point is timed with a cold cache)"""
+        return DataHandler(self.file, cache=FileCache(), directory=self.directory, sink=NullSink())
+
+    def run(self, entry):
+        """Runs one of ENTRIES on the project"""
+        if entry == "see_new_plan":
+            return self.chart.see_new_plan(self.after, self.start_date)
+        if entry == "_day_blocks":
+            return self.chart._day_blocks(self.after[self.after["Completed"] == False])
+        if entry == "update_tasks":
+            return self.datahandler().update_tasks(confirm=True)
+        if entry == "check_plan_progress":
+            return self.chart.check_plan_progress(self.datahandler())
+        if entry == "check_bdc_progress":
+            return self.chart.check_bdc_progress(self.datahandler(), file=os.path.join(self.directory, "chart.png"))
+        raise Exception(f"Unknown entry point '{entry}'. Choose one of {list(ENTRIES)}")
+
+    def remove(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+
+def measure(function, memory=True):
+    """
+    Wall time of one call, and its peak memory from tracemalloc in a second call (tracemalloc slows everything
+    down, so it is never on while timing)
+
+    Returns:
+        dict - {"seconds": ..., "peak_mb": ...} (no "peak_mb" if 'memory' is False)
+    """
+    gc.collect()
+    start = perf_counter()
+    function()
+    result = {"seconds": perf_counter() - start}
+    if memory:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            function()
+            result["peak_mb"] = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def run_suite(sizes=SIZES, entries=ENTRIES, seed=0, memory=True, verbose=False):
+    """
+    Times every entry point on projects of every size
+
+    Parameters:
+        sizes - numbers of tasks
+        entries - entry points to run (see ENTRIES)
+        seed - seed of the generated projects
+        memory - also record the peak memory of every run
+        verbose - print every result as it comes
+
+    Returns:
+        dict - {"meta": {...}, "results": {entry: {size: {"seconds": ..., "peak_mb": ...}}}}, as saved by
+               'save_baseline'
+    """
+    results = {entry: {} for entry in entries}
+    for n in sizes:
+        project = BenchProject(n, seed)
+        try:
+            for entry in entries:
+                results[entry][str(n)] = measure(lambda: project.run(entry), memory)
+                if verbose:
+                    print(f"{entry:>20} {n:>8} tasks: " + ", ".join(f"{k} {v:.3f}" for k, v in
+                                                                      results[entry][str(n)].items()))
+        finally:
+            project.remove()
+    meta = {"created": datetime.now().isoformat(timespec="seconds"), "seed": seed, "python": platform.python_version(),
+            "numpy": np.__version__, "pandas": pd.__version__, "machine": platform.machine()}
+    return {"meta": meta, "results": results}
+
+
+def save_baseline(suite, file):
+    with open(file, "w") as f:
+        json.dump(suite, f, indent=2)
+    return file
+
+
+def load_baseline(file):
+    with open(file) as f:
+        return json.load(f)
+
+
+def compare(suite, baseline, tolerance=0.25, memory_tolerance=0.25, min_seconds=0.01):
+    """
+    Compares a suite run with a saved baseline. A run is a regression when it is more than 'tolerance' slower
+    (and at least 'min_seconds' slower, so timer noise on tiny runs is not flagged), or uses more than
+    'memory_tolerance' more memory at its peak
+
+    Returns:
+        df - one row per entry point and size found in both, with the ratios and a 'Regression' column
+    """
+    rows = []
+    for entry, sizes in suite["results"].items():
+        for size, current in sizes.items():
+            old = baseline["results"].get(entry, {}).get(size)
+            if old is None:
+                continue
+            time_ratio = current["seconds"] / max(old["seconds"], 1e-9)
+            slower = time_ratio > 1 + tolerance and current["seconds"] - old["seconds"] > min_seconds
+            memory_ratio = np.nan
+            bigger = False
+            if "peak_mb" in current and "peak_mb" in old:
+                memory_ratio = current["peak_mb"] / max(old["peak_mb"], 1e-9)
+                bigger = memory_ratio > 1 + memory_tolerance
+            rows.append([entry, int(size), current["seconds"], old["seconds"], time_ratio,
+                         current.get("peak_mb", np.nan), old.get("peak_mb", np.nan), memory_ratio, slower or bigger])
+    return pd.DataFrame(rows, columns=["Entry", "Tasks", "Seconds", "Baseline Seconds", "Time Ratio", "Peak MB",
+                                       "Baseline Peak MB", "Memory Ratio", "Regression"])
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmarks of the planner")
+    parser.add_argument("command", nargs="?", default="packers", choices=["packers", "suite", "startup"],
+                        help="'packers' compares the packing strategies, 'suite' times every entry point, "
+                             "'startup' checks the import time of the command line")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(SIZES))
+    parser.add_argument("--entries", nargs="+", default=list(ENTRIES), choices=list(ENTRIES))
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="skip the tracemalloc runs")
+    parser.add_argument("--save", help="json file to save the results in (a new baseline)")
+    parser.add_argument("--compare", help="baseline json file to compare the results with")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="slowdown flagged as a regression (0.25 = 25%%)")
+    args = parser.parse_args()
+
+    if args.command == "packers":
+        print(bench_packers().to_string(index=False))
+        print()
+        print(bench_plan_scaling().to_string(index=False))
+    elif args.command == "startup":
+        report = check_startup()
+        print(report.to_string(index=False))
+        if not report["OK"].all():
+            raise SystemExit(1)
+    else:
+        suite = run_suite(args.sizes, args.entries, args.seed, memory=not args.no_memory, verbose=True)
+        if args.save:
+            print(f"Baseline saved as '{save_baseline(suite, args.save)}'")
+        if args.compare:
+            report = compare(suite, load_baseline(args.compare), args.tolerance, args.tolerance)
+            print(report.to_string(index=False))
+            if report["Regression"].any():
+                print(f"{int(report['Regression'].sum())} regression(s)")
+                raise SystemExit(1)
@@ -1,21 +1,38 @@
+import asyncio
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-import matplotlib.pyplot as plt
-from matplotlib.pyplot import figure
+from bisect import bisect_right
+from datetime import datetime
 import os
+import re
+from daypacker import pack, iter_days
+from incrementalplan import IncrementalPlan
+from burndownseries import plan_bars, daily_remaining, completion_line, velocity_line, progress_status
+from plotting import show_plan, show_progress
+from forecast import VelocityEstimator, progress_forecast
+from taskstore import TaskStore
+from dependencies import DependencyGraph, has_dependencies
+from dates import to_day, day_range, day_string, format_days
+from events import PrintSink, confirmed, emit, info
+from instrument import timed, stage, count
 
 
 class BurndownChart:
-    def __init__(self, max_hours):
+    def __init__(self, max_hours, calendar=None):
         # During instantiation, the user puts in their maximum hours they are willing to work per week
         self.max_hours = max_hours
-        # Getting the path to the current working directoryM
-        self.path = os.getcwd() + "\\*"  
+        # Optional WorkCalendar (weekends, holidays, part-time days), plans then only use its workdays
+        self.calendar = calendar
         # To-do-list is assumed to be in the same folder as the code. If not, CHANGE this directory, or use an API
         self.file = "sample_todo_list.csv"
-
-    def see_new_plan(self, df, start_date, max_hours=None):
+        # Headless renderer, only created once a chart is written to a file
+        self.renderer = None
+        # Velocity of every plan checked, by to-do list and plan start date (see 'velocity_of'). Each one is only
+        # updated with the new completion days on every check
+        self.velocities = {}
+
+    @timed()
+    def see_new_plan(self, df, start_date, max_hours=None, strategy="greedy", calendar=None):
         """Algorithm that takes all tasks and breaks them up into different 'max_hours' workdays (e.g 8 hours)
            The discrete size of these tasks are preserved and are not split into the next day.
            For example, if 7 hours have been assigned to one day and the next task is 2 hours long, 
@@ -26,8 +43,16 @@ class BurndownChart:
            every new line
 
            Parameters:
+               df: The to-do list (dataframe, or TaskStore)
                max_hours: The maximum number of productive hours in a day
                start_date: The start date of the projects
+               strategy: How tasks are packed into days (see 'daypacker.PACKERS'). "greedy" swaps tasks to fill
+                         days, "next_fit" keeps the to-do order, "first_fit_decreasing" and "best_fit" minimize
+                         the number of days, "spill" splits tasks into the next day. When the to-do list has a
+                         'Depends On' column (names of the tasks to do first, separated by ';'), tasks are
+                         scheduled after the tasks they depend on instead (see 'dependencies.DependencyGraph')
+               calendar: WorkCalendar giving the hours of every date (self.calendar by default). Days off are
+                         skipped and every workday is filled up to its own hours instead of 'max_hours'
 
             Returns:
                 data: dataframe of the each task grouped by date
@@ -35,47 +60,136 @@ class BurndownChart:
         #Gives opportunity for setting new max hours, if they choose not to, it automatically gives original hours
         if max_hours is None:
             max_hours = self.max_hours
+        if calendar is None:
+            calendar = self.calendar
 
-        # Filtering only the incomplete tasks
-        incomplete_tasks = df[df["Completed"] == False].reset_index(drop=True)[["Day", "Task", "ETA", "Completed"]]
-        # Calling algorithm to split the tasks into a day blocks (list of dataframes, one for each day)
-        result = self._day_blocks(incomplete_tasks, max_hours)
-        # Converting date string into a 'datetime' object
-        date = pd.to_datetime(start_date).to_pydatetime()
-        # Creating new DataFrame. First row is task-less but will show the total cumulative hours
-        data = pd.DataFrame([["", 0, True, date.strftime('%Y-%m-%d')]], columns=["Task", "ETA", "Completed", "Day"])
-
-        # Converting date_range objects into a list of date strings
-        dates = pd.date_range(date, date + timedelta(len(result) - 1)).to_pydatetime()
-        dates = [datetime.strftime(i, '%Y-%m-%d') for i in dates]
-
-        # Appending the entire dataset back together, but counting how many tasks were in each day 
-        # Each integer in the 'count' list represents a day, and the integer value represents how many tasks in that day
-        count = []
-        for i, j in zip(result, range(len(result))):
-            count.append(len(i))
-            data = data.append(i)
-
-        # Using 'count' variable to assign corresponding dates to the tasks.
-        dates_list = [dates[0]]
-        for i, j in zip(dates, range(len(count))):
-            dates_list.extend([i] * count[j])
-
-        # Replacing the column of dates with the new date list
-        data['Day'] = dates_list
+        if isinstance(df, TaskStore):
+            # Same thing on the arrays of the store, names are only looked up for the packed tasks
+            incomplete_tasks = df.incomplete()
+            hours = incomplete_tasks.hours()
+        else:
+            # Filtering only the incomplete tasks
+            incomplete_tasks = df[df["Completed"] == False].reset_index(drop=True)[["Day", "Task", "ETA", "Completed"]]
+            hours = incomplete_tasks["ETA"].to_numpy(dtype=float)
+
+        # Hours of every day of the plan: 'max_hours' every calendar day, or the workdays of the calendar
+        capacity = max_hours
+        if calendar is not None:
+            workdays, capacity = calendar.workdays(start_date, calendar.days_needed(hours))
+
+        if isinstance(df, TaskStore):
+            packed = pack(hours, capacity, strategy)
+            tasks = incomplete_tasks.task_names()[packed.order]
+            completed = incomplete_tasks.completed[packed.order]
+        elif has_dependencies(df):
+            # Tasks only start once the tasks they depend on are done, whatever the strategy
+            packed = DependencyGraph.from_tasks(df).schedule(hours, capacity)
+            incomplete_tasks = incomplete_tasks.iloc[packed.order]
+            tasks = incomplete_tasks["Task"].to_numpy()
+            completed = incomplete_tasks["Completed"].to_numpy()
+        else:
+            # Calling algorithm to split the tasks into day blocks (task order and the index range of each day)
+            packed = self._day_blocks(incomplete_tasks, capacity, strategy)
+            incomplete_tasks = incomplete_tasks.iloc[packed.order]
+            tasks = incomplete_tasks["Task"].to_numpy()
+            completed = incomplete_tasks["Completed"].to_numpy()
+
+        # One date string per day of the plan (at least one, for the task-less first row)
+        if calendar is None:
+            dates = format_days(day_range(start_date, max(packed.days, 1)))
+        else:
+            dates = format_days(workdays[:max(packed.days, 1)])
+        # Day number of every row: the first row is task-less but will show the total cumulative hours,
+        # then each day number is repeated as many times as there are tasks in that day
+        day = np.concatenate([[0], np.repeat(np.arange(packed.days), packed.counts)])
+        eta = np.concatenate([[0], packed.hours])
+
+        # Building the whole plan at once
+        data = pd.DataFrame({"Task": np.concatenate([[""], tasks]),
+                             "ETA": eta,
+                             "Completed": np.concatenate([[True], completed]),
+                             "Day": dates[day]})
 
         #Resetting index
         data = data.set_index(["Day", "Task"])
-        # Creating Reverse cumulative series on ETA column
-        data["Amount Left"] = list(data["ETA"].loc[::-1].cumsum().shift(1).fillna(0))[::-1]
+        # Creating Reverse cumulative series on ETA column (hours left after each task is done)
+        data["Amount Left"] = eta.sum() - np.cumsum(eta)
+        # Kept so the day structure saved with the plan knows how long its days are
+        data.attrs["max_hours"] = max_hours
+        data.attrs["calendar"] = calendar
         return data
 
-    def save_new_plan(self, datahandler, plan):
+    @timed()
+    def stream_new_plan(self, datahandler, start_date, out_file, max_hours=None, strategy="greedy", chunksize=100000):
+        """Same plan as 'see_new_plan', but for to-do lists too big to fit in memory. The to-do list is read in
+           chunks, the tasks are packed as they stream in, and the plan is written to 'out_file' a batch of days
+           at a time (in the same format 'save_new_plan' saves it). Memory use depends on 'chunksize', not
+           on the size of the to-do list. The 'Depends On' column is not read, use 'see_new_plan' for to-do
+           lists with dependencies
+
+           Parameters:
+               datahandler: instance of DataHandler class (its to-do list is the one planned)
+               start_date: The start date of the projects
+               out_file: csv file the plan is written to
+               max_hours: The maximum number of productive hours in a day
+               strategy: "greedy", "next_fit" or "spill" (see 'daypacker.STREAMING_PACKERS')
+               chunksize: number of tasks read at a time
+
+            Returns:
+                int - number of days in the plan
+        """
+        if max_hours is None:
+            max_hours = self.max_hours
+
+        # First pass: total hours, needed for the 'Amount Left' of the very first row
+        total = sum(chunk["ETA"].sum() for chunk in datahandler.read_tasks_chunks(chunksize=chunksize))
+        start = to_day(start_date)
+        pd.DataFrame([[day_string(start), "", 0.0, True, total]],
+                     columns=["Day", "Task", "ETA", "Completed", "Amount Left"]).to_csv(out_file, index=False)
+
+        # Second pass: packing, keeping the task names of the chunks that still have tasks to hand out
+        names = _ChunkNames()
+
+        def etas():
+            for chunk in datahandler.read_tasks_chunks(chunksize=chunksize):
+                names.add(chunk["Task"].to_numpy())
+                yield chunk["ETA"].to_numpy()
+
+        days, batch, batch_rows = 0, [], 0
+        done = 0.0
+        for positions, hours in iter_days(etas(), max_hours, strategy):
+            batch.append((days, names.take(positions), hours))
+            days += 1
+            batch_rows += len(positions)
+            if batch_rows >= chunksize:
+                done = self._write_plan_batch(batch, start, total, done, out_file)
+                batch, batch_rows = [], 0
+        self._write_plan_batch(batch, start, total, done, out_file)
+        return days
+
+    def _write_plan_batch(self, batch, start, total, done, out_file):
+        """Appends (day number, task names, hours) days to the plan file, returns the hours done so far"""
+        if not batch:
+            return done
+        hours = np.concatenate([i[2] for i in batch])
+        day = np.repeat([i[0] for i in batch], [len(i[1]) for i in batch])
+        pd.DataFrame({"Day": format_days(start + day),
+                      "Task": np.concatenate([i[1] for i in batch]),
+                      "ETA": hours,
+                      "Completed": False,
+                      "Amount Left": total - done - np.cumsum(hours)}).to_csv(out_file, mode="a", header=False,
+                                                                               index=False)
+        return done + hours.sum()
+
+    @timed()
+    def save_new_plan(self, datahandler, plan, confirm=None):
         """
         method 'new_plan' must be run first in order to run this function.
 
         Paramaters:
             plan - multi-index dataframe. Obtained from the 'new_plan' output
+            confirm - None to ask before saving, True/False to save/cancel without asking, or a function that
+                      gets the file name and returns True/False
 
         Returns:
             str - string explain the filename of saved csv
@@ -84,45 +198,103 @@ class BurndownChart:
         # Searching for any file that might have a duplicate name
         new_path = self._get_updated_path(datahandler, "Proposed", plan.index[0][0])
         # Asking if you want to save
-        inputs = input(f"File is about to be written as '{new_path}'. OK? (y/n):  ")
-        if inputs in ["Y", "y", "yes", "Yes", "YES", "YEs"]:
-            plan.reset_index().to_csv(new_path, index=False)
+        if confirmed(confirm, f"File is about to be written as '{new_path}'. OK? (y/n):  ", new_path):
+            new_path = datahandler.write_file(plan.reset_index(), new_path)
             df = datahandler.get_tasks_file(self.file)
-            df.to_csv(f"Progress on Project started on {start_date}.txt", index=False)
-            print(f"Saved {new_path} as well as 'Progress on Project started on {start_date}.txt'")
+            # Saving the packed days next to the plan, so 'update_plan' does not have to repack everything
+            IncrementalPlan.from_plan(plan, df, plan.attrs.get("max_hours", self.max_hours),
+                                      plan.attrs.get("calendar", self.calendar)).save(
+                datahandler.full_path(IncrementalPlan.file_of(new_path)))
+            progress_path = datahandler.write_file(df, f"Progress on Project started on {start_date}.txt")
+            datahandler.emit([info(f"Saved {new_path} as well as '{progress_path}'")])
             return plan.reset_index()
         else:
             raise Exception("Canceled operation")
 
+    @timed()
+    def update_plan(self, datahandler, changeset=None):
+        """
+        Updates the latest saved plan with the tasks added, removed, completed or re-estimated since, instead of
+        making a new plan from scratch. Only the days the changes touch are modified (see 'IncrementalPlan'), and
+        the Proposed file is saved again with its packed days, so progress checks see the updated plan
+
+        Hours freed on a day (a task removed or completed) are not refilled by moving later tasks forward: they
+        only take tasks added or moved by later changes. The plan can then take more days than a new plan from
+        'see_new_plan' would, make a new plan to pack the tasks again
+
+        Parameters:
+            datahandler - instance of DataHandler class
+            changeset - Changeset to apply. By default the one of the last 'datahandler.update_tasks'
+
+        Returns:
+            data - the updated plan, in the same form as 'see_new_plan'
+        """
+        if changeset is None:
+            changeset = datahandler.changeset
+        if changeset is None:
+            raise Exception("There are no changes to apply, run 'update_tasks' first")
+
+        proposed = datahandler._get_latest_file("Proposed")
+        packed_file = datahandler.full_path(IncrementalPlan.file_of(proposed))
+        if os.path.exists(packed_file):
+            plan = IncrementalPlan.load(packed_file)
+        else:
+            # Plan saved before the packed days were kept: rebuilding them from the plan and the task list it
+            # was made from
+            plan = IncrementalPlan.from_plan(datahandler.read_file(proposed), datahandler.get_latest_tasks_file(),
+                                             self.max_hours, self.calendar)
+        first_day = plan.apply(changeset)
+        if first_day is not None:
+            datahandler.emit([info(f"Plan changed from {day_string(plan.dates(first_day + 1)[-1])} onward")])
+        data = plan.to_frame()
+        data.attrs["max_hours"] = plan.max_hours
+        data.attrs["calendar"] = plan.calendar
+        # Both files are written under a temporary name and renamed, readers never see half of either
+        datahandler.write_file(data.reset_index(), proposed)
+        plan.save(packed_file)
+        return data
+
+    @timed()
     def get_latest_plan(self, datahandler):
         # Searches for most recently modified file with first word "Proposed"
         new_path = datahandler._get_latest_file("Proposed")
         # loading csv
-        original = pd.read_csv(new_path).fillna('')
+        original = datahandler.read_file(new_path)
         # Returning it back in the original form 'see_new_plan' function had
         original = original.groupby(by=["Day", "Task"]).mean()
         # new_path = self._get_updated_path("CSV", start_date)
         #         original.to_csv(f"CSV of Plan on {start_date} v{path[-5]}.csv")
         return original
 
-    def create_burndown_chart(self, data, max_hours=None):
+    @timed()
+    def create_burndown_chart(self, data, max_hours=None, file=None, datahandler=None):
+        """
+        Shows the burndown chart of a plan. If 'file' is given, the chart is written to that file (png, svg, ...)
+        with the headless renderer instead of being shown, and the file name is returned
+
+        The banner of the shown chart goes to the sink of 'datahandler' (printed without a DataHandler)
+        """
         if max_hours is None:
             max_hours = self.max_hours
 
-        # Setting boundaries of matplotlib chart
-        figure(num=None, figsize=(8, 6), dpi=80, facecolor='w', edgecolor='k')
-        # x-values are the dates of the 'plan'
-        xaxis = np.array(data.index.levels[0])
-        # y-values are the cumulative sum of hours under the 'Amount Left' column
-        yaxis = [data.loc[i].iloc[0]["Amount Left"] for i in xaxis]
-        # labeling x-axis
-        plt.xticks(rotation=90)
-        # plotting bar graph
-        plt.bar(xaxis, yaxis, color='lightgray')
-        print(f"Below is the Proposed Plan from {xaxis[0]} to {xaxis[-1]}, Average Velocity: {max_hours} hours per day")
-        print(f"Plan Proposed on {str(datetime.now())[:19]}")
-        return plt.show()
+        if file is not None:
+            with stage("BurndownChart.render"):
+                self.get_renderer().draw_plan(data)
+                return self.get_renderer().save(file)
+
+        # x-values are the dates of the 'plan', y-values the hours left at the start of each of them
+        xaxis, yaxis = plan_bars(data)
+        messages = [info(f"Below is the Proposed Plan from {xaxis[0]} to {xaxis[-1]}, Average Velocity: {max_hours} "
+                         f"hours per day"), info(f"Plan Proposed on {str(datetime.now())[:19]}")]
+        if datahandler is None:
+            emit(PrintSink(), messages)
+        else:
+            datahandler.emit(messages)
+        # matplotlib is only imported now (see 'plotting')
+        with stage("BurndownChart.render"):
+            return show_plan(xaxis, yaxis)
 
+    @timed()
     def check_plan_progress(self, datahandler):
         """
         Compares the active to do list, with the proposed plan of the project and tracks what tasks have been completed
@@ -134,22 +306,68 @@ class BurndownChart:
             df3 - dataframe that has a list of updated tasks that are completed
 
         """
-        # Getting previous plan progress dataframe
-        dfcompare = pd.read_csv(datahandler._get_latest_file("Proposed")).fillna('')[
-            ["Task", "ETA", "Completed", 'Day']].drop(0).reset_index(drop=True)
+        # Getting previous plan, latest to-do list file and non-updated to-do list file
+        proposed = datahandler.read_file(datahandler._get_latest_file("Proposed"))
+        df = datahandler.get_tasks_file(self.file)
+        df3 = datahandler.get_latest_tasks_file()
+
+        df3update, start_date = self.plan_progress(proposed, df, df3)
+        progress_path = datahandler.write_file(df3update, f"Progress on Project started on {start_date}.txt")
+        datahandler.emit([info(f"New progress file saved as '{progress_path}'")])
+        return df3update
+
+    @timed()
+    async def check_plan_progress_async(self, datahandler):
+        """
+        Same as 'check_plan_progress', for slow (e.g. network-mounted) project directories: the Proposed plan,
+        the to-do list and the latest Tasks file are fetched at the same time, files are parsed in threads,
+        and the Progress file is written to a temporary file that is then renamed
 
-        # Getting latest to-do list file
-        df = datahandler.get_tasks_file(self.file)[["Task", "ETA", "Completed", "Day"]]
+        Parameter:
+            datahandler - instance of DataHandler class
+
+        Returns:
+            df3 - dataframe that has a list of updated tasks that are completed
+        """
+        proposed, df, df3 = await asyncio.gather(datahandler.read_latest_file_async("Proposed"),
+                                                 datahandler.get_tasks_file_async(self.file),
+                                                 datahandler.get_latest_tasks_file_async())
+        df3update, start_date = await datahandler.in_thread(self.plan_progress, proposed, df, df3)
+        progress_path = await datahandler.write_file_async(df3update, f"Progress on Project started on {start_date}.txt")
+        datahandler.emit([info(f"New progress file saved as '{progress_path}'")])
+        return df3update
+
+    def velocity_of(self, datahandler, start_date):
+        """
+        VelocityEstimator of the plan started on 'start_date' for the to-do list of 'datahandler'. Each project
+        and plan has its own, so checking several of them with the same chart never mixes their velocities
+        """
+        key = (datahandler.full_path(self.file), str(start_date))
+        if key not in self.velocities:
+            self.velocities[key] = VelocityEstimator()
+        return self.velocities[key]
 
-        # Getting non-updated to-do list file
-        df3 = datahandler.get_latest_tasks_file()[["Task", "ETA", "Completed", "Day"]]
+    @timed()
+    def plan_progress(self, proposed, df, df3):
+        """
+        Merges the to-do list with the proposed plan (the part of 'check_plan_progress' that does not read files)
+
+        Returns:
+            tuple - (dataframe of the updated tasks, start date of the plan)
+        """
+        # Previous plan progress dataframe
+        dfcompare = proposed[["Task", "ETA", "Completed", 'Day']].drop(0).reset_index(drop=True)
+        df = df[["Task", "ETA", "Completed", "Day"]]
+        df3 = df3[["Task", "ETA", "Completed", "Day"]]
 
         # Merging both lists to see what has been completed
-        df3update = pd.merge(df, dfcompare, how='inner', on='Task').drop(['ETA_y', 'Completed_y'], axis=1)
+        with stage("BurndownChart.plan_progress.merge"):
+            df3update = pd.merge(df, dfcompare, how='inner', on='Task').drop(['ETA_y', 'Completed_y'], axis=1)
+        count("rows_processed", len(df) + len(dfcompare))
         df3update = df3update.rename(
             columns={'ETA_x': 'ETA', 'Completed_x': 'Completed', 'Day_x': 'Day', 'Day_y': 'Proposed Day'})
 
-        start_date = pd.read_csv(datahandler._get_latest_file("Proposed")).fillna('').loc[:, 'Day'][0]
+        start_date = proposed.loc[:, 'Day'][0]
 
         if '' in df3[df3['Completed'] == True]['Day'].values:
             raise Exception("Task marked as true but it does not have a completion date!")
@@ -157,12 +375,10 @@ class BurndownChart:
         # Checking if there's no new completed tasks
         if len(df3update) == 0:
             raise Exception("Empty Dataset!")
-        else:
-            df3update.to_csv(f"Progress on Project started on {start_date}.txt", index=False)
-            print("New progress file saved as 'Progress on Project started on 2020-09-10.txt'")
-            return df3update
+        return df3update, start_date
 
-    def check_bdc_progress(self, datahandler):
+    @timed()
+    def check_bdc_progress(self, datahandler, file=None):
         """
         This function superimposes a line on top of the original burndown chart to show visual progress
 
@@ -170,6 +386,7 @@ class BurndownChart:
 
         Parameters:
             datahandler - instance of DataHandler class
+            file - if given, the chart is written to this file (png, svg, ...) instead of being shown
 
         Returns:
             tuple - 4 arrays
@@ -180,133 +397,84 @@ class BurndownChart:
 
         """
         # Getting progress dataframe
-        df = pd.read_csv(datahandler._get_latest_file("Progress")).fillna('').drop('Proposed Day',axis=1)
-        df['Day'] = [str(i)[:10] for i in pd.to_datetime(df['Day']).fillna('')]
+        df = datahandler.read_file(datahandler._get_latest_file("Progress"), normalize_days=True).drop('Proposed Day',axis=1)
 
         if set(df['Day']) == {''}:
             raise Exception('Empty Date of Completion, you have not completed anything yet')
 
-        # Filtering only completed tasks and regrouping
-        tasks_comp = df[df["Completed"] == True].groupby(by=["Day", "Task"]).mean()
-        start_date = pd.read_csv(datahandler._get_latest_file("Proposed")).fillna('').loc[:, 'Day'][0]
-        ######### PREPARING TO GRAPH #############
-
-        # Adding column 'Amount Left' to show reverse cumulative sum of the tasks.
-        tasks_comp["Amount Left"] = np.array(list(tasks_comp["ETA"].loc[::-1].cumsum().shift(1).fillna(0))[::-1])
         # Getting Proposed plan to see how the original burndown chart looked like
-        export = pd.read_csv(datahandler._get_latest_file("Proposed")).fillna('').set_index(["Day", "Task"])
-        # Adjusting all reverse cumulative sum values of 'tasks_comp' so it matches that of the proposed plan
-        tasks_comp["Amount Left"] += export["ETA"].sum() - tasks_comp.iloc[0]["Amount Left"]
+        export = datahandler.read_file(datahandler._get_latest_file("Proposed"))
+        start_date = export.loc[:, 'Day'][0]
 
         ########### GRAPHING DATA ####################
 
-        # Grabbing the dates of the plan on the burndown chart
-        xaxis = [i.strftime("%Y-%m-%d") for i in pd.date_range(export.index.levels[0][0], export.index.levels[0][-1])]
-
-        # y-axis values: Placeholder used to get the same work remaining if theres a day that has no assigned work
-        yaxis = []
-        placeholder = 0
-        for i in xaxis:
-            if i not in export.index.levels[0]:
-                yaxis.append(placeholder)
-            else:
-                placeholder = export.loc[i, 'Amount Left'][0]
-                yaxis.append(placeholder)
-
-        # Setting x values of the completion line
-        newXaxis = tasks_comp.index.levels[0].values
-
-        # Getting corresponding y-values of line from x values
-        newYaxis = [tasks_comp.loc[i].loc[:, 'Amount Left'][-1] for i in tasks_comp.index.levels[0].values]
-
-        # Fitting the line according to the day the first task was completed
-        ##Setting Datetimes of the line x values and of the start date
-        xdatetime = [datetime.strptime(i, "%Y-%m-%d") for i in list(newXaxis)]
-        startdatetime = datetime.strptime(start_date, "%Y-%m-%d")
-        ##Getting how many days after starting date tasks got completed
-        shift = (min(xdatetime) - startdatetime).days
-        ##Getting total time since the start date
-        ranged = (max(xdatetime) - min(xdatetime)).days
-
-        # Converting x values (which were dates (str)) into numerical values
-        numx = np.array(xdatetime) - xdatetime[0] + timedelta(days=shift)
-        numx = [i.days for i in numx]
-
-        # Start plotting
-
-        ##Creating Burndown velocity: the line of best fit of all data points so far
-        c = np.polyfit(numx, newYaxis, 1)
-        x1 = np.array(range(ranged + shift, len(xaxis)))
-        line = c[0] * x1 + c[1]
+        with stage("BurndownChart.check_bdc_progress.series"):
+            # Dates of the plan on the burndown chart, days with no assigned work keep the same work remaining
+            xaxis, yaxis = daily_remaining(export)
+            # Completion line, adjusted so it starts from the hours of the proposed plan
+            newXaxis, newYaxis, numx = completion_line(df, export["ETA"].sum(), start_date)
 
-        # Plotting
-        ##Determing window size of matplotlib
-        fig = plt.figure(num=None, figsize=(10, 6), dpi=80, facecolor='w', edgecolor='k')
-        plt.ylim(0, max(yaxis) + 10)
-        plt.xticks(rotation=90, figure=fig)
-        plt.bar(xaxis, yaxis, color='lightgray', figure=fig)
-        plt.plot(newXaxis, newYaxis, linewidth=5, color="red", figure=fig)
-        plt.plot(x1, line, color='black', linewidth=3, linestyle=':', figure=fig)
-        # plt.plot(numx,newYaxis,'o', color='red', markersize =10)
+            ##Creating Burndown velocity: the line of best fit of all data points so far (a line needs 2 points)
+            x1, line = velocity_line(numx, newYaxis, len(xaxis)) if len(numx) > 1 else (np.array([]), np.array([]))
+        count("rows_processed", len(df) + len(export))
 
         # Feedback on progess
-        print(f"Below is the Current Progress for the dates {xaxis[0]} to {xaxis[-1]}")
-        if newYaxis[len(newYaxis) - 1] < yaxis[len(newYaxis) - 1]:
-            print(f"Good job!! You're ahead of schedule!")
-        elif len(newYaxis) == 0:
-            print("No data recorded yet!")
-        elif newYaxis[len(newYaxis) - 1] == yaxis[len(newYaxis) - 1]:
-            print("Right on time! Keep it up")
-        else:
-            print("We're behind! We have to work faster!")
-
-        plt.show()
+        messages = [f"Below is the Current Progress for the dates {xaxis[0]} to {xaxis[-1]}"]
+        # Compared with the hours the plan has left on the last day something was completed
+        messages.append({"Ahead": "Good job!! You're ahead of schedule!", "On time": "Right on time! Keep it up",
+                         "Behind": "We're behind! We have to work faster!",
+                         None: "No data recorded yet!"}[progress_status(yaxis, newYaxis, numx)])
+        # Projected finish dates from the recent velocity
+        with stage("BurndownChart.check_bdc_progress.forecast"):
+            velocity = self.velocity_of(datahandler, start_date)
+            forecast = progress_forecast(numx, newYaxis, start_date, velocity)
+        if velocity.velocity is not None:
+            dates = {key: date for key, date in forecast.items() if key.startswith("P")}
+            messages.append(f"Velocity: {velocity.velocity:.2f} hours/day. Projected finish: "
+                            + ", ".join(f"{date or 'never'} ({key})" for key, date in dates.items()))
+        datahandler.emit([info(i) for i in messages])
+
+        if file is not None:
+            with stage("BurndownChart.render"):
+                self.get_renderer().draw(xaxis, yaxis, (numx, newYaxis), (x1, line),
+                                      f"Progress from {xaxis[0]} to {xaxis[-1]}")
+                return self.get_renderer().save(file)
 
-    def _day_blocks(self, df, max_hours=None):
+        # Plotting
+        with stage("BurndownChart.render"):
+            show_progress(xaxis, yaxis, newXaxis, newYaxis, x1, line)
+
+    def get_renderer(self):
+        """Headless renderer used when charts are written to files, created once and reused"""
+        if self.renderer is None:
+            # Imported here so matplotlib is only loaded once a chart is drawn
+            from chartrender import ChartRenderer
+            self.renderer = ChartRenderer()
+        return self.renderer
+
+    @timed()
+    def _day_blocks(self, df, max_hours=None, strategy="greedy"):
         """
         Algorithm that takes tasks and fits them in an 8 hour workday. Tasks that do not fit are swapped with
-        tasks that can be completed that day.
+        tasks that can be completed that day. The packing itself is done by 'daypacker' on the ETA values,
+        so the dataframe is never sliced or shifted while packing.
 
         Parameters:
             df - dataframe that needs splitting. Note that this dataframe must have a column called ['ETA']
-            max_hours - max hours in a workweek
+            max_hours - max hours in a workweek, or an array of the hours of every day
+            strategy - name of the packer to use (see 'daypacker.PACKERS')
 
         Returns:
-            lst2 - list of dataframes of tasks, one for each day
+            PackResult - row positions of 'df' in the order they get done ('order'), their hours ('hours')
+                         and the day boundaries ('bounds'), day k holds the rows order[bounds[k]:bounds[k + 1]]
         """
         if max_hours is None:
             max_hours = self.max_hours
 
-        lst2 = []
-        freeze = 0
-        a = df["ETA"]
-        for i in range(len(a) + 1):
-            df2 = df["ETA"].iloc
-            ##Checking to see if the cumulative hours in a day surpasses the max
-            if df2[freeze:i].sum() > max_hours:
-                increment = 0
-                ##Checking if the next element will be under the max hours
-                if df2[freeze:i + increment + 1].drop(i - 1).sum() < max_hours:
-                    ##Keeps adding tasks until it surpasses the max
-                    while df2[freeze:i + increment + 1].drop(i - 1).sum() < max_hours:
-                        check = df2[freeze:i + increment + 1].drop(i - 1)
-                        increment += 1
-                        if check.equals(df2[freeze:i + increment + 1].drop(i - 1)):
-                            break
-                    temp = df.iloc[i - 1]
-                    ##Reorganizing the dataframe so that the block that was skipped gets added to the next set of data
-                    df.iloc[i - 1:i + increment + 1] = df.iloc[i - 1:i + increment + 1].shift(-1).fillna(temp)
-                    # print(df.iloc[i-1:i+increment+1])
-                    ##Adding the entire set of tasks within the hour limit to a list
-                    lst2.append(df.iloc[freeze:i + increment - 1])
-                    freeze = i + increment - 1
-                else:
-                    lst2.append(df.iloc[freeze:i - 1])
-                    freeze = i - 1
-        ##Add the remaining tasks to the end of the list
-        lst2.append(df.iloc[freeze:])
-        return lst2
+        count("rows_processed", len(df))
+        return pack(df["ETA"].to_numpy(dtype=float), max_hours, strategy)
 
+    @timed()
     def _get_updated_path(self, datahandler, first_word, start_date, path=None):
         """This function is used to make sure that naming is not duplicated. It searches for the last file
         that has the same name and increments the name by a value (v1, v2, ..) in order to avoid duplicates
@@ -314,52 +482,91 @@ class BurndownChart:
         Parameters:
             datahandler - instance of DataHandler class
             start_date - start date
-            path - The directory to be looking at
+            path - The directory to be looking at (the directory of the datahandler by default)
 
         Returns:
             str - If conditions are satisfied, it returns a string with a non-duplicate file name
         """
         if path is None:
-            path = self.path
+            path = datahandler.path
 
         # Get most recent file
         paths = datahandler._get_latest_file(first_word, path)
 
         # Looking for version number (v1,v2,v3)
         if paths.split(' ')[:2] == ['No', 'files']:
-            print(f"Saving File as Proposed plan starting {start_date} v1.txt")
+            datahandler.emit([info(f"Saving File as Proposed plan starting {start_date} v1.txt")])
             return f"Proposed plan starting {start_date} v1.txt"
-        if paths[-7:-5] != " v":
+        # Separating the extension (.txt, .csv, .feather, .parquet) from the name
+        paths, extension = os.path.splitext(paths)
+        # Version label at the end of the name (v1, v2, ... v10 ...)
+        version = re.search(r" v(\d+)$", paths)
+        if version is None:
             return "There is an issue with naming the file. There is no version label (vx)"
-        if paths[-4:] == ".txt":
-            extension = ".txt"
-        if paths[-4:] == ".csv":
-            extension = ".csv"
 
-        # Checking if dates are up to date
-        assert len(
-            pd.Series([i if str(datetime.now().year) in i else "Invalid" for i in paths.split(' ')]).drop_duplicates(
-                keep=False)) != 0, "Invalid Date Time on file"
-        file_date = pd.Series(
-            [i if str(datetime.now().year) in i else "Invalid" for i in paths.split(' ')]).drop_duplicates(keep=False)
+        # Date the plan in the file starts on
+        file_date = re.search(r"\d{4}-\d{1,2}-\d{1,2}", paths)
+        assert file_date is not None, "Invalid Date Time on file"
 
-        # Getting position of file in series as well as the date on the name of the file
-        position, file_date = file_date.index[0], file_date.values[0]
-
-        # Turning date of file into a datetime object. Creating a datetime object out of the start_date too
-        file_datetime = datetime.strptime(file_date, "%Y-%m-%d")
-        start_datetime = pd.to_datetime(start_date).to_pydatetime()
+        # Day numbers of the date of the file and of the start_date
+        file_datetime = to_day(file_date.group())
+        start_datetime = to_day(start_date)
 
         # If the dates are the same, increment the version by 1
         if start_datetime == file_datetime:
-            newpaths = paths[:-5] + str(int(paths[-5]) + 1) + extension
-            return newpaths
+            return f"{paths[:version.start()]} v{int(version.group(1)) + 1}{extension}"
         # If the start date is after, create a new file name with version 1 (v1)
         elif start_datetime > file_datetime:
-            pathslst = paths.split(' ')
-            pathslst[position] = start_date
-            pathslst[-1] = "v1" + extension
-            newpaths = ' '.join(pathslst)
-            return newpaths
+            return f"{paths[:file_date.start()]}{start_date}{paths[file_date.end():version.start()]} v1{extension}"
         elif start_datetime < file_datetime:
             return "There is apparently a more recent proposed plan"
+
+
+class _ChunkNames:
+    def __init__(self):
+        """
+        Task names of the chunks streamed into a packer, looked up by the position of the task in the whole
+        to-do list. A chunk is forgotten once all its tasks were handed out (and no split task can still
+        come back to it)
+        """
+        # Sorted start positions of the chunks still kept
+        self.starts = []
+        # start position -> [names, which of them were handed out, how many are left]
+        self.chunks = {}
+        self.end = 0
+        # Largest position handed out so far
+        self.last = -1
+
+    def add(self, names):
+        self.starts.append(self.end)
+        self.chunks[self.end] = [names, np.zeros(len(names), dtype=bool), len(names)]
+        self.end += len(names)
+
+    def take(self, positions):
+        """Returns the names of the tasks at 'positions'"""
+        if len(positions) == 0:
+            return np.array([], dtype=object)
+        low, high = int(positions.min()), int(positions.max())
+        first = bisect_right(self.starts, low) - 1
+        if bisect_right(self.starts, high) - 1 == first:
+            # Usual case, every task of the day comes from the same chunk
+            chunk_of = np.full(len(positions), self.starts[first])
+        else:
+            starts = np.array(self.starts)
+            chunk_of = starts[np.searchsorted(starts, positions, side="right") - 1]
+        result = np.empty(len(positions), dtype=object)
+        for chunk_start in np.unique(chunk_of).tolist():
+            mask = chunk_of == chunk_start
+            local = positions[mask] - chunk_start
+            chunk = self.chunks[chunk_start]
+            result[mask] = chunk[0][local]
+            chunk[2] -= int((~chunk[1][local]).sum())
+            chunk[1][local] = True
+        self.last = max(self.last, high)
+        # Forgetting the finished chunks at the front
+        while self.starts:
+            names, seen, left = self.chunks[self.starts[0]]
+            if left > 0 or self.starts[0] + len(names) > self.last:
+                break
+            del self.chunks[self.starts.pop(0)]
+        return result
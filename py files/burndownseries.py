@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+from taskstore import TaskStore
+from dates import NO_DAY, parse_days, format_days, to_day
+
+# Everything here works on dataframes and returns numpy arrays, the plotting itself is left to BurndownChart
+
+
+def plan_bars(plan):
+    """
+    Bars of the proposed burndown chart: the hours left at the start of every day of the plan
+
+    Parameters:
+        plan - plan from 'see_new_plan' or a saved Proposed file (with or without its (Day, Task) index)
+
+    Returns:
+        tuple - 2 arrays (dates as 'YYYY-MM-DD' strings, hours left)
+    """
+    plan = _flat(plan)
+    # First row of every day (the task-less row on the start date, that holds the total)
+    first = plan.groupby("Day", sort=True)["Amount Left"].first()
+    return first.index.to_numpy(dtype=str), first.to_numpy(dtype=float)
+
+
+def daily_remaining(plan):
+    """
+    Same as 'plan_bars', but with one value per calendar day from the first to the last day of the plan.
+    Days without tasks keep the hours left of the day before
+
+    Returns:
+        tuple - 2 arrays (dates as 'YYYY-MM-DD' strings, hours left)
+    """
+    dates, left = plan_bars(plan)
+    if len(dates) == 0:
+        return dates, left
+    days = parse_days(dates)
+    calendar = np.arange(days[0], days[-1] + 1, dtype=np.int32)
+    # Every calendar day takes the value of the last plan day on or before it
+    left = left[np.searchsorted(days, calendar, side="right") - 1]
+    return format_days(calendar).astype(str), left
+
+
+def completion_line(progress, total, start_date):
+    """
+    Actual burndown: hours left at the end of every day tasks were completed on. Task names that show up more
+    than once on the same day count once (with their mean ETA), and the line starts at 'total' minus what was
+    completed after the first task. Completed tasks without a day are left out
+
+    Parameters:
+        progress - Progress file dataframe (columns 'Day', 'Task', 'ETA', 'Completed'), or a TaskStore of it
+        total - hours of the whole plan
+        start_date - first day of the plan
+
+    Returns:
+        tuple - 3 arrays (dates as 'YYYY-MM-DD' strings, hours left, number of days since 'start_date')
+    """
+    if isinstance(progress, TaskStore):
+        # Days are already day numbers and tasks already have integer ids
+        done = progress.select(progress.completed & (progress.day != NO_DAY))
+        return completion_line_arrays(done.day, done.name_ids, done.names, done.hours(), total, start_date)
+
+    done = progress[progress["Completed"] == True]
+    days = parse_days(done["Day"])
+    done = done[days != NO_DAY]
+    task_codes, tasks = pd.factorize(done["Task"])
+    eta = pd.to_numeric(done["ETA"], errors="coerce").to_numpy(dtype=float)
+    return completion_line_arrays(days[days != NO_DAY], task_codes, np.asarray(tasks, dtype=object), eta, total,
+                                  start_date)
+
+
+def completion_line_arrays(days, task_codes, names, eta, total, start_date):
+    """
+    'completion_line' on arrays: day numbers, task codes (positions in 'names') and ETAs of the completed tasks.
+    For callers that keep the to-do list as arrays already (see 'watch.WatchSession')
+    """
+    if len(days) == 0:
+        return np.array([], dtype=str), np.array([]), np.array([], dtype=np.int64)
+
+    # Integer codes of days (sorted), so the (day, task) groups are found by hashing integers
+    day_codes, days = pd.factorize(days, sort=True)
+    n_names = max(len(names), 1)
+    pairs = day_codes.astype(np.int64) * n_names + task_codes
+    pair_eta = pd.Series(eta).groupby(pairs, sort=False).mean()
+    day_hours = np.bincount(pair_eta.index.to_numpy() // n_names, weights=pair_eta.to_numpy(), minlength=len(days))
+
+    # The first task (in day, then name order) is not subtracted
+    first_day = day_codes == 0
+    first_names = names[task_codes[first_day]]
+    first_eta = eta[first_day][first_names == first_names.min()].mean()
+    left = total - (np.cumsum(day_hours) - first_eta)
+
+    offsets = days.astype(np.int64) - to_day(start_date)
+    return format_days(days).astype(str), left, offsets
+
+
+def progress_status(planned_left, left, offsets):
+    """
+    How the completion line compares with the plan on the last day something was completed
+
+    Parameters:
+        planned_left - hours left on every day of the plan (see 'daily_remaining')
+        left - hours left of the completion line points
+        offsets - days since the start of the plan of the completion line points
+
+    Returns:
+        str - "Ahead", "On time" or "Behind", None if nothing was completed yet
+    """
+    if len(left) == 0 or len(planned_left) == 0:
+        return None
+    # Completions before the plan started are compared with its first day, after it ended with its last day
+    planned = planned_left[min(max(int(offsets[-1]), 0), len(planned_left) - 1)]
+    return "Ahead" if left[-1] < planned else "On time" if left[-1] == planned else "Behind"
+
+
+def velocity_line(offsets, left, n_days):
+    """
+    Burndown velocity: line of best fit of the completion line, extended from the last completion day to the
+    end of the plan
+
+    Parameters:
+        offsets - days since the start of the plan of the completion line points
+        left - hours left of the completion line points
+        n_days - number of days of the plan
+
+    Returns:
+        tuple - 2 arrays (x values in days since the start of the plan, y values)
+    """
+    slope, intercept = np.polyfit(offsets, left, 1)
+    x = np.arange(offsets.max(), n_days)
+    return x, slope * x + intercept
+
+
+def _flat(plan):
+    """The plan with 'Day' and 'Task' as columns"""
+    return plan if "Day" in plan.columns else plan.reset_index()
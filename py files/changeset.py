@@ -0,0 +1,197 @@
+import numpy as np
+import pandas as pd
+from taskstore import TaskStore
+
+
+class Changeset:
+    def __init__(self, added, removed, completed, uncompleted, changes):
+        """
+        Everything that changed between two versions of the to-do list
+
+        Parameters:
+            added - dataframe of the rows that are only in the new list
+            removed - dataframe of the rows that are only in the old list
+            completed - dataframe of the rows that went from to-do to completed
+            uncompleted - dataframe of the rows that went from completed to to-do
+            changes - dataframe with one row per changed value,
+                      columns ["Task", "Occurrence", "Column", "Old Value", "New Value"]
+
+        Every dataframe has an "Occurrence" column: how many rows above it have the same task name. Together
+        with the task name it identifies a row, even when task names are repeated
+        """
+        self.added = added
+        self.removed = removed
+        self.completed = completed
+        self.uncompleted = uncompleted
+        self.changes = changes
+
+    def __len__(self):
+        return len(self.added) + len(self.removed) + len(self.completed) + len(self.uncompleted) + len(self.changes)
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    def task_messages(self):
+        """Lines describing the tasks that were completed, uncompleted, added or removed"""
+        for task in self.completed["Task"]:
+            yield f"Task Completed: {task}"
+        for task in self.uncompleted["Task"]:
+            yield f"Task Uncompleted: {task}"
+        for task, done in zip(self.removed["Task"], self.removed["Completed"]):
+            yield f"Task Removed from Completed: {task}" if done == True else f"Task Removed from To-Do: {task}"
+        for task, done in zip(self.added["Task"], self.added["Completed"]):
+            if done == True:
+                yield f"Task added to completed without being on to-do list: {task}"
+            else:
+                yield f"Task added to to-do list: {task}"
+
+    def change_messages(self):
+        """Lines describing every value that changed in a task that is in both lists"""
+        for task, column, old, new in self.changes[["Task", "Column", "Old Value", "New Value"]].itertuples(index=False):
+            yield f"\nDATA CHANGED,  \nTask:\t   {task} \nColumn:    {column} \nOld Value: {old} \nNew Value: {new}"
+
+    def events(self):
+        """
+        Everything in the changeset as a list of records (dictionaries), in the order the messages are shown.
+        Every record has a 'kind' ("completed", "uncompleted", "removed", "added" or "changed"), 'task',
+        'occurrence' and 'message', and the "changed" ones also 'column', 'old' and 'new'
+        """
+        events = []
+        for kind, rows in (("completed", self.completed), ("uncompleted", self.uncompleted),
+                           ("removed", self.removed), ("added", self.added)):
+            events += [{"kind": kind, "task": task, "occurrence": occurrence}
+                       for task, occurrence in zip(rows["Task"].tolist(), rows["Occurrence"].tolist())]
+        for event, message in zip(events, self.task_messages()):
+            event["message"] = message
+        # Going through plain lists, this is called with tens of thousands of changes
+        changes = self.changes
+        events += [{"kind": "changed", "task": task, "occurrence": occurrence, "column": column, "old": old,
+                    "new": new, "message": f"\nDATA CHANGED,  \nTask:\t   {task} \nColumn:    {column} "
+                                          f"\nOld Value: {old} \nNew Value: {new}"}
+                   for task, occurrence, column, old, new in zip(changes["Task"].tolist(),
+                                                                 changes["Occurrence"].tolist(),
+                                                                 changes["Column"].tolist(),
+                                                                 changes["Old Value"].tolist(),
+                                                                 changes["New Value"].tolist())]
+        return events
+
+
+def diff_tasks(df, ndf):
+    """
+    Compares two versions of the to-do list with a single outer merge. Tasks are matched on their name,
+    and repeated names are matched in the order they appear (first with first, second with second...)
+
+    Parameters:
+        df - old task list (dataframe, or TaskStore)
+        ndf - new task list (dataframe, or TaskStore)
+
+    Returns:
+        Changeset
+    """
+    if isinstance(df, TaskStore) and isinstance(ndf, TaskStore):
+        return _diff_stores(df, ndf)
+
+    # Turning task names into integers once (hashing, no string sorting), numbering repeated names
+    # so every row gets a unique integer key
+    codes, names = pd.factorize(pd.concat([df["Task"], ndf["Task"]], ignore_index=True), sort=False)
+    old = df.drop(columns="Task").assign(_key=_row_keys(codes[:len(df)], len(names)))
+    new = ndf.drop(columns="Task").assign(_key=_row_keys(codes[len(df):], len(names)))
+    merged = pd.merge(old, new, how="outer", on="_key", suffixes=("_old", "_new"), indicator=True)
+    merged["Task"] = np.asarray(names, dtype=object)[merged["_key"].to_numpy() % max(len(names), 1)]
+    merged["Occurrence"] = merged["_key"].to_numpy() // max(len(names), 1)
+
+    columns = [i for i in df.columns if i != "Task" and i in ndf.columns]
+    side = merged["_merge"].to_numpy()
+    removed = _side_rows(merged, side == "left_only", df.columns, "_old")
+    added = _side_rows(merged, side == "right_only", ndf.columns, "_new")
+
+    # Comparing every column of the tasks that are in both lists
+    both = merged[side == "both"]
+    tasks = both["Task"].to_numpy()
+    occurrences = both["Occurrence"].to_numpy()
+    changes = []
+    for col in columns:
+        old_values = both[col + "_old"].to_numpy()
+        new_values = both[col + "_new"].to_numpy()
+        mask = old_values != new_values
+        if mask.any():
+            changes.append(pd.DataFrame({"Task": tasks[mask], "Occurrence": occurrences[mask], "Column": col,
+                                         "Old Value": old_values[mask], "New Value": new_values[mask]}))
+    if changes:
+        changes = pd.concat(changes, ignore_index=True)
+    else:
+        changes = pd.DataFrame(columns=["Task", "Occurrence", "Column", "Old Value", "New Value"])
+
+    completed, uncompleted = both.iloc[:0][["Task", "Occurrence"]], both.iloc[:0][["Task", "Occurrence"]]
+    if "Completed" in columns:
+        was_done = both["Completed_old"].to_numpy() == True
+        is_done = both["Completed_new"].to_numpy() == True
+        completed = _side_rows(both, ~was_done & is_done, ndf.columns, "_new")
+        uncompleted = _side_rows(both, was_done & ~is_done, ndf.columns, "_new")
+    return Changeset(added, removed, completed, uncompleted, changes)
+
+
+def _diff_stores(old, new):
+    """'diff_tasks' on two TaskStores: rows are matched with an integer hash join, and the columns are
+    compared as plain bool/float32/int32 arrays. Values only become strings/objects in the Changeset"""
+    # Name codes shared by both stores (only the distinct names are hashed)
+    codes, names = pd.factorize(pd.concat([pd.Series(old.names), pd.Series(new.names)]), sort=False)
+    n_names = max(len(names), 1)
+    old_keys = _row_keys(codes[:len(old.names)][old.name_ids], len(names))
+    new_keys = _row_keys(codes[len(old.names):][new.name_ids], len(names))
+    # Row of the old list of every row of the new list (-1 if the row was added)
+    position = pd.Index(old_keys).get_indexer(new_keys)
+
+    # Same order as the outer merge (by key)
+    new_rows = np.flatnonzero(position >= 0)
+    new_rows = new_rows[np.argsort(new_keys[new_rows], kind="stable")]
+    old_rows = position[new_rows]
+    removed = np.ones(len(old), dtype=bool)
+    removed[old_rows] = False
+    removed = np.flatnonzero(removed)
+    added = np.flatnonzero(position < 0)
+
+    def rows(store, keys, positions):
+        df = store.select(positions).to_frame()
+        df["Occurrence"] = keys[positions] // n_names
+        return df
+
+    removed = rows(old, old_keys, removed[np.argsort(old_keys[removed], kind="stable")])
+    added = rows(new, new_keys, added[np.argsort(new_keys[added], kind="stable")])
+
+    tasks = new.select(new_rows).task_names()
+    occurrences = new_keys[new_rows] // n_names
+    old_eta, new_eta = old.eta[old_rows], new.eta[new_rows]
+    masks = {"Completed": old.completed[old_rows] != new.completed[new_rows],
+             "ETA": (old_eta != new_eta) & ~(np.isnan(old_eta) & np.isnan(new_eta)),
+             "Day": old.day[old_rows] != new.day[new_rows]}
+    changes = []
+    for col, mask in masks.items():
+        if mask.any():
+            before, after = old.select(old_rows[mask]).to_frame(), new.select(new_rows[mask]).to_frame()
+            changes.append(pd.DataFrame({"Task": tasks[mask], "Occurrence": occurrences[mask], "Column": col,
+                                         "Old Value": before[col].to_numpy(dtype=object),
+                                         "New Value": after[col].to_numpy(dtype=object)}))
+    if changes:
+        changes = pd.concat(changes, ignore_index=True)
+    else:
+        changes = pd.DataFrame(columns=["Task", "Occurrence", "Column", "Old Value", "New Value"])
+
+    was_done, is_done = old.completed[old_rows], new.completed[new_rows]
+    completed = rows(new, new_keys, new_rows[~was_done & is_done])
+    uncompleted = rows(new, new_keys, new_rows[was_done & ~is_done])
+    return Changeset(added, removed, completed, uncompleted, changes)
+
+
+def _side_rows(merged, mask, columns, suffix):
+    """Selects rows of the merged dataframe and gives the columns of one side their original names back"""
+    rows = merged[mask]
+    columns = list(columns) + ["Occurrence"]
+    return pd.DataFrame({col: rows[col + suffix if col + suffix in rows.columns else col].to_numpy() for col in columns})
+
+
+def _row_keys(codes, n_names):
+    """Key of every row: the task name code, plus how many times that name already appeared above it"""
+    occurrence = pd.Series(codes).groupby(codes, sort=False).cumcount().to_numpy()
+    return occurrence.astype(np.int64) * max(n_names, 1) + codes
@@ -0,0 +1,138 @@
+from concurrent.futures import ProcessPoolExecutor
+import io
+import os
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import PolyCollection
+from matplotlib.figure import Figure
+from dates import parse_days
+from burndownseries import plan_bars, daily_remaining, completion_line, velocity_line
+
+
+class ChartRenderer:
+    def __init__(self, figsize=(10, 6), dpi=80, max_labels=15):
+        """
+        Draws burndown charts without pyplot (Agg backend, nothing is shown and no global figure is kept).
+        One Figure is created and reused: every new chart only replaces the data of its bars and lines,
+        so rendering many projects in a row does not build a new figure each time
+
+        Parameters:
+            figsize - size of the figure in inches
+            dpi - dots per inch of the png files
+            max_labels - max number of dates written under the x-axis (drawing text is most of the rendering time)
+        """
+        self.max_labels = max_labels
+        self.figure = Figure(figsize=figsize, dpi=dpi, facecolor='w', edgecolor='k')
+        self.canvas = FigureCanvasAgg(self.figure)
+        self.axes = self.figure.add_subplot()
+        self.axes.tick_params(axis="x", labelrotation=90)
+        # Artists reused by every chart
+        self.bars = PolyCollection([], facecolors='lightgray', edgecolors='none')
+        self.axes.add_collection(self.bars)
+        self.line, = self.axes.plot([], [], linewidth=5, color="red")
+        self.velocity, = self.axes.plot([], [], color='black', linewidth=3, linestyle=':')
+        self.figure.subplots_adjust(bottom=0.22)
+
+    def draw(self, dates, left, line=None, velocity=None, title=""):
+        """
+        Puts new data in the chart
+
+        Parameters:
+            dates - array of 'YYYY-MM-DD' dates of the bars
+            left - array of hours left on those dates (height of the bars)
+            line - optional (days since the first date, hours left) arrays of the completion line
+            velocity - optional (days since the first date, hours left) arrays of the velocity line
+            title - title of the chart
+        """
+        dates = np.asarray(dates, dtype=str)
+        left = np.asarray(left, dtype=float)
+        # Bars are placed on the number of days since the first date
+        days = parse_days(dates, format="%Y-%m-%d")
+        x = (days - days[0]).astype(np.int64) if len(dates) else np.array([], dtype=np.int64)
+        verts = np.empty((len(x), 4, 2))
+        verts[:, :, 0] = x[:, None] + np.array([-0.4, -0.4, 0.4, 0.4])
+        verts[:, :, 1] = np.column_stack([np.zeros(len(x)), left, left, np.zeros(len(x))])
+        self.bars.set_verts(verts)
+        self.line.set_data(*(line if line is not None else ([], [])))
+        self.velocity.set_data(*(velocity if velocity is not None else ([], [])))
+
+        # Limits and date labels
+        n_days = int(x[-1]) + 1 if len(x) else 1
+        self.axes.set_xlim(-1, n_days)
+        self.axes.set_ylim(0, (left.max() if len(left) else 0) + 10)
+        step = max(1, -(-len(x) // self.max_labels))
+        self.axes.set_xticks(x[::step])
+        self.axes.set_xticklabels(dates[::step])
+        self.axes.set_title(title)
+
+    def draw_plan(self, plan, progress=None, title=None):
+        """
+        Draws the burndown chart of a plan, and the progress made on it if a Progress dataframe is given
+        (the same charts as BurndownChart.create_burndown_chart and check_bdc_progress)
+        """
+        if progress is None:
+            dates, left = plan_bars(plan)
+            line = velocity = None
+        else:
+            flat = plan if "Day" in plan.columns else plan.reset_index()
+            dates, left = daily_remaining(flat)
+            _, line_left, offsets = completion_line(progress, flat["ETA"].sum(), dates[0])
+            line = (offsets, line_left)
+            velocity = velocity_line(offsets, line_left, len(dates)) if len(offsets) > 1 else None
+        if title is None:
+            title = f"Plan from {dates[0]} to {dates[-1]}" if len(dates) else ""
+        self.draw(dates, left, line, velocity, title)
+
+    def save(self, file, fmt=None):
+        """Writes the chart to a file, the format ('png', 'svg', ...) is taken from the extension by default"""
+        if fmt is None:
+            fmt = os.path.splitext(str(file))[1][1:].lower() or "png"
+        self._savefig(file, fmt)
+        return file
+
+    def to_bytes(self, fmt="png"):
+        """Returns the chart as the bytes of a png/svg/... file"""
+        buffer = io.BytesIO()
+        self._savefig(buffer, fmt)
+        return buffer.getvalue()
+
+    def _savefig(self, file, fmt):
+        # Light png compression, the default level takes longer than drawing the chart
+        kwargs = {"pil_kwargs": {"compress_level": 1}} if fmt == "png" else {}
+        self.figure.savefig(file, format=fmt, **kwargs)
+
+
+# Renderer of each process of 'render_batch', created once per process
+_worker_renderer = None
+
+
+def render_batch(jobs, processes=None, figsize=(10, 6), dpi=80):
+    """
+    Renders the burndown charts of many projects across a pool of processes. Every process reuses a
+    single ChartRenderer for all the charts it renders
+
+    Parameters:
+        jobs - iterable of (file, plan, progress) tuples. 'progress' can be None for a chart of the plan only
+        processes - number of processes (number of CPUs by default)
+        figsize, dpi - see ChartRenderer
+
+    Returns:
+        list - names of the files written, in the order of 'jobs'
+    """
+    jobs = list(jobs)
+    if processes is None:
+        processes = os.cpu_count() or 1
+    chunksize = max(1, len(jobs) // (4 * processes))
+    with ProcessPoolExecutor(processes, initializer=_start_worker, initargs=(figsize, dpi)) as pool:
+        return list(pool.map(_render_job, jobs, chunksize=chunksize))
+
+
+def _start_worker(figsize, dpi):
+    global _worker_renderer
+    _worker_renderer = ChartRenderer(figsize, dpi)
+
+
+def _render_job(job):
+    file, plan, progress = job
+    _worker_renderer.draw_plan(plan, progress)
+    return _worker_renderer.save(file)
@@ -0,0 +1,102 @@
+import argparse
+import os
+import sys
+
+# Command line of the common workflows. Only argparse is imported up front: pandas and the planner are
+# imported by the command that runs, and matplotlib only when a chart is drawn (see 'plotting'), so
+# 'python cli.py --help' or a cron job that only diffs tasks never pays for them
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Plan a to-do list into workdays and track its burndown")
+    parser.add_argument("--directory", default=".", help="project folder (where the saved files are)")
+    parser.add_argument("--file", default="todo.csv", help="to-do list csv, in the project folder")
+    parser.add_argument("--dayfirst", action="store_true", help="read dates such as 09/11/2020 day first "
+                                                                    "(9 November) instead of month first")
+    parser.add_argument("--metrics", help="write timings and counters of the run to this file (Prometheus text)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    diff = commands.add_parser("diff", help="show what changed in the to-do list since the last save")
+    diff.add_argument("--save", action="store_true", help="save the changes as the new Tasks file")
+
+    plan = commands.add_parser("plan", help="plan the incomplete tasks into workdays")
+    plan.add_argument("start_date")
+    plan.add_argument("--hours", type=float, default=8, help="max hours in a workday")
+    plan.add_argument("--strategy", default="greedy", help="how tasks are packed into days (see daypacker.PACKERS)")
+    plan.add_argument("--save", action="store_true", help="save the plan as the new Proposed plan")
+    plan.add_argument("--chart", help="also write the burndown chart of the plan to this file (png, svg...)")
+
+    progress = commands.add_parser("progress", help="check the progress of the latest plan")
+    progress.add_argument("--hours", type=float, default=8, help="max hours in a workday")
+    progress.add_argument("--chart", default="Burndown progress.png", help="file the progress chart is written to")
+
+    watch = commands.add_parser("watch", help="keep the progress of the latest plan up to date while the to-do "
+                                              "list is edited")
+    watch.add_argument("--hours", type=float, default=8, help="max hours in a workday")
+    watch.add_argument("--chart", default="Burndown progress.png", help="file the progress chart is written to")
+    watch.add_argument("--debounce", type=float, default=0.2, help="seconds without a new save before updating")
+    watch.add_argument("--poll", action="store_true", help="check the file every half second instead of inotify")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    # Scheduled runs can be instrumented without changing their command: with BURNDOWN_METRICS set to a file name,
+    # the metrics of the run are written to that file as with --metrics (and BURNDOWN_PROFILE profiles it)
+    metrics = args.metrics or os.environ.get("BURNDOWN_METRICS")
+    if metrics:
+        import instrument
+        recorder = instrument.enable(os.environ.get("BURNDOWN_PROFILE") or None)
+    try:
+        return run(args)
+    finally:
+        if metrics:
+            recorder.write_prometheus(metrics)
+
+
+def run(args):
+    from datahandler import DataHandler
+    datahandler = DataHandler(args.file, directory=args.directory, dayfirst=args.dayfirst)
+
+    if args.command == "diff":
+        if args.save:
+            return datahandler.update_tasks_to_csv(confirm=True)
+        return datahandler.update_tasks(confirm=False)
+
+    from burndownchart import BurndownChart
+    chart = BurndownChart(args.hours)
+    chart.file = args.file
+    if args.command == "plan":
+        plan = chart.see_new_plan(datahandler.get_tasks_file(), args.start_date, strategy=args.strategy)
+        if args.save:
+            chart.save_new_plan(datahandler, plan, confirm=True)
+        if args.chart:
+            print(f"Chart written to '{chart.create_burndown_chart(plan, file=_chart_path(args))}'")
+        return plan
+
+    if args.command == "watch":
+        from watch import WatchSession, Watcher
+        watcher = Watcher(WatchSession(datahandler, chart, _chart_path(args)), args.debounce,
+                          inotify=False if args.poll else None)
+        try:
+            watcher.run()
+        except KeyboardInterrupt:
+            pass
+        return watcher.updates
+
+    chart.check_plan_progress(datahandler)
+    written = chart.check_bdc_progress(datahandler, file=_chart_path(args))
+    print(f"Chart written to '{written}'")
+    return written
+
+
+def _chart_path(args):
+    return os.path.join(args.directory, args.chart)
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    except Exception as error:
+        print(f"Error: {error}", file=sys.stderr)
+        raise SystemExit(1)
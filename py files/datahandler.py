@@ -1,28 +1,141 @@
+import asyncio
+import functools
+import numpy as np
 import pandas as pd
-from datetime import datetime, timedelta
-import glob
+from datetime import datetime
 import os
+from changeset import diff_tasks
+from artifactindex import ArtifactIndex
+from filecache import default_cache
+from snapshots import read_snapshot, write_snapshot, snapshot_name
+from history import TaskHistory
+from taskstore import TaskStore
+from sqlitestore import SqliteStore
+from dates import parse_days, format_days
+from events import PrintSink, confirmed, emit, info
+from instrument import timed, stage, count
+
+
+def _read_table(file):
+    """Reads a saved file (csv/txt, or a binary snapshot), filling Na values with blank strings"""
+    return read_snapshot(file)
+
+
+def _read_tasks(file, dayfirst=False):
+    """Reads a task list and standardizes its dates (ambiguous slash dates read day first with 'dayfirst')"""
+    df = _read_table(file)
+    # Parsing the dates (any format) into day numbers, and then back into 'YYYY-MM-DD' strings (for standardization)
+    df['Day'] = format_days(parse_days(df['Day'], dayfirst=dayfirst))
+    return df
+
+
+def _read_todo_list(file, dayfirst=False):
+    """Reads the to-do list, with all Completed Tasks at the top of the list followed by Not Completed Tasks"""
+    df = _read_tasks(file, dayfirst)
+    return pd.concat([df[df["Completed"] == True], df[df["Completed"] == False]]).reset_index(drop=True)
+
+
+def _read_todo_store(file, dayfirst=False):
+    """The to-do list as a TaskStore (Completed Tasks first), days are parsed by the store itself"""
+    store = TaskStore.from_frame(_read_table(file), dayfirst)
+    return store.select(np.argsort(~store.completed, kind="stable"))
+
+
+def _read_tasks_store(file, dayfirst=False):
+    return TaskStore.from_frame(_read_table(file), dayfirst)
+
 
 class DataHandler:
-    def __init__(self, file):
+    def __init__(self, file, cache=None, snapshot_format="csv", history=False, directory=None, sink=None,
+                 database=None, dayfirst=False):
+        # Folder of the project: relative file names are read from and saved in it (the current working
+        # directory by default). Giving it explicitly means nothing depends on the working directory
+        self.directory = os.path.abspath(os.getcwd() if directory is None else directory)
         self.file = file
-        self.path = os.getcwd() + '\\*'
-
-    def save_data(self, df):
+        self.path = self.directory + '\\*'
+        # Parsed files are kept here so every file is only parsed once (see 'filecache.FileCache')
+        self.cache = default_cache if cache is None else cache
+        # Format of the files this class saves: "csv" (.txt), "feather" or "parquet" (see 'snapshots.FORMATS')
+        self.snapshot_format = snapshot_format
+        # With history on, saves only store what changed instead of a full "Tasks" copy (see 'history.TaskHistory')
+        self.history = None
+        if history:
+            self.history = TaskHistory(self.directory, snapshot_format=snapshot_format)
+        # Last Changeset computed by 'update_tasks'
+        self.changeset = None
+        # Where change events and messages go, printed by default (see 'events' for loggers, callbacks...)
+        self.sink = PrintSink() if sink is None else sink
+        # With a database file, the Tasks, Proposed and Progress files are saved in it instead of the directory
+        # (see 'sqlitestore.SqliteStore'). The to-do list itself stays a csv
+        self.database = None
+        if database is not None:
+            self.database = database if isinstance(database, SqliteStore) else SqliteStore(self.full_path(database))
+        # Read ambiguous dates such as 09/11/2020 day first (9 November) instead of month first. Dates with a
+        # field over 12 are read the only way they can be whatever this is (see 'dates.parse_days')
+        self.dayfirst = dayfirst
+
+    @timed()
+    def save_data(self, df, changeset=None):
         """
-        Saves the dataframe to a csv in the same directory
+        Saves the dataframe to a csv in the same directory. With the task history on, only the changes
+        since the previous save are stored
         Parameters:
             df: dataframe
+            changeset: Changeset between the last saved list and 'df', if it was already computed
         Returns:
             str - file name
         """
+        if self.history is not None:
+            seq = self.history.record(df, changeset)
+            self.emit([info(f"Saved Data as: save {seq} of '{self.history.LOG}'")])
+            return self.history.LOG
+
         dt = datetime.now()
-        file = f"Tasks {dt.year}_{dt.month}_{dt.day}_{dt.hour}.txt"
-        df.to_csv(file, index=False)
-        string = "Saved Data as: " + file
-        print(string)
+        file = self.write_file(df, f"Tasks {dt.year}_{dt.month}_{dt.day}_{dt.hour}.txt")
+        self.emit([info("Saved Data as: " + file)])
         return file
 
+    def emit(self, events):
+        """Sends records (see 'events') to the sink of this class"""
+        emit(self.sink, events)
+
+    @timed()
+    def write_file(self, df, file):
+        """
+        Saves a dataframe in the snapshot format of this class (the extension of 'file' is changed to match it),
+        and lets the cache and the directory index know about it
+
+        Parameters:
+            df: dataframe
+            file: file name
+        Returns:
+            str - name of the file written
+        """
+        if self.database is not None and SqliteStore.kind_of(file) is not None:
+            count("files_written")
+            return self.database.write(df, file)
+        path = write_snapshot(df, self.full_path(file), self.snapshot_format)
+        count("files_written")
+        self.cache.invalidate(path)
+        self._artifact_index().add(path)
+        return snapshot_name(file, self.snapshot_format)
+
+    def _reader(self, function):
+        """
+        One of the '_read_...' functions reading dates the way this DataHandler does. The day first version has
+        its own name, so the cache never gives a file read one way to a DataHandler reading it the other way
+        """
+        if not self.dayfirst:
+            return function
+        reader = functools.partial(function, dayfirst=True)
+        reader.__name__ = function.__name__ + "_dayfirst"
+        return reader
+
+    def full_path(self, file):
+        """Path of a file of the project (relative names are in the project directory)"""
+        return os.path.join(self.directory, file)
+
+    @timed()
     def get_tasks_file(self, file=None):
         """
         Reads the to-do list (which is in csv format) and then sorts from Completed Tasks First
@@ -36,14 +149,52 @@ class DataHandler:
         if file is None:
             file = self.file
 
-        # Reading of CSV
-        df = pd.read_csv(self.file).fillna('')
-        # Converting "Yes" and "No" Values into True and False Booleans instead
-        df['Day'] = [str(i)[:10] for i in pd.to_datetime(df['Day']).fillna('')]
-        # Placing all Completed Tasks at the top of the list and then followed by Not Completed Tasks
-        df = pd.concat([df[df["Completed"] == True], df[df["Completed"] == False]]).reset_index(drop=True)
-        return df
+        # Reading of CSV (only parsed again if the file changed), Completed Tasks first
+        return self.cache.load(self.full_path(file), self._reader(_read_todo_list))
 
+    @timed()
+    def get_tasks_store(self, file=None):
+        """
+        Same as 'get_tasks_file', but returns a TaskStore (arrays instead of an object dataframe), which takes
+        a fraction of the memory on big to-do lists and can be given to 'diff_tasks' and 'see_new_plan'
+        """
+        if file is None:
+            file = self.file
+        return self.cache.load(self.full_path(file), self._reader(_read_todo_store))
+
+    def read_tasks_chunks(self, file=None, chunksize=100000, incomplete_only=True, date_format="%Y-%m-%d"):
+        """
+        Reads the to-do list a chunk at a time, for to-do lists too big to load at once. Columns are read with
+        explicit dtypes and dates are parsed in one vectorized step with a fixed format
+
+        Parameters:
+            file - csv file of the to-do list
+            chunksize - number of rows read at a time
+            incomplete_only - only keep the tasks that are not completed (the ones 'see_new_plan' needs)
+            date_format - format of the 'Day' column in the csv (None to infer it, see 'dates.parse_days')
+
+        Yields:
+            df - dataframe of at most 'chunksize' rows, same columns as 'get_tasks_file'
+        """
+        if file is None:
+            file = self.file
+
+        dtypes = {"Completed": "boolean", "Task": str, "ETA": "float64", "Day": str}
+        count("files_read")
+        count("bytes_read", os.path.getsize(self.full_path(file)))
+        for chunk in pd.read_csv(self.full_path(file), dtype=dtypes, usecols=list(dtypes), chunksize=chunksize):
+            count("rows_read", len(chunk))
+            completed = chunk["Completed"].fillna(False).to_numpy(dtype=bool)
+            if incomplete_only:
+                chunk = chunk[~completed]
+                completed = completed[~completed]
+            days = parse_days(chunk["Day"], dayfirst=self.dayfirst, format=date_format)
+            yield pd.DataFrame({"Completed": completed,
+                                "Task": chunk["Task"].fillna('').to_numpy(),
+                                "ETA": chunk["ETA"].fillna(0.0).to_numpy(),
+                                "Day": format_days(days)})
+
+    @timed()
     def get_latest_tasks_file(self):
         """
         This method searches for the latest copy of the to-do list that was saved and returns it
@@ -55,15 +206,48 @@ class DataHandler:
         Returns:
             df - dataframe
         """
+        # The task history has the latest version without reading any file
+        if self.history is not None and len(self.history):
+            return self.history.latest()
+
         # Calling function to get most recent file
         file = self._get_latest_file("Tasks")
-        # Reading csv and filling Na values with blank strings
-        df = pd.read_csv(file).fillna('')
-        # Converting date list into datetime objects, and then back into strings (for standardization)
-        df['Day'] = [str(i)[:10] for i in pd.to_datetime(df['Day']).fillna('')]
-        return df
+        if self.database is not None:
+            return self.read_file(file, normalize_days=True)
+        # Reading csv with standardized dates (only parsed again if the file changed)
+        return self.cache.load(self.full_path(file), self._reader(_read_tasks))
+
+    @timed()
+    def get_latest_tasks_store(self):
+        """Same as 'get_latest_tasks_file', but returns a TaskStore"""
+        if self.history is not None and len(self.history):
+            return TaskStore.from_frame(self.history.latest())
+        if self.database is not None:
+            return TaskStore.from_frame(self.read_file(self._get_latest_file("Tasks")))
+        return self.cache.load(self.full_path(self._get_latest_file("Tasks")), self._reader(_read_tasks_store))
+
+    @timed()
+    def read_file(self, file, normalize_days=False):
+        """
+        Reads one of the saved files (Proposed plan, Progress...) through the cache, so reading the same
+        file several times during a progress check only parses it once
 
-    def update_tasks(self, file=None):
+        Parameters:
+            file - name of the file
+            normalize_days - standardize the 'Day' column into YYYY-MM-DD strings
+
+        Returns:
+            df - dataframe
+        """
+        if self.database is not None and file in self.database:
+            # Dates are saved as day numbers, they always come back as YYYY-MM-DD strings
+            df = self.database.read(file)
+            count("rows_read", len(df))
+            return df
+        return self.cache.load(self.full_path(file), self._reader(_read_tasks) if normalize_days else _read_table)
+
+    @timed()
+    def update_tasks(self, file=None, confirm=None):
         """
         There are two types of task files:
             1. CSV where changes are updated
@@ -80,6 +264,13 @@ class DataHandler:
         New Value: True
         Are you sure you want to continue with the above changes? y/n
 
+        Parameters:
+            file - to-do list
+            confirm - None to ask before accepting the changes, True/False to accept/refuse them without asking,
+                      or a function that gets the Changeset and returns True/False
+
+        The changes are sent to the sink of this class in one batch (records from 'Changeset.events')
+
         Returns:
             Original Dataset if nothing is changed
             tuple of dataset with a counter
@@ -93,67 +284,21 @@ class DataHandler:
         # Getting updating task list, ndf (new dataframe)
         ndf = self.get_tasks_file(file)
 
-        # Creating a copy of both dataframes
-        # Setting the index of both dataframes as the task for easier coding
-        # It will be changed back once the comparison is done
-        df2 = df.set_index("Task")
-        ndf2 = ndf.set_index("Task")
-        totalcount, counter2 = 0, 0
-
-        # Dataframes without task as index, split into completed and not completed
-        dftrue = df2[df2["Completed"] == True]
-        ndftrue = ndf2[ndf2["Completed"] == True]
-        dffalse = df2[df2["Completed"] == False]
-        ndffalse = ndf2[ndf2["Completed"] == False]
-
-        # Iterating through originally to-do tasks
-        for i in dffalse.index:
-            # Checking if tasks went from to-do to completed
-            if i not in ndffalse.index and i in ndftrue.index:
-                print(f"Task Completed: {i}")
-                counter2 += 1
-            # Checking if tasks went from to-do to being removed completely
-            if i not in ndffalse.index and i not in ndftrue.index:
-                print(f"Task Removed from To-Do: {i}")
-                counter2 += 1
-
-        for i in dftrue.index:
-            # Checking if task went from completed to to-do
-            if i not in ndftrue.index and i in ndffalse.index:
-                print(f"Task Uncompleted: {i}")
-                counter2 += 1
-            # Checking if tasks went from completed to being removed completely
-            if i not in ndffalse.index and i not in ndftrue.index:
-                print(f"Task Removed from Completed: {i}")
-                counter2 += 1
-
-        # Iterating through the new to-do list
-        for i in ndffalse.index:
-            # Checking to see any new to-do's that weren't in the original to-do
-            if i not in dffalse.index and i not in dftrue.index:
-                print(f"Task added to to-do list: {i}")
-                counter2 += 1
-
-        # Iterating through the new completed list
-        for i in ndftrue.index:
-            # Checking to see if anything got added to "completed" without being a to-do first
-            if i not in dffalse.index and i not in dftrue.index:
-                print(f"Task added to completed without being on to-do list: {i}")
-                counter2 += 1
-
-        # Calling function that sees if any values were changed
-        taskdf, counter = self._data_change_tracker(df, ndf)
-
-        # If any changes were made, the counters should have integer values
-        totalcount = counter + counter2
-        if totalcount == 0:
-            print("\nNothing happened")
+        # Comparing both lists in one go, then showing what changed
+        with stage("DataHandler.update_tasks.diff"):
+            changeset = diff_tasks(df, ndf)
+        count("rows_processed", len(df) + len(ndf))
+        self.changeset = changeset
+        self._data_change_tracker(changeset)
+
+        # If any changes were made, the changeset is not empty
+        if changeset.empty:
+            self.emit([info("\nNothing happened")])
             return df, 1
         else:
             # The changes are shown in a printout, and the following question is asked
-            inputs = input("Are you sure you want to continue with the above changes? y/n")
-            if inputs in ["Y", "y", "yes", "Yes", "YES", "YEs"]:
-                print("Items added to new list!")
+            if confirmed(confirm, "Are you sure you want to continue with the above changes? y/n", changeset):
+                self.emit([info("Items added to new list!")])
 
 
 #                 # Merging completed and to-do list
@@ -161,51 +306,98 @@ class DataHandler:
                 return ndf, 0
 
             else:
-                print("Returning original dataset")
+                self.emit([info("Returning original dataset")])
                 return df, 1
 
-    def update_tasks_to_csv(self, file=None):
+    @timed()
+    def update_tasks_to_csv(self, file=None, confirm=None):
         """
         Wrapper function of "update_tasks" function. This one saves changes as a csv
         """
         if file is None:
             file = self.file
 
-        df, count = self.update_tasks(file)
+        df, count = self.update_tasks(file, confirm)
         if count == 1:
-            print("Nothing was saved")
+            self.emit([info("Nothing was saved")])
             return None
-        text = self.save_data(df)
+        text = self.save_data(df, self.changeset)
         return df, count
 
-    def _data_change_tracker(self, df, ndf):
-        """Checks to see if any specific values of the table have been changed
+    async def in_thread(self, function, *args, **kwargs):
+        """Runs a (blocking) function in the thread pool of the event loop and waits for it"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, functools.partial(function, *args, **kwargs))
+
+    @timed()
+    async def get_tasks_file_async(self, file=None):
+        """Async version of 'get_tasks_file', the file is read and parsed in a thread"""
+        return await self.in_thread(self.get_tasks_file, file)
+
+    @timed()
+    async def get_latest_tasks_file_async(self):
+        """Async version of 'get_latest_tasks_file'"""
+        return await self.in_thread(self.get_latest_tasks_file)
+
+    @timed()
+    async def read_file_async(self, file, normalize_days=False):
+        """Async version of 'read_file'"""
+        return await self.in_thread(self.read_file, file, normalize_days)
+
+    @timed()
+    async def read_latest_file_async(self, first_word, normalize_days=False):
+        """Looks up the latest file with 'first_word' in its name and reads it, both in a thread"""
+        file = await self.in_thread(self._get_latest_file, first_word)
+        return await self.read_file_async(file, normalize_days)
+
+    @timed()
+    async def write_file_async(self, df, file):
+        """Async version of 'write_file' (the file is written under a temporary name, then renamed)"""
+        return await self.in_thread(self.write_file, df, file)
+
+    @timed()
+    def get_tasks_as_of(self, timestamp):
+        """
+        Rebuilds the task list as it was saved at a given time (needs the task history to be on)
+
+        Parameters:
+            timestamp - str or datetime
+
+        Returns:
+            df - dataframe
+        """
+        if self.history is None:
+            raise Exception("The task history is off. Create the DataHandler with history=True")
+        return self.history.as_of(timestamp)
+
+    def _data_change_tracker(self, changeset):
+        """Sends the tasks and values of the table that have been changed to the sink, in one batch
            Parameters:
-               df: old task list
-               ndf: new task list
-
-            Returns: Combined dataframe of both old and new dataframes
-        """
-
-        taskdf = df.merge(ndf, how="inner", on="Task").set_index("Task")
-        col = taskdf.columns.values
-        counter = 0
-        #
-        for i in range(int(len(col) / 2)):
-            check = (taskdf[col[i]] == taskdf[col[i + int(len(col) / 2)]])
-            if (check).all() == False:
-                counter += 1
-                for j in check.index:
-                    if check[j] == False:
-                        value = taskdf.loc[j][[col[i], col[i + int(len(col) / 2)]]].values
-                        print(
-                            f"\nDATA CHANGED,  \nTask:\t   {j} \nColumn:    {col[i][:-2]} \nOld Value: {value[0]} \nNew Value: {value[1]}")
-        if counter == 0:
-            print("\nData is identical. No Data changed")
-        return taskdf, counter
+               changeset: Changeset of the old and new task lists (see 'changeset.diff_tasks')
+
+            Returns: dataframe of the changed values, one row per task and column
+        """
+        events = changeset.events()
+        if len(changeset.changes) == 0:
+            events.append(info("\nData is identical. No Data changed"))
+        self.emit(events)
+        return changeset.changes
+
+    def get_latest_file(self, first_word):
+        """
+        Name of the latest saved file of a kind ("Tasks", "Proposed", "Progress"...), from the database when
+        the DataHandler has one
+
+        Returns:
+            str - name of the file, None if there is none
+        """
+        if self.database is not None and SqliteStore.kind_of(first_word) is not None:
+            return self.database.latest(first_word)
+        return self._artifact_index().latest(first_word)
 
+    @timed()
     def _get_latest_file(self, first_word, path=None):
-        """Gets the name of the most recently modified .txt file in the directory.
+        """Gets the name of the most recently modified .txt file in the directory (through the ArtifactIndex).
             Parameters
                 first_word - the first word of the file. This is to minimize risk of picking a the wrong
                             .txt file that happened to be modified recently
@@ -217,17 +409,20 @@ class DataHandler:
         if path is None:
             path = self.path
 
-        list_of_files = glob.iglob(path)  # * means all if need specific format then *.csv
-        latest_file = sorted(list_of_files, key=os.path.getctime)
-        latest_file = [i.split("\\")[-1] for i in latest_file]  # Slicing
-        # Gathering list of files that are under the first name
-        latest_file2 = [i for i in latest_file if first_word in i]
-        #         inputs = input(f"File read was {latest_file[-1]}. Proceed? (y/n): ")
-        #         if inputs in ["Y","y","yes","Yes","YES", "YEs"]:
-        #             return latest_file[-1]
-        #         else:
-        #             return "Canceled operation"
-
-        if len(latest_file2) == 0:
+        if self.database is not None and SqliteStore.kind_of(first_word) is not None:
+            latest_file = self.database.latest(first_word)
+            if latest_file is None:
+                return f"No files of word {first_word} in the database {self.database.file}"
+            return latest_file
+
+        # Looking it up in the directory index instead of listing and sorting the whole folder every time
+        latest_file = self._artifact_index(path).latest(first_word)
+        if latest_file is None:
             return f"No files of word {first_word} in the path {path}"
-        return latest_file2[-1]
+        return latest_file
+
+    def _artifact_index(self, path=None):
+        """Gets the shared ArtifactIndex of the directory the files are saved in"""
+        if path is None:
+            path = self.path
+        return ArtifactIndex.for_directory(ArtifactIndex.directory_of(path))
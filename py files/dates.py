@@ -0,0 +1,144 @@
+import threading
+import numpy as np
+import pandas as pd
+
+# Dates are kept as int32 day numbers (days since 1970-01-01) everywhere inside the package, and only turned
+# into 'YYYY-MM-DD' strings when something is written or shown
+
+# Day number of a missing or unreadable date
+NO_DAY = np.iinfo(np.int32).min
+
+# 'YYYY-MM-DD' strings already parsed (the format every file of the package is saved in), shared by all reads
+_iso_cache = {}
+_iso_cache_size = 100000
+_iso_cache_lock = threading.Lock()
+
+
+def parse_days(values, dayfirst=False, format=None):
+    """
+    Turns dates (strings in any of the usual formats, Timestamps, datetime.date...) into day numbers. Each
+    distinct value is only parsed once, so a million rows spread over a few hundred dates cost a few hundred
+    parses
+
+    Strings can be 'YYYY-MM-DD' (time of day ignored), or 'MM/DD/YYYY' (also with '.' or '-'). A slash date
+    with a field over 12 can only be read one way ('25/9/2020' is 25 September whatever 'dayfirst' is), the
+    others are read 'DD/MM/YYYY' when 'dayfirst' is set. Each value is read on its own, so a date gives the same
+    day whatever other dates it is read with. Anything else goes through pandas
+
+    Parameters:
+        values - list, array or Series of dates
+        dayfirst - read ambiguous slash dates such as '09/11/2020' day first (9 November) instead of month first
+        format - strftime format of all the dates, skips the format inference
+
+    Returns:
+        array - int32 day numbers (NO_DAY where there is no date)
+    """
+    codes, uniques = pd.factorize(pd.Series(values, dtype=object) if not isinstance(values, pd.Series) else values)
+    if format is not None:
+        parsed = pd.to_datetime(pd.Series(uniques, dtype=object), format=format, errors="coerce")
+        numbers = _to_numbers(parsed)
+    else:
+        numbers = _parse_unique(pd.Series(uniques, dtype=object), dayfirst)
+    # Missing values (code -1) take the appended NO_DAY
+    return np.append(numbers, NO_DAY).astype(np.int32)[codes]
+
+
+def format_days(days):
+    """
+    Turns day numbers back into 'YYYY-MM-DD' strings ('' for NO_DAY), formatting each distinct day once
+
+    Returns:
+        array - object array of strings
+    """
+    codes, uniques = pd.factorize(np.asarray(days))
+    strings = np.datetime_as_string(np.asarray(uniques, dtype=np.int64).astype("datetime64[D]")).astype(object)
+    strings[np.asarray(uniques) == NO_DAY] = ''
+    return np.append(strings, '')[codes]
+
+
+def to_day(value):
+    """Day number of a single date (string, Timestamp, datetime, date or day number)"""
+    if isinstance(value, (int, np.integer)):
+        return int(value)
+    day = int(parse_days([value])[0])
+    if day == NO_DAY:
+        raise Exception(f"'{value}' is not a valid date")
+    return day
+
+
+def day_string(day):
+    """'YYYY-MM-DD' string of a single day number ('' for NO_DAY)"""
+    if day == NO_DAY:
+        return ''
+    return str(np.datetime64(int(day), 'D'))
+
+
+def today():
+    return int(np.datetime64(pd.Timestamp.today().date(), 'D').astype(np.int64))
+
+
+def day_range(start, n_days):
+    """Day numbers of 'n_days' consecutive days from 'start'"""
+    return np.arange(to_day(start), to_day(start) + n_days, dtype=np.int32)
+
+
+def _parse_unique(values, dayfirst):
+    """Day numbers of distinct values (a Series of objects)"""
+    numbers = np.full(len(values), NO_DAY, dtype=np.int64)
+    if len(values) == 0:
+        return numbers
+
+    # Dates that are already dates
+    is_date = values.map(lambda i: hasattr(i, "year")).to_numpy(dtype=bool)
+    if is_date.any():
+        numbers[is_date] = _to_numbers(pd.to_datetime(values[is_date], errors="coerce"))
+    strings = values[~is_date].astype(str).str.strip()
+    rest = np.flatnonzero(~is_date)
+
+    # 'YYYY-MM-DD' strings seen before
+    with _iso_cache_lock:
+        cached = strings.map(_iso_cache.get).to_numpy(dtype=object)
+    known = pd.notna(cached)
+    numbers[rest[known]] = cached[known].astype(np.int64)
+    strings, rest = strings[~known], rest[~known]
+
+    iso = strings.str.extract(r"^(\d{4})-(\d{1,2})-(\d{1,2})(?:[ T].*)?$").astype(float)
+    found = iso[0].notna().to_numpy()
+    if found.any():
+        parsed = _from_parts(iso[0][found], iso[1][found], iso[2][found])
+        numbers[rest[found]] = parsed
+        with _iso_cache_lock:
+            if len(_iso_cache) + len(parsed) > _iso_cache_size:
+                _iso_cache.clear()
+            _iso_cache.update(zip(strings[found], parsed.tolist()))
+
+    slash = strings.str.extract(r"^(\d{1,2})[/.-](\d{1,2})[/.-](\d{4})(?:[ T].*)?$").astype(float)
+    is_slash = slash[0].notna().to_numpy()
+    if is_slash.any():
+        first, second, year = slash[0][is_slash], slash[1][is_slash], slash[2][is_slash]
+        # Day first where only that reading is a valid date, month first where only that one is
+        day_first = (first > 12) | ((second <= 12) & dayfirst)
+        day, month = first.where(day_first, second), second.where(day_first, first)
+        numbers[rest[is_slash]] = _from_parts(year, month, day)
+
+    # Anything else (month names, ...), left to pandas
+    other = ~found & ~is_slash & (strings != '').to_numpy() & ~strings.str.lower().isin(["nan", "nat", "none"]).to_numpy()
+    if other.any():
+        parsed = pd.to_datetime(strings[other], errors="coerce", format="mixed", dayfirst=dayfirst)
+        numbers[rest[other]] = _to_numbers(parsed)
+    return numbers
+
+
+def _from_parts(year, month, day):
+    """Day numbers of year/month/day values (NO_DAY for impossible dates such as 31/02)"""
+    parts = pd.DataFrame({"year": np.asarray(year), "month": np.asarray(month), "day": np.asarray(day)})
+    return _to_numbers(pd.to_datetime(parts, errors="coerce"))
+
+
+def _to_numbers(dates):
+    """Day numbers of a datetime Series (NaT -> NO_DAY)"""
+    dates = pd.Series(dates)
+    days = dates.dt.tz_localize(None) if getattr(dates.dt, "tz", None) is not None else dates
+    numbers = days.to_numpy(dtype="datetime64[D]").astype(np.int64)
+    numbers[days.isna().to_numpy()] = NO_DAY
+    return numbers
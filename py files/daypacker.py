@@ -0,0 +1,512 @@
+from bisect import bisect_left, insort
+import numpy as np
+
+
+def greedy_swap(eta, max_hours):
+    """
+    Algorithm that takes task hours and fits them into 'max_hours' workdays. Tasks that do not fit are swapped
+    with the tasks after them that can still be completed that day (same behaviour as the original
+    BurndownChart._day_blocks, but on plain arrays with running day totals)
+
+    The whole run is a single pass over the tasks: every task is added to the running total once,
+    and the tasks pulled forward by a swap are consumed into the day right away.
+
+    Parameters:
+        eta - 1D array-like of task hours, in the order of the to-do list
+        max_hours - max hours in a workday
+
+    Returns:
+        tuple - 3 arrays
+            order - positions of the tasks in the order they get done
+            hours - hours of each of those tasks
+            bounds - day boundaries, day k holds order[bounds[k]:bounds[k + 1]]
+    """
+    return _collect(iter_greedy_swap([eta], max_hours))
+
+
+def iter_greedy_swap(chunks, max_hours):
+    """
+    Streaming version of 'greedy_swap': the task hours come in chunks (e.g. from a csv read with 'chunksize')
+    and every day is yielded as soon as it can't change anymore. Only the tasks of the current day and the
+    ones looked ahead at are kept in memory
+
+    Parameters:
+        chunks - iterable of 1D arrays of task hours, in the order of the to-do list
+        max_hours - max hours in a workday
+
+    Yields:
+        tuple - 2 arrays (positions of the tasks in the to-do list, hours of those tasks), one tuple per day
+    """
+    tasks = _TaskBuffer(chunks)
+    capacity = _Capacity(max_hours)
+    day, limit = 0, capacity[0]
+    freeze = 0
+    total = 0.0
+    i = 0
+    while True:
+        # 'total' is the sum of the hours between 'freeze' and 'i'
+        if total > limit:
+            base = total - tasks.hours(i - 1)
+            # Checking if the next task will be under the max hours once the overflowing task is taken out
+            if base + (tasks.hours(i) if tasks.has(i) else 0.0) < limit:
+                if not tasks.has(i):
+                    # Nothing left to pull, the overflowing task stays in the day (kept as-is for parity)
+                    yield tasks.take(freeze, i)
+                    freeze = i
+                    break
+                # Keeps pulling tasks until it reaches the max
+                day_total = base + tasks.hours(i)
+                increment = 1
+                while tasks.has(i + increment) and day_total + tasks.hours(i + increment) < limit:
+                    day_total += tasks.hours(i + increment)
+                    increment += 1
+                # Moving the overflowing task behind the pulled tasks (and the one that stopped the pull)
+                end = i + increment if tasks.has(i + increment) else i + increment - 1
+                tasks.move(i - 1, end)
+                yield tasks.take(freeze, i + increment - 1)
+                day, limit = day + 1, capacity[day + 1]
+                freeze = i + increment - 1
+                i = freeze + 1
+                total = tasks.hours(freeze)
+                continue
+            else:
+                # The overflowing task starts the next day
+                yield tasks.take(freeze, i - 1)
+                day, limit = day + 1, capacity[day + 1]
+                freeze = i - 1
+                if not tasks.has(i):
+                    break
+                i += 1
+                total = tasks.hours(freeze) + tasks.hours(i - 1)
+                continue
+        i += 1
+        if not tasks.has(i - 1):
+            break
+        total += tasks.hours(i - 1)
+    # Add the remaining tasks as the last day
+    yield tasks.take(freeze, tasks.end)
+
+
+class _TaskBuffer:
+    def __init__(self, chunks):
+        """
+        Window over a stream of task hours, addressed by the position of the task in the whole to-do list.
+        Chunks are only read when a position past the end of the window is asked for
+
+        Parameters:
+            chunks - iterable of 1D arrays of task hours
+        """
+        self.chunks = iter(chunks)
+        # Plain lists, indexing NumPy scalars one at a time is several times slower
+        self.positions = []
+        self.task_hours = []
+        # Position of the first task still in the window, and of the one after the last task read so far
+        self.start = 0
+        self.end = 0
+
+    def has(self, i):
+        """Whether there is a task at position 'i' (reading more chunks if needed)"""
+        while i >= self.end:
+            chunk = next(self.chunks, None)
+            if chunk is None:
+                return False
+            chunk = np.asarray(chunk, dtype=float).tolist()
+            self.positions.extend(range(self.end, self.end + len(chunk)))
+            self.task_hours.extend(chunk)
+            self.end += len(chunk)
+        return True
+
+    def hours(self, i):
+        return self.task_hours[i - self.start]
+
+    def move(self, i, j):
+        """Moves the task at position 'i' to position 'j', shifting the ones in between up by one"""
+        a, b = i - self.start, j - self.start
+        self.positions[a:b + 1] = self.positions[a + 1:b + 1] + [self.positions[a]]
+        self.task_hours[a:b + 1] = self.task_hours[a + 1:b + 1] + [self.task_hours[a]]
+
+    def take(self, i, j):
+        """Returns the tasks between positions 'i' and 'j' and forgets everything before 'j'"""
+        a, b = i - self.start, j - self.start
+        day = (np.array(self.positions[a:b], dtype=np.int64), np.array(self.task_hours[a:b]))
+        # Dropping the tasks already handed out once they make up most of the window (keeps it amortized O(1))
+        if b > len(self.positions) // 2:
+            del self.positions[:b]
+            del self.task_hours[:b]
+            self.start = j
+        return day
+
+
+class _Capacity:
+    def __init__(self, max_hours):
+        """
+        Hours of every day of a packer: 'max_hours' is a number (every day is the same) or an array with the
+        hours of each day in order (e.g. from 'WorkCalendar.workdays'). Days past the end of the array take
+        the hours of its last day
+        """
+        self.hours = np.asarray(max_hours, dtype=float)
+        self.same = self.hours.ndim == 0
+        if self.same:
+            self.value = float(self.hours)
+        else:
+            if len(self.hours) == 0:
+                raise Exception("No workday to plan on")
+            self.values = self.hours.tolist()
+
+    def __getitem__(self, day):
+        if self.same:
+            return self.value
+        return self.values[day] if day < len(self.values) else self.values[-1]
+
+    def first(self, n_days):
+        """Array of the hours of the first 'n_days' days"""
+        if self.same:
+            return np.full(n_days, self.value)
+        hours = self.hours[:n_days]
+        return np.concatenate([hours, np.full(n_days - len(hours), self.hours[-1])])
+
+    def covering(self, total):
+        """Hours of the first days, enough of them to hold 'total' hours (and one more day)"""
+        hours = self.hours
+        missing = total - hours.sum()
+        if missing >= 0:
+            hours = np.concatenate([hours, np.full(int(np.ceil(missing / hours[-1])) + 1, hours[-1])])
+        return hours
+
+
+def _collect(days):
+    """Turns the days yielded by a streaming packer into the (order, hours, bounds) arrays"""
+    days = list(days)
+    bounds = np.concatenate([[0], np.cumsum([len(i[0]) for i in days])]).astype(np.int64)
+    if not days:
+        return np.array([], dtype=np.int64), np.array([]), bounds
+    return np.concatenate([i[0] for i in days]), np.concatenate([i[1] for i in days]), bounds
+
+
+def next_fit(eta, max_hours):
+    """
+    Order-preserving packing: tasks are done strictly in the order of the to-do list, and a new day is
+    started as soon as the next task does not fit in the current one. Nothing is ever swapped.
+
+    Parameters:
+        eta - 1D array-like of task hours, in the order of the to-do list
+        max_hours - max hours in a workday
+
+    Returns:
+        tuple - 3 arrays (order, hours, bounds), see 'greedy_swap'
+    """
+    hours = np.asarray(eta, dtype=float)
+    n = len(hours)
+    capacity = _Capacity(max_hours)
+    bounds = [0]
+    total = 0.0
+    for i, task_hours in enumerate(hours.tolist()):
+        # Starting a new day if the task does not fit (a task longer than a day still gets a day of its own)
+        if total + task_hours > capacity[len(bounds) - 1] and i > bounds[-1]:
+            bounds.append(i)
+            total = 0.0
+        total += task_hours
+    bounds.append(n)
+    return np.arange(n), hours, np.array(bounds)
+
+
+def first_fit_decreasing(eta, max_hours):
+    """
+    Bin packing that places the longest tasks first, each in the earliest day that still has room for it.
+    The earliest day is found through a max-tree of the remaining hours of every day, so each task costs
+    O(log n). Tasks keep their to-do list order within a day.
+
+    Parameters:
+        eta - 1D array-like of task hours, in the order of the to-do list
+        max_hours - max hours in a workday
+
+    Returns:
+        tuple - 3 arrays (order, hours, bounds), see 'greedy_swap'
+    """
+    hours = np.asarray(eta, dtype=float)
+    n = len(hours)
+    size = 1
+    while size < max(n, 1):
+        size *= 2
+    capacity = _Capacity(max_hours)
+    # Leaves are days, every node holds the most hours left in any day below it. Days that were not
+    # opened yet hold -1, so a task only goes to a new day when no open day has room for it
+    tree = [-1.0] * (2 * size)
+    day = [0] * n
+    days_used = 0
+    task_list = hours.tolist()
+    for i in np.argsort(-hours, kind="stable").tolist():
+        task_hours = task_list[i]
+        if task_hours > tree[1]:
+            # Longer than any open day has left, so it gets a fresh day
+            node = size + days_used
+            tree[node] = capacity[days_used]
+        else:
+            node = 1
+            while node < size:
+                node = 2 * node if tree[2 * node] >= task_hours else 2 * node + 1
+        day[i] = node - size
+        days_used = max(days_used, day[i] + 1)
+        tree[node] = max(tree[node] - task_hours, 0.0)
+        node //= 2
+        while node:
+            tree[node] = max(tree[2 * node], tree[2 * node + 1])
+            node //= 2
+    return _group_by_day(hours, np.array(day, dtype=np.int64), days_used)
+
+
+def best_fit(eta, max_hours):
+    """
+    Bin packing that goes through the to-do list in order and puts each task in the day with the least
+    room left that still fits it. The remaining hours of the open days are kept in a sorted list, so
+    the best day is found with a binary search.
+
+    Parameters:
+        eta - 1D array-like of task hours, in the order of the to-do list
+        max_hours - max hours in a workday
+
+    Returns:
+        tuple - 3 arrays (order, hours, bounds), see 'greedy_swap'
+    """
+    hours = np.asarray(eta, dtype=float)
+    n = len(hours)
+    capacity = _Capacity(max_hours)
+    # Sorted (hours left, day) pairs of the days that still have room
+    free = []
+    day = [0] * n
+    days_used = 0
+    for i, task_hours in enumerate(hours.tolist()):
+        k = bisect_left(free, (task_hours, -1))
+        if k == len(free):
+            # No day has room for it, opening a new one
+            day[i], left = days_used, capacity[days_used] - task_hours
+            days_used += 1
+        else:
+            left, day[i] = free.pop(k)
+            left -= task_hours
+        if left > 0:
+            insort(free, (left, day[i]))
+    return _group_by_day(hours, np.array(day, dtype=np.int64), days_used)
+
+
+def spill(eta, max_hours):
+    """
+    Order-preserving packing where every day is filled up to 'max_hours' exactly. A task that does not fit
+    is split, and the rest of it spills over into the next day(s). Fully vectorized.
+
+    Parameters:
+        eta - 1D array-like of task hours, in the order of the to-do list
+        max_hours - max hours in a workday
+
+    Returns:
+        tuple - 3 arrays (order, hours, bounds), see 'greedy_swap'. A split task shows up once per day it
+        is worked on, with the hours done on that day
+    """
+    order, piece_hours, day = _spill_pieces(np.asarray(eta, dtype=float), max_hours)
+    days_used = int(day[-1]) + 1 if len(day) else 0
+    bounds = np.concatenate([[0], np.cumsum(np.bincount(day, minlength=days_used))])
+    return order, piece_hours, bounds
+
+
+def iter_next_fit(chunks, max_hours):
+    """
+    Streaming version of 'next_fit'
+
+    Parameters:
+        chunks - iterable of 1D arrays of task hours, in the order of the to-do list
+        max_hours - max hours in a workday
+
+    Yields:
+        tuple - 2 arrays (positions of the tasks in the to-do list, hours of those tasks), one tuple per day
+    """
+    capacity = _Capacity(max_hours)
+    day, day_start, position, total = 0, 0, 0, 0.0
+    day_hours = []
+    for chunk in chunks:
+        for task_hours in np.asarray(chunk, dtype=float).tolist():
+            if total + task_hours > capacity[day] and day_hours:
+                yield np.arange(day_start, position), np.array(day_hours)
+                day, day_start, total, day_hours = day + 1, position, 0.0, []
+            total += task_hours
+            day_hours.append(task_hours)
+            position += 1
+    yield np.arange(day_start, position), np.array(day_hours)
+
+
+def iter_spill(chunks, max_hours):
+    """
+    Streaming version of 'spill'. Each chunk is split in one vectorized step, only the last (unfinished)
+    day of a chunk is carried over to the next one
+
+    Parameters:
+        chunks - iterable of 1D arrays of task hours, in the order of the to-do list
+        max_hours - max hours in a workday
+
+    Yields:
+        tuple - 2 arrays (positions of the tasks in the to-do list, hours of those tasks), one tuple per day
+    """
+    done, first_position = 0.0, 0
+    # Unfinished day: (day number, positions, hours)
+    pending = None
+    for chunk in chunks:
+        hours = np.asarray(chunk, dtype=float)
+        order, piece_hours, day = _spill_pieces(hours, max_hours, done)
+        order += first_position
+        first_position += len(hours)
+        if len(hours):
+            # Carrying on the running total exactly like one cumsum over the whole list would
+            done = float(np.cumsum(np.concatenate([[done], hours]))[-1])
+        if len(day) == 0:
+            continue
+        # Splitting the pieces of the chunk by day
+        splits = np.flatnonzero(np.diff(day)) + 1
+        for positions, day_hours, days in zip(np.split(order, splits), np.split(piece_hours, splits),
+                                              np.split(day, splits)):
+            if pending is not None and pending[0] == days[0]:
+                pending = (days[0], np.concatenate([pending[1], positions]), np.concatenate([pending[2], day_hours]))
+                continue
+            if pending is not None:
+                yield pending[1], pending[2]
+            pending = (days[0], positions, day_hours)
+    if pending is not None:
+        yield pending[1], pending[2]
+
+
+def _spill_pieces(hours, max_hours, done=0.0):
+    """
+    Splits tasks at every multiple of 'max_hours' of the running total, or at the end of every day when
+    'max_hours' gives the hours of every day ('done' hours were already scheduled before the first task)
+
+    Returns:
+        tuple - 3 arrays (task of each piece, hours of each piece, day number of each piece)
+    """
+    ends = np.cumsum(np.concatenate([[done], hours]))[1:]
+    starts = ends - hours
+    if np.ndim(max_hours) == 0:
+        # Days each task is worked on
+        first = np.floor(starts / max_hours).astype(np.int64)
+        last = np.maximum(np.ceil(ends / max_hours).astype(np.int64) - 1, first)
+    else:
+        # Days of different lengths: the days end at the running total of their hours
+        day_ends = np.cumsum(_Capacity(max_hours).covering(ends[-1] if len(ends) else 0.0))
+        day_starts = np.concatenate([[0.0], day_ends])
+        first = np.searchsorted(day_starts, starts, side="right") - 1
+        last = np.maximum(np.searchsorted(day_starts, ends, side="left") - 1, first)
+    pieces = last - first + 1
+    order = np.repeat(np.arange(len(hours)), pieces)
+    day = np.repeat(first, pieces) + np.arange(len(order)) - np.repeat(np.cumsum(pieces) - pieces, pieces)
+    # Hours of each piece are the overlap of the task with its day
+    if np.ndim(max_hours) == 0:
+        piece_hours = (np.minimum(ends[order], (day + 1) * max_hours) - np.maximum(starts[order], day * max_hours))
+    else:
+        piece_hours = np.minimum(ends[order], day_starts[day + 1]) - np.maximum(starts[order], day_starts[day])
+    return order, np.maximum(piece_hours, 0.0), day
+
+
+def _group_by_day(hours, day, days_used):
+    """Turns a day number per task into the (order, hours, bounds) arrays, keeping the to-do list order within a day"""
+    order = np.argsort(day, kind="stable")
+    bounds = np.concatenate([[0], np.cumsum(np.bincount(day, minlength=days_used))])
+    return order, hours[order], bounds
+
+
+class PackResult:
+    def __init__(self, order, hours, bounds, max_hours):
+        """
+        Outcome of a packer
+
+        Parameters:
+            order - positions of the tasks (in the to-do list) in the order they get done
+            hours - hours of each of those tasks (only differs from the ETA when a task is split)
+            bounds - day boundaries, day k holds order[bounds[k]:bounds[k + 1]]
+            max_hours - max hours in a workday, or an array of the hours of every day
+        """
+        self.order = order
+        self.hours = hours
+        self.bounds = bounds
+        self.max_hours = max_hours
+
+    @property
+    def days(self):
+        """Number of days the plan takes"""
+        return len(self.bounds) - 1
+
+    @property
+    def counts(self):
+        """Number of tasks in each day"""
+        return np.diff(self.bounds)
+
+    @property
+    def day_hours(self):
+        """Hours of work assigned to each day"""
+        return np.bincount(np.repeat(np.arange(self.days), self.counts), weights=self.hours, minlength=self.days)
+
+    @property
+    def capacity(self):
+        """Hours available in each day"""
+        return _Capacity(self.max_hours).first(self.days)
+
+    @property
+    def hours_wasted(self):
+        """Hours left unused in each day"""
+        return np.maximum(self.capacity - self.day_hours, 0.0)
+
+    @property
+    def utilization(self):
+        """Fraction of the available hours that actually got work assigned"""
+        if self.days == 0:
+            return 1.0
+        return 1 - self.hours_wasted.sum() / self.capacity.sum()
+
+
+# Registry of the packing strategies 'see_new_plan' can use
+PACKERS = {
+    "greedy": greedy_swap,
+    "next_fit": next_fit,
+    "first_fit_decreasing": first_fit_decreasing,
+    "best_fit": best_fit,
+    "spill": spill,
+}
+
+
+# Packers that can work on a stream of chunks (the others need every task before deciding anything)
+STREAMING_PACKERS = {
+    "greedy": iter_greedy_swap,
+    "next_fit": iter_next_fit,
+    "spill": iter_spill,
+}
+
+
+def iter_days(chunks, max_hours, strategy="greedy"):
+    """
+    Splits a stream of task hours into workdays, yielding every day as soon as it is done
+
+    Parameters:
+        chunks - iterable of 1D arrays of task hours, in the order of the to-do list
+        max_hours - max hours in a workday, or an array of the hours of every day
+        strategy - name of the packer in STREAMING_PACKERS
+
+    Yields:
+        tuple - 2 arrays (positions of the tasks in the to-do list, hours of those tasks), one tuple per day
+    """
+    if strategy not in STREAMING_PACKERS:
+        raise Exception(f"Strategy '{strategy}' can't be streamed. Choose one of {list(STREAMING_PACKERS)}")
+    return STREAMING_PACKERS[strategy](chunks, max_hours)
+
+
+def pack(eta, max_hours, strategy="greedy"):
+    """
+    Splits tasks into workdays using one of the registered strategies
+
+    Parameters:
+        eta - 1D array-like of task hours, in the order of the to-do list
+        max_hours - max hours in a workday, or an array of the hours of every day (see 'WorkCalendar.workdays')
+        strategy - name of the packer in PACKERS
+
+    Returns:
+        PackResult
+    """
+    if strategy not in PACKERS:
+        raise Exception(f"Unknown strategy '{strategy}'. Choose one of {list(PACKERS)}")
+    order, hours, bounds = PACKERS[strategy](eta, max_hours)
+    return PackResult(order, hours, bounds, max_hours)
@@ -0,0 +1,174 @@
+import heapq
+import numpy as np
+import pandas as pd
+from daypacker import PackResult, _Capacity
+
+# Optional column of the to-do list: names of the tasks that have to be done first, separated by SEPARATOR
+DEPENDS_ON = "Depends On"
+SEPARATOR = ";"
+
+
+def has_dependencies(df):
+    """Whether the to-do list has a 'Depends On' column with at least one dependency in it"""
+    if DEPENDS_ON not in df.columns:
+        return False
+    return bool(df[DEPENDS_ON].fillna('').astype(str).str.strip().ne('').any())
+
+
+class DependencyGraph:
+    def __init__(self, names, pred, succ):
+        """
+        Dependencies between the incomplete tasks of a to-do list, as a DAG. Tasks are numbered by their
+        position among the incomplete tasks, and an edge pred[k] -> succ[k] means task pred[k] has to be done
+        before task succ[k]. Edges are kept sorted by both ends (CSR arrays), so the tasks right after or right
+        before a task are a slice
+
+        Parameters:
+            names - array of the name of every task
+            pred, succ - int arrays, the two ends of every edge
+        """
+        self.names = np.asarray(names, dtype=object)
+        n = len(self.names)
+        pred = np.asarray(pred, dtype=np.int64)
+        succ = np.asarray(succ, dtype=np.int64)
+        order = np.argsort(pred, kind="stable")
+        self.succ_ptr = np.concatenate([[0], np.cumsum(np.bincount(pred, minlength=n))])
+        self.succ = succ[order]
+        order = np.argsort(succ, kind="stable")
+        self.pred_ptr = np.concatenate([[0], np.cumsum(np.bincount(succ, minlength=n))])
+        self.pred = pred[order]
+
+    @classmethod
+    def from_tasks(cls, df):
+        """
+        Builds the graph of the incomplete tasks of a to-do list from its 'Depends On' column. A dependency on a
+        name means every incomplete task with that name; dependencies on completed tasks are already met
+
+        Returns:
+            DependencyGraph - tasks in the order of df[df["Completed"] == False]
+        """
+        incomplete = (df["Completed"] == False).to_numpy()
+        names = df["Task"].to_numpy(dtype=object)[incomplete]
+        if DEPENDS_ON not in df.columns:
+            return cls(names, [], [])
+        # One row per (task, name it depends on)
+        depends = df[DEPENDS_ON].fillna('').astype(str).to_numpy(dtype=object)[incomplete]
+        edges = pd.DataFrame({"succ": np.arange(len(names)), "name": depends})
+        edges["name"] = edges["name"].str.split(SEPARATOR)
+        edges = edges.explode("name")
+        edges["name"] = edges["name"].str.strip()
+        edges = edges[edges["name"] != '']
+        # Every incomplete task with that name is a predecessor
+        rows = pd.DataFrame({"name": names, "pred": np.arange(len(names))})
+        edges = edges.merge(rows, on="name", how="left")
+
+        missing = edges[edges["pred"].isna()]
+        if len(missing):
+            known = set(df["Task"].tolist())
+            unknown = missing[~missing["name"].isin(known)]
+            if len(unknown):
+                first = unknown.iloc[0]
+                raise Exception(f"Task '{names[int(first['succ'])]}' depends on '{first['name']}', which is not in "
+                                f"the to-do list")
+            # The rest depend on completed tasks
+            edges = edges[edges["pred"].notna()]
+        return cls(names, edges["pred"].to_numpy(dtype=np.int64), edges["succ"].to_numpy(dtype=np.int64))
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def edges(self):
+        return len(self.succ)
+
+    def topological_order(self):
+        """
+        Tasks in an order where every task comes after the ones it depends on, the to-do list order being kept
+        whenever the dependencies allow it (Kahn's algorithm with a heap of the tasks that are ready)
+
+        Returns:
+            array - task positions
+        """
+        indegree = np.diff(self.pred_ptr).tolist()
+        ready = [i for i in range(len(self)) if indegree[i] == 0]
+        heapq.heapify(ready)
+        ptr, succ = self.succ_ptr.tolist(), self.succ.tolist()
+        order = []
+        while ready:
+            i = heapq.heappop(ready)
+            order.append(i)
+            for j in succ[ptr[i]:ptr[i + 1]]:
+                indegree[j] -= 1
+                if indegree[j] == 0:
+                    heapq.heappush(ready, j)
+        if len(order) < len(self):
+            self._raise_cycle(order)
+        return np.array(order, dtype=np.int64)
+
+    def schedule(self, eta, max_hours, lookahead=16):
+        """
+        Capacity-constrained list scheduling: days are filled one at a time with tasks whose dependencies are
+        all done (in an earlier day, or earlier in the same day). Ready tasks are taken in to-do list order
+        from a heap; one that does not fit in what is left of the day is put aside and the next ready ones are
+        tried, up to 'lookahead' of them, before the day is closed. O((V + E) log V)
+
+        Parameters:
+            eta - hours of every task
+            max_hours - max hours in a workday, or an array of the hours of every day (see 'daypacker.pack')
+            lookahead - most tasks put aside before a day is closed
+
+        Returns:
+            PackResult
+        """
+        hours = np.asarray(eta, dtype=float)
+        task_hours = hours.tolist()
+        capacity = _Capacity(max_hours)
+        indegree = np.diff(self.pred_ptr).tolist()
+        ready = [i for i in range(len(self)) if indegree[i] == 0]
+        heapq.heapify(ready)
+        ptr, succ = self.succ_ptr.tolist(), self.succ.tolist()
+        order, bounds, put_aside = [], [0], []
+        left = capacity[0]
+        while ready or put_aside:
+            if not ready or len(put_aside) >= lookahead:
+                # Nothing else fits today: closing the day, the tasks put aside are ready again tomorrow
+                bounds.append(len(order))
+                left = capacity[len(bounds) - 1]
+                for i in put_aside:
+                    heapq.heappush(ready, i)
+                put_aside = []
+                continue
+            i = heapq.heappop(ready)
+            # A task longer than a whole day still gets a day of its own
+            if task_hours[i] <= left or len(order) == bounds[-1]:
+                order.append(i)
+                left -= task_hours[i]
+                for j in succ[ptr[i]:ptr[i + 1]]:
+                    indegree[j] -= 1
+                    if indegree[j] == 0:
+                        heapq.heappush(ready, j)
+            else:
+                put_aside.append(i)
+        if len(order) > bounds[-1]:
+            bounds.append(len(order))
+        if len(order) < len(self):
+            self._raise_cycle(order)
+        order = np.array(order, dtype=np.int64)
+        return PackResult(order, hours[order], np.array(bounds, dtype=np.int64), max_hours)
+
+    def _raise_cycle(self, done):
+        """Finds a cycle among the tasks that could not be ordered, and raises an exception naming its tasks"""
+        blocked = np.ones(len(self), dtype=bool)
+        blocked[np.asarray(done, dtype=np.int64)] = False
+        # Every blocked task has a blocked predecessor, walking back from one of them ends up in a cycle
+        i = int(np.flatnonzero(blocked)[0])
+        seen = {}
+        path = []
+        while i not in seen:
+            seen[i] = len(path)
+            path.append(i)
+            preds = self.pred[self.pred_ptr[i]:self.pred_ptr[i + 1]]
+            i = int(preds[blocked[preds]][0])
+        cycle = path[seen[i]:][::-1]
+        names = " -> ".join(f"'{self.names[j]}'" for j in cycle + [cycle[0]])
+        raise Exception(f"Tasks depend on each other in a cycle (each one has to be done before the next): {names}")
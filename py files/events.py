@@ -0,0 +1,127 @@
+import logging
+import queue
+import threading
+
+# Answers of the y/n questions that mean yes
+YES = ["Y", "y", "yes", "Yes", "YES", "YEs"]
+
+
+def confirmed(confirm, question, subject=None):
+    """
+    Answers a y/n question according to a confirm policy
+
+    Parameters:
+        confirm - None to ask the user (input), True/False to always say yes/no, or a function that is
+                  called with 'subject' and returns True/False
+        question - question asked to the user
+        subject - what is being confirmed (e.g. a Changeset or a file name), given to 'confirm' functions
+
+    Returns:
+        bool
+    """
+    if confirm is None:
+        return input(question) in YES
+    if callable(confirm):
+        return bool(confirm(subject))
+    return bool(confirm)
+
+
+def info(message):
+    """Record of a plain message (a file was saved, nothing changed...)"""
+    return {"kind": "info", "message": message}
+
+
+def emit(sink, events):
+    """Sends a batch of records to a sink: an object with an 'emit' method, or a function taking the list"""
+    if not events:
+        return
+    if hasattr(sink, "emit"):
+        sink.emit(events)
+    else:
+        sink(events)
+
+
+class PrintSink:
+    """Prints the messages of every batch with a single print"""
+
+    def emit(self, events):
+        print("\n".join(event["message"] for event in events))
+
+
+class LoggerSink:
+    def __init__(self, logger=None, level=logging.INFO):
+        """Sends the messages of every batch to a logger, as one log record"""
+        self.logger = logging.getLogger("burndown") if logger is None else logger
+        self.level = level
+
+    def emit(self, events):
+        if self.logger.isEnabledFor(self.level):
+            self.logger.log(self.level, "%s", "\n".join(event["message"] for event in events))
+
+
+class ListSink:
+    def __init__(self):
+        """Keeps every record, for callers that want the events themselves and not messages"""
+        self.events = []
+
+    def emit(self, events):
+        self.events.extend(events)
+
+
+class NullSink:
+    """Drops everything"""
+
+    def emit(self, events):
+        pass
+
+
+class ThreadedSink:
+    def __init__(self, sink):
+        """
+        Hands the batches to another sink from a background thread, so printing or logging thousands of
+        changes never slows down the caller. Batches that pile up are merged before being sent
+
+        Parameters:
+            sink - the sink (or function) that receives the batches
+        """
+        self.sink = sink
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def emit(self, events):
+        self.queue.put(list(events))
+
+    def flush(self):
+        """Waits until every batch was handed to the sink"""
+        self.queue.join()
+
+    def close(self):
+        self.flush()
+        self.queue.put(None)
+        self.thread.join()
+
+    def _run(self):
+        while True:
+            batch = self.queue.get()
+            if batch is None:
+                self.queue.task_done()
+                return
+            done = 1
+            # Merging whatever else is already waiting
+            while True:
+                try:
+                    more = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if more is None:
+                    self.queue.put(None)
+                    self.queue.task_done()
+                    break
+                batch.extend(more)
+                done += 1
+            try:
+                emit(self.sink, batch)
+            finally:
+                for _ in range(done):
+                    self.queue.task_done()
@@ -1,9 +1,3 @@
-import pandas as pd
-import numpy as np
-from datetime import datetime, timedelta
-import matplotlib.pyplot as plt
-from matplotlib.pyplot import figure
-import glob
 import os
 from burndownchart import BurndownChart
 from datahandler import DataHandler
@@ -0,0 +1,86 @@
+from collections import OrderedDict
+import os
+import threading
+from instrument import stage, count
+
+
+class FileCache:
+    def __init__(self, max_bytes=256 * 1024 ** 2):
+        """
+        Keeps parsed dataframes in memory so every file is only parsed once. An entry is reused as long as the
+        file has the same modification time and size, and the least recently used entries are dropped once the
+        dataframes take more than 'max_bytes'
+
+        Parameters:
+            max_bytes - memory budget of the cached dataframes
+        """
+        self.max_bytes = max_bytes
+        # (path, parser name) -> ((modification time, size), dataframe, bytes)
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        # Files are parsed outside the lock, so different files can be parsed by different threads at once
+        self.lock = threading.Lock()
+
+    def load(self, path, parser):
+        """
+        Returns the parsed file, only calling the parser if the file is not cached or has changed since
+
+        Parameters:
+            path - file to read
+            parser - function that takes the path and returns a dataframe
+
+        Returns:
+            df - a copy of the cached dataframe (so callers can modify it freely)
+        """
+        stat = os.stat(path)
+        version = (stat.st_mtime_ns, stat.st_size)
+        key = (os.path.abspath(path), parser.__name__)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == version:
+                self.hits += 1
+                count("cache_hits")
+                self.entries.move_to_end(key)
+                return entry[1].copy()
+            self.misses += 1
+
+        with stage(f"FileCache.parse.{parser.__name__}"):
+            df = parser(path)
+        count("files_read")
+        count("bytes_read", stat.st_size)
+        count("rows_read", len(df))
+        size = int(df.memory_usage(deep=True).sum())
+        with self.lock:
+            if key in self.entries:
+                self._drop(key)
+            if size <= self.max_bytes:
+                self.entries[key] = (version, df, size)
+                self.bytes += size
+                # Dropping the least recently used dataframes until it fits the budget again
+                while self.bytes > self.max_bytes:
+                    self._drop(next(iter(self.entries)))
+        return df.copy()
+
+    def invalidate(self, path=None):
+        """Forgets everything parsed from 'path' (or everything if no path is given). Called after writing a file"""
+        with self.lock:
+            if path is None:
+                keys = list(self.entries)
+            else:
+                path = os.path.abspath(path)
+                keys = [i for i in self.entries if i[0] == path]
+            for key in keys:
+                self._drop(key)
+
+    def stats(self):
+        """Hit/miss counters and the memory used, as a dictionary"""
+        return {"hits": self.hits, "misses": self.misses, "entries": len(self.entries), "bytes": self.bytes}
+
+    def _drop(self, key):
+        self.bytes -= self.entries.pop(key)[2]
+
+
+# Cache shared by every DataHandler (and so every BurndownChart using it)
+default_cache = FileCache()
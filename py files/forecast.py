@@ -0,0 +1,233 @@
+from collections import deque
+import numpy as np
+from dates import to_day, day_string
+
+# Percentiles of the finish date reported by default
+PERCENTILES = (50, 85, 95)
+
+
+class VelocityEstimator:
+    def __init__(self, halflife=7.0, history=365):
+        """
+        Burndown velocity (hours completed per day) as an exponentially weighted mean, updated one completion
+        day at a time instead of refitting every point of the completion line. Recent days weigh the most:
+        a day 'halflife' days ago counts half as much as today
+
+        Parameters:
+            halflife - days after which a velocity counts half as much
+            history - number of past velocities kept for 'samples' (the Monte Carlo simulation)
+        """
+        self.halflife = halflife
+        self.decay = 0.5 ** (1 / halflife)
+        self.mean = None
+        self.var = 0.0
+        # (day, velocity, days it lasted) of the last completion days
+        self.rates = deque(maxlen=history)
+        # Last point of the completion line seen: (day, hours left)
+        self.last = None
+
+    def update(self, day, left):
+        """
+        Adds a point of the completion line: 'left' hours were left at the end of 'day' (a day number or a number
+        of days since the start of the plan). Points must come in day order, earlier or repeated days are ignored
+        """
+        day, left = int(day), float(left)
+        if self.last is None:
+            self.last = (day, left)
+            return self
+        gap = day - self.last[0]
+        if gap <= 0:
+            return self
+        # Hours completed per day since the last point, every day of the gap counts
+        rate = (self.last[1] - left) / gap
+        weight = self.decay ** gap
+        if self.mean is None:
+            self.mean = rate
+        else:
+            diff = rate - self.mean
+            step = (1 - weight) * diff
+            self.mean += step
+            self.var = weight * (self.var + diff * step)
+        self.rates.append((day, rate, gap))
+        self.last = (day, left)
+        return self
+
+    def update_line(self, days, left):
+        """
+        Adds the points of a completion line (see 'burndownseries.completion_line') that came after the last one
+        seen, so calling it again with a longer line only costs the new points. Starts over if the points
+        already seen changed
+
+        Parameters:
+            days - days of the points (offsets or day numbers, same kind on every call)
+            left - hours left at each of those days
+        """
+        days = np.asarray(days, dtype=np.int64)
+        left = np.asarray(left, dtype=float)
+        if self.last is not None:
+            seen = np.flatnonzero(days == self.last[0])
+            if len(seen) == 0 or left[seen[0]] != self.last[1]:
+                self.__init__(self.halflife, self.rates.maxlen)
+            else:
+                days, left = days[seen[0] + 1:], left[seen[0] + 1:]
+        for day, hours in zip(days.tolist(), left.tolist()):
+            self.update(day, hours)
+        return self
+
+    @property
+    def velocity(self):
+        """Hours completed per day (None before two points were seen)"""
+        return self.mean
+
+    @property
+    def std(self):
+        return float(np.sqrt(self.var))
+
+    def days_left(self, hours_left):
+        """Days until 'hours_left' hours are done at the current velocity (inf if there is no progress)"""
+        if self.mean is None or self.mean <= 0:
+            return np.inf
+        return hours_left / self.mean
+
+    def samples(self):
+        """
+        Past velocities and their weights for a bootstrap: a velocity counts once per day it lasted, and less
+        the older it is
+
+        Returns:
+            tuple - 2 arrays (velocities, weights summing to 1)
+        """
+        if not self.rates:
+            raise Exception("At least 2 completion days are needed to forecast")
+        day, rate, gap = (np.array(i, dtype=float) for i in zip(*self.rates))
+        weights = gap * self.decay ** (day.max() - day)
+        return rate, weights / weights.sum()
+
+
+def simulate_days(hours_left, estimator, trials=10000, seed=None, max_days=36500, max_draws=2 ** 22):
+    """
+    Monte Carlo simulation of the days left: every trial draws one past velocity per day (see
+    'VelocityEstimator.samples') until 'hours_left' hours are done
+
+    Drawing every day of long projects would take (trials x days) draws, so the days almost no trial can be
+    done by are jumped at once: how many times each velocity comes up in those days is one multinomial draw
+    per trial. The few trials that finished within the jump get their days back by shuffling what they drew,
+    and the rest is drawn day by day for all trials at once, a block of days at a time
+
+    Parameters:
+        hours_left - hours still to do
+        estimator - VelocityEstimator that saw the completion line
+        trials - number of simulated futures
+        seed - seed of the random generator, for repeatable forecasts
+        max_days - trials not done after that many days stop there (they count as never finishing)
+        max_draws - most velocities drawn at once (bounds the memory used)
+
+    Returns:
+        array - days until done of every trial (-1 for the ones that never finish)
+    """
+    rates, weights = estimator.samples()
+    cdf = np.cumsum(weights)
+    cdf[-1] = 1.0
+    rng = np.random.default_rng(seed)
+    days = np.full(trials, -1, dtype=np.int64)
+    if hours_left <= 0:
+        days[:] = 0
+        return days
+    if rates.max() <= 0:
+        return days
+
+    remaining = np.full(trials, float(hours_left))
+    active = np.arange(trials)
+    mean = float(np.dot(rates, weights))
+    std = float(np.sqrt(np.dot((rates - mean) ** 2, weights)))
+
+    # Jump: days after which hardly any trial is done (5 standard deviations early)
+    elapsed = 0
+    if mean > 0:
+        expected = hours_left / mean
+        elapsed = int(min(max((hours_left - 5 * std * np.sqrt(expected)) / mean, 0), max_days))
+    if elapsed:
+        counts = rng.multinomial(elapsed, weights, size=trials)
+        done = counts @ rates
+        for i in np.flatnonzero(done >= hours_left):
+            # Days in a random order: the same velocities as the multinomial draw, so the result is unchanged
+            path = np.cumsum(rng.permutation(np.repeat(rates, counts[i])))
+            days[i] = int(np.argmax(path >= hours_left)) + 1
+        remaining -= done
+        active = active[done < hours_left]
+
+    # Sized so most trials are done after the first block
+    expected = float(np.mean(remaining[active])) / max(mean, rates.max() / 100) if len(active) else 0
+    block = int(min(max(expected * 1.25 + 3 * std, 16), max_days))
+    while len(active) and elapsed < max_days:
+        block = min(block, max_days - elapsed, max(max_draws // len(active), 1))
+        draws = rates[np.searchsorted(cdf, rng.random((len(active), block)), side="right")]
+        done_by = np.cumsum(draws, axis=1)
+        finished = done_by[:, -1] >= remaining[active]
+        # First day the hours done reach the hours left, for the trials that got there in this block
+        first = np.argmax(done_by[finished] >= remaining[active[finished], None], axis=1)
+        days[active[finished]] = elapsed + first + 1
+        remaining[active[~finished]] -= done_by[~finished, -1]
+        active = active[~finished]
+        elapsed += block
+    return days
+
+
+def progress_forecast(offsets, left, start_date, estimator, trials=10000, seed=None):
+    """
+    Where a completion line (see 'burndownseries.completion_line') is heading: the velocity of its line of best
+    fit and the day that line reaches 0, and the finish dates of the recent velocity ('finish_dates')
+
+    Parameters:
+        offsets - days since the start of the plan of the completion line points
+        left - hours left of the completion line points
+        start_date - first day of the plan
+        estimator - VelocityEstimator, updated with the new points of the line
+        trials - number of simulated futures
+        seed - seed of the random generator
+
+    Returns:
+        dict - "Velocity" (hours/day) and "Forecast End", plus "P50", "P85"... from 'finish_dates'. Values that
+               can't be worked out yet (less than 2 points, a line that never reaches 0) are None
+    """
+    forecast = {"Velocity": None, "Forecast End": None}
+    forecast.update({f"P{percentile:g}": None for percentile in PERCENTILES})
+    if len(left) == 0:
+        return forecast
+    last_day = to_day(start_date) + int(offsets[-1])
+    if len(left) > 1:
+        slope = np.polyfit(offsets, left, 1)[0]
+        forecast["Velocity"] = float(-slope)
+        if slope < 0:
+            forecast["Forecast End"] = day_string(last_day + int(np.ceil(left[-1] / -slope)))
+    estimator.update_line(offsets, left)
+    if estimator.velocity is not None:
+        forecast.update(finish_dates(left[-1], estimator, last_day, trials, seed=seed))
+    return forecast
+
+
+def finish_dates(hours_left, estimator, from_date, trials=10000, percentiles=PERCENTILES, seed=None):
+    """
+    Projected finish dates: the dates by which the work is done in 'percentiles' % of the simulated futures
+    (see 'simulate_days')
+
+    Parameters:
+        hours_left - hours still to do
+        estimator - VelocityEstimator that saw the completion line
+        from_date - date the simulation starts from (the last day something was completed)
+        trials - number of simulated futures
+        percentiles - e.g. (50, 85, 95)
+        seed - seed of the random generator
+
+    Returns:
+        dict - e.g. {"P50": "2020-10-02", "P85": ..., "P95": ...}. None for a percentile that never finishes
+    """
+    days = simulate_days(hours_left, estimator, trials, seed)
+    # Trials that never finish sort last
+    days = np.sort(np.where(days < 0, np.iinfo(np.int64).max, days))
+    start = to_day(from_date)
+    dates = {}
+    for percentile in percentiles:
+        day = days[min(max(int(np.ceil(percentile / 100 * len(days))) - 1, 0), len(days) - 1)] if len(days) else -1
+        dates[f"P{percentile:g}"] = None if day == np.iinfo(np.int64).max or day < 0 else day_string(start + int(day))
+    return dates
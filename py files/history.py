@@ -0,0 +1,195 @@
+from bisect import bisect_right
+from datetime import datetime
+import json
+import os
+import numpy as np
+import pandas as pd
+from changeset import diff_tasks
+from snapshots import read_snapshot, write_snapshot
+
+
+class TaskHistory:
+    # Files the history is kept in, inside the project directory
+    LOG = "History log.jsonl"
+    INDEX = "History index.jsonl"
+    CHECKPOINT = "History checkpoint {}.txt"
+
+    def __init__(self, directory, checkpoint_interval=20, snapshot_format="csv"):
+        """
+        Append-only history of the task list. Every save only stores what changed since the previous one
+        (the Changeset), and every 'checkpoint_interval' saves a full copy is stored as a checkpoint, so
+        rebuilding the list as of any time never applies more than 'checkpoint_interval' changesets
+
+        Parameters:
+            directory - the folder the history files are saved in
+            checkpoint_interval - number of saves between two full copies
+            snapshot_format - format of the checkpoint files (see 'snapshots.FORMATS')
+        """
+        self.directory = directory
+        self.checkpoint_interval = checkpoint_interval
+        self.snapshot_format = snapshot_format
+        # One entry per save: [save number, time, position in the log, checkpoint file or None]
+        self.index = []
+        index_path = os.path.join(directory, self.INDEX)
+        if os.path.exists(index_path):
+            with open(index_path) as f:
+                self.index = [json.loads(line) for line in f]
+        # Latest task list, kept in memory once it has been built
+        self._latest = None
+
+    def __len__(self):
+        return len(self.index)
+
+    def record(self, df, changeset=None):
+        """
+        Adds a new version of the task list to the history
+
+        Parameters:
+            df - the task list being saved
+            changeset - Changeset between the latest version in the history and 'df', if it was already computed
+                        (e.g. by DataHandler.update_tasks). It is computed here otherwise
+
+        Returns:
+            int - save number of this version
+        """
+        seq = len(self.index)
+        record = {"seq": seq, "time": datetime.now().isoformat()}
+        checkpoint = None
+        if seq % self.checkpoint_interval == 0:
+            # Full copy
+            checkpoint = write_snapshot(df, os.path.join(self.directory, self.CHECKPOINT.format(seq)),
+                                        self.snapshot_format)
+            checkpoint = os.path.basename(checkpoint)
+            record["checkpoint"] = checkpoint
+        else:
+            if changeset is None:
+                changeset = diff_tasks(self.latest(), df)
+            record.update(self._encode(changeset))
+            # Rows are matched by name and occurrence, so the changes alone do not say where moved or added rows
+            # go. Their order is stored when applying the changes would not give it back
+            changed, keys = self._apply_changes(self.latest(), record)
+            positions = keys.get_indexer(_keys(df))
+            if (positions < 0).any():
+                raise Exception("The changeset does not turn the latest version of the history into this task list")
+            if not np.array_equal(positions, _completed_first(changed)):
+                record["order"] = _runs(positions)
+
+        log_path = os.path.join(self.directory, self.LOG)
+        with open(log_path, "a") as f:
+            offset = f.tell()
+            f.write(json.dumps(record) + "\n")
+        entry = [seq, record["time"], offset, checkpoint]
+        with open(os.path.join(self.directory, self.INDEX), "a") as f:
+            f.write(json.dumps(entry) + "\n")
+        self.index.append(entry)
+        self._latest = df.copy()
+        return seq
+
+    def latest(self):
+        """Returns the most recent version of the task list"""
+        if self._latest is None:
+            if not self.index:
+                raise Exception("The task history is empty")
+            self._latest = self._rebuild(len(self.index) - 1)
+        return self._latest.copy()
+
+    def as_of(self, timestamp):
+        """
+        Rebuilds the task list as it was at a given time
+
+        Parameters:
+            timestamp - str or datetime
+
+        Returns:
+            df - dataframe of the task list saved last before 'timestamp'
+        """
+        timestamp = pd.to_datetime(timestamp).to_pydatetime()
+        times = [datetime.fromisoformat(i[1]) for i in self.index]
+        seq = bisect_right(times, timestamp) - 1
+        if seq < 0:
+            raise Exception(f"There is no task history before {timestamp}")
+        return self._rebuild(seq)
+
+    def _rebuild(self, seq):
+        """Loads the last checkpoint at or before save 'seq' and applies the changesets after it"""
+        start = seq - seq % self.checkpoint_interval
+        with open(os.path.join(self.directory, self.LOG)) as f:
+            f.seek(self.index[start][2])
+            records = [json.loads(f.readline()) for _ in range(seq - start + 1)]
+        df = read_snapshot(os.path.join(self.directory, records[0]["checkpoint"]))
+        for record in records[1:]:
+            df = self._apply(df, record)
+        return df
+
+    @staticmethod
+    def _encode(changeset):
+        """Turns a Changeset into what is stored in the log: removed rows, added rows and new values"""
+        return {"removed": changeset.removed[["Task", "Occurrence"]].values.tolist(),
+                "added": json.loads(changeset.added.to_json(orient="split", index=False)),
+                "changes": json.loads(changeset.changes[["Task", "Occurrence", "Column", "New Value"]]
+                                      .to_json(orient="values"))}
+
+    @classmethod
+    def _apply(cls, df, record):
+        """Applies one stored changeset to a task list"""
+        df, _ = cls._apply_changes(df, record)
+        if "order" in record:
+            return df.iloc[_positions(record["order"])].reset_index(drop=True)
+        # Same order the task lists are saved in, Completed Tasks first
+        return df.iloc[_completed_first(df)].reset_index(drop=True)
+
+    @staticmethod
+    def _apply_changes(df, record):
+        """
+        Removed rows taken out, new values set and added rows put at the end, before the rows are put in order
+
+        Returns:
+            tuple - (dataframe, (task, occurrence) key of every row in the changed list)
+        """
+        keys = _keys(df)
+        if record["removed"]:
+            keep = ~keys.isin([tuple(i) for i in record["removed"]])
+            df, keys = df[keep], keys[keep]
+        df = df.copy()
+        if record["changes"]:
+            changes = pd.DataFrame(record["changes"], columns=["Task", "Occurrence", "Column", "New Value"])
+            for column, values in changes.groupby("Column", sort=False):
+                rows = keys.get_indexer(pd.MultiIndex.from_arrays([values["Task"], values["Occurrence"]]))
+                # Going through object values, the new values may not fit the old dtype (e.g. '' -> date)
+                column_values = df[column].to_numpy(dtype=object).copy()
+                column_values[rows] = values["New Value"].to_numpy()
+                df[column] = pd.Series(column_values, index=df.index).infer_objects()
+        added = record["added"]
+        if added["data"]:
+            added = pd.DataFrame(added["data"], columns=added["columns"])
+            keys = keys.append(pd.MultiIndex.from_arrays([added["Task"], added["Occurrence"]]))
+            df = pd.concat([df, added.drop(columns="Occurrence")], ignore_index=True)
+        return df.reset_index(drop=True), keys
+
+
+def _keys(df):
+    """(task, occurrence) key of every row, numbered as in 'diff_tasks'"""
+    return pd.MultiIndex.from_arrays([df["Task"], df.groupby("Task", sort=False).cumcount()])
+
+
+def _completed_first(df):
+    """Positions of the rows with the Completed Tasks first"""
+    done = (df["Completed"] == True).to_numpy()
+    return np.concatenate([np.flatnonzero(done), np.flatnonzero(~done)])
+
+
+def _runs(positions):
+    """Positions as [start, length] runs of consecutive rows (an edit only breaks the order in a few places)"""
+    positions = np.asarray(positions, dtype=np.int64)
+    if len(positions) == 0:
+        return []
+    starts = np.flatnonzero(np.diff(positions) != 1) + 1
+    starts = np.concatenate([[0], starts])
+    lengths = np.diff(np.concatenate([starts, [len(positions)]]))
+    return [[int(positions[i]), int(n)] for i, n in zip(starts, lengths)]
+
+
+def _positions(runs):
+    if not runs:
+        return np.array([], dtype=np.int64)
+    return np.concatenate([np.arange(start, start + n) for start, n in runs])
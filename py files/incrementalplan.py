@@ -0,0 +1,338 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+from changeset import _row_keys
+from daypacker import pack
+from dates import to_day, parse_days, format_days, day_string
+from workcalendar import WorkCalendar
+
+
+class IncrementalPlan:
+    def __init__(self, start_date, max_hours, days=(), calendar=None):
+        """
+        Packed day structure of a plan, kept so the plan can be updated when tasks are added, removed, completed
+        or change ETA without repacking every task. Only the days a change touches are modified, and the hours
+        done before each day are only recomputed from the first changed day onward
+
+        Parameters:
+            start_date - date of the first day of the plan
+            max_hours - max hours in a workday
+            days - list of days, every day a list of (task, occurrence, hours). (task, occurrence) is the key of
+                   the task in the to-do list, as in a Changeset. A task split over several days (see the "spill"
+                   strategy) has a piece in each of them, all with the same key
+            calendar - WorkCalendar the plan was made with. Days are then its workdays from 'start_date' on,
+                       each with its own hours, instead of consecutive 'max_hours' days
+        """
+        # Day number of the first day (see 'dates')
+        self.start_date = to_day(start_date)
+        self.max_hours = float(max_hours)
+        self.calendar = calendar
+        # Dates and hours of the workdays of the calendar, extended when the plan grows
+        self._workdays = np.array([], dtype=np.int32)
+        self._workday_hours = np.array([])
+        # Keys of the tasks of every day, in order
+        self.days = []
+        # key -> {day: hours} of every piece of the task
+        self.tasks = {}
+        self.day_hours = np.zeros(0)
+        # Hours of all the days before each day, valid up to (not including) day '_dirty'
+        self.done_before = np.zeros(0)
+        self._dirty = 0
+        # First day changed by the current 'apply'
+        self._first_changed = None
+        self._free = _CapacityTree(self._hours_of_days)
+        for day, tasks in enumerate(days):
+            for task, occurrence, hours in tasks:
+                self._place((task, int(occurrence)), float(hours), day)
+
+    @classmethod
+    def from_tasks(cls, df, start_date, max_hours, strategy="greedy", calendar=None):
+        """Packs the incomplete tasks of a to-do list (same days as 'BurndownChart.see_new_plan')"""
+        keys = _task_keys(df)
+        incomplete = (df["Completed"] == False).to_numpy()
+        keys = [keys[i] for i in np.flatnonzero(incomplete)]
+        hours = df["ETA"].to_numpy(dtype=float)[incomplete]
+        capacity = max_hours
+        if calendar is not None:
+            start_date = calendar.workdays(start_date, 1)[0][0]
+            capacity = calendar.workdays(start_date, calendar.days_needed(hours))[1]
+        packed = pack(hours, capacity, strategy)
+        days = []
+        for day in range(packed.days):
+            rows = range(packed.bounds[day], packed.bounds[day + 1])
+            days.append([keys[packed.order[i]] + (packed.hours[i],) for i in rows])
+        return cls(start_date, max_hours, days, calendar)
+
+    @classmethod
+    def from_plan(cls, plan, df, max_hours, calendar=None):
+        """
+        Rebuilds the day structure of a plan made by 'see_new_plan'
+
+        Parameters:
+            plan - the plan, with or without its (Day, Task) index
+            df - to-do list the plan was made from (gives every planned task its key)
+            max_hours - max hours in a workday the plan was made with
+            calendar - WorkCalendar the plan was made with, if any
+        """
+        if "Task" not in plan.columns:
+            plan = plan.reset_index()
+        # The first row is the task-less one holding the total, on the start date
+        start_date = to_day(plan["Day"].iloc[0])
+        plan = plan.iloc[1:]
+        # [key, hours not planned yet] of the incomplete tasks of every name, handed out to the planned tasks of
+        # that name in order. The pieces of a split task all get its key, until its hours are used up
+        free_keys = {}
+        incomplete = (df["Completed"] == False).to_numpy()
+        eta = pd.to_numeric(df["ETA"], errors="coerce").to_numpy(dtype=float)
+        for key, hours in zip([key for key, todo in zip(_task_keys(df), incomplete) if todo], eta[incomplete]):
+            free_keys.setdefault(key[0], []).append([key, hours])
+        if calendar is None:
+            day_numbers = parse_days(plan["Day"]) - start_date
+        else:
+            day_numbers = calendar.workday_index(start_date, parse_days(plan["Day"]))
+        days = [[] for _ in range(int(day_numbers.max()) + 1 if len(plan) else 0)]
+        for i, (day, task, hours) in enumerate(zip(day_numbers, plan["Task"], plan["ETA"].astype(float))):
+            keys = free_keys.get(task)
+            if not keys:
+                # Tasks that are not in the to-do list anymore get a key no Changeset will ever refer to
+                days[day].append((task, -1 - i, hours))
+                continue
+            # The task with exactly these hours left (the last piece of a split task, or a repeated name packed
+            # out of order), the first one of the name otherwise
+            free = next((j for j in keys if abs(j[1] - hours) < 1e-9), keys[0])
+            free[1] -= hours
+            if free[1] < 1e-9:
+                keys.remove(free)
+            days[day].append(free[0] + (hours,))
+        return cls(start_date, max_hours, days, calendar)
+
+    def __len__(self):
+        return len(self.tasks)
+
+    @property
+    def total(self):
+        return float(self.day_hours.sum())
+
+    def apply(self, changeset):
+        """
+        Updates the plan with the changes made to the to-do list. Removed and completed tasks leave their day,
+        added and uncompleted ones go into the first day they fit in, and a task whose ETA changed stays in its
+        day if it still fits (it is moved like an added task otherwise)
+
+        Parameters:
+            changeset - Changeset from 'diff_tasks' (e.g. DataHandler.changeset after 'update_tasks')
+
+        Returns:
+            int - first day that changed, None if the plan did not change
+        """
+        self._first_changed = None
+        for task, occurrence in changeset.removed[["Task", "Occurrence"]].itertuples(index=False):
+            self.remove((task, occurrence))
+        for task, occurrence in changeset.completed[["Task", "Occurrence"]].itertuples(index=False):
+            self.remove((task, occurrence))
+        eta_changes = changeset.changes[changeset.changes["Column"] == "ETA"]
+        for task, occurrence, hours in eta_changes[["Task", "Occurrence", "New Value"]].itertuples(index=False):
+            self.resize((task, occurrence), hours)
+        for rows in (changeset.uncompleted, changeset.added[changeset.added["Completed"] == False]):
+            for task, occurrence, hours in rows[["Task", "Occurrence", "ETA"]].itertuples(index=False):
+                self.add((task, occurrence), hours)
+        return self._first_changed
+
+    def add(self, key, hours):
+        """Puts a task in the first day it fits in (a new day at the end if it fits nowhere). Returns the day"""
+        key, hours = (key[0], int(key[1])), _hours(hours)
+        if key in self.tasks:
+            self.remove(key)
+        day = self._free.first_fit(hours)
+        if day is None:
+            day = self._last_day() + 1
+        self._place(key, hours, day)
+        return day
+
+    def remove(self, key):
+        """Takes a task out of the plan (every piece of it). Returns its first day, None if it is not in the plan"""
+        key = (key[0], int(key[1]))
+        if key not in self.tasks:
+            return None
+        pieces = self.tasks.pop(key)
+        for day, hours in pieces.items():
+            self.days[day].remove(key)
+            self._set_day_hours(day, self.day_hours[day] - hours)
+        return min(pieces)
+
+    def resize(self, key, hours):
+        """
+        Changes the ETA of a task, keeping it in its day when it still fits. Returns the day it ends up in. A
+        split task keeps its days when the difference fits in its last piece's day
+        """
+        key, hours = (key[0], int(key[1])), _hours(hours)
+        if key not in self.tasks:
+            return None
+        pieces = self.tasks[key]
+        day = max(pieces)
+        last_hours = pieces[day] + hours - sum(pieces.values())
+        new_day_hours = self.day_hours[day] - pieces[day] + last_hours
+        if last_hours > 0 and (new_day_hours <= self.day_capacity(day) or len(self.days[day]) == 1):
+            pieces[day] = last_hours
+            self._set_day_hours(day, new_day_hours)
+            return day
+        self.remove(key)
+        return self.add(key, hours)
+
+    def day_left(self):
+        """Hours left at the start of every day of the plan"""
+        n_days = self._last_day() + 1
+        if self._dirty < n_days:
+            # Only the days from the first changed one onward are recomputed
+            start = self.done_before[self._dirty - 1] + self.day_hours[self._dirty - 1] if self._dirty else 0.0
+            self.done_before[self._dirty:n_days] = start + np.concatenate(
+                [[0.0], np.cumsum(self.day_hours[self._dirty:n_days - 1])])
+            self._dirty = n_days
+        return self.total - self.done_before[:n_days]
+
+    def to_frame(self):
+        """The plan in the same form 'BurndownChart.see_new_plan' returns it"""
+        n_days = self._last_day() + 1
+        left = self.day_left()
+        counts = np.array([len(i) for i in self.days[:n_days]], dtype=np.int64)
+        keys = [key for day in self.days[:n_days] for key in day]
+        hours = np.array([self.tasks[key][i] for i, day in enumerate(self.days[:n_days]) for key in day], dtype=float)
+        day = np.repeat(np.arange(n_days), counts)
+        # Hours left after each task: hours left at the start of its day, minus its day's tasks up to it
+        done = np.cumsum(hours)
+        done_in_day = done - np.repeat(np.concatenate([[0.0], done])[np.cumsum(counts) - counts], counts)
+        data = pd.DataFrame({"Task": np.array([""] + [key[0] for key in keys], dtype=object),
+                             "ETA": np.concatenate([[0.0], hours]),
+                             "Completed": np.concatenate([[True], np.zeros(len(keys), dtype=bool)]),
+                             "Day": format_days(self.dates(max(n_days, 1))[np.concatenate([[0], day])]),
+                             "Amount Left": np.concatenate([[self.total], left[day] - done_in_day])})
+        return data.set_index(["Day", "Task"])
+
+    def save(self, file):
+        """Writes the day structure to a json file (under a temporary name, then renamed)"""
+        days = [[[key[0], key[1], self.tasks[key][i]] for key in day]
+                for i, day in enumerate(self.days[:self._last_day() + 1])]
+        saved = {"start_date": day_string(self.start_date), "max_hours": self.max_hours, "days": days}
+        if self.calendar is not None:
+            saved["calendar"] = self.calendar.to_dict()
+        temporary = f"{file}.tmp"
+        with open(temporary, "w") as f:
+            json.dump(saved, f)
+        os.replace(temporary, file)
+        return file
+
+    @classmethod
+    def load(cls, file):
+        with open(file) as f:
+            saved = json.load(f)
+        calendar = WorkCalendar.from_dict(saved["calendar"]) if "calendar" in saved else None
+        return cls(saved["start_date"], saved["max_hours"], saved["days"], calendar)
+
+    @staticmethod
+    def file_of(proposed_file):
+        """Name of the file the day structure of a Proposed plan is saved in (next to the plan)"""
+        directory, name = os.path.split(proposed_file)
+        name = os.path.splitext(name)[0].replace("Proposed", "Packed days of")
+        return os.path.join(directory, name + ".json")
+
+    def dates(self, n_days):
+        """Day numbers of the first 'n_days' days of the plan"""
+        if self.calendar is None:
+            return self.start_date + np.arange(n_days)
+        self._extend_workdays(n_days)
+        return self._workdays[:n_days]
+
+    def day_capacity(self, day):
+        """Hours available in a day of the plan"""
+        if self.calendar is None:
+            return self.max_hours
+        self._extend_workdays(day + 1)
+        return float(self._workday_hours[day])
+
+    def _hours_of_days(self, first, n):
+        """Hours available in the days first..first + n - 1, as a list"""
+        if self.calendar is None:
+            return [self.max_hours] * n
+        self._extend_workdays(first + n)
+        return self._workday_hours[first:first + n].tolist()
+
+    def _extend_workdays(self, n_days):
+        if n_days > len(self._workdays):
+            self._workdays, self._workday_hours = self.calendar.workdays(self.start_date,
+                                                                         max(n_days, 2 * len(self._workdays)))
+
+    def _place(self, key, hours, day):
+        while day >= len(self.days):
+            self.days.append([])
+        if day >= len(self.day_hours):
+            grow = max(day + 1, 2 * len(self.day_hours))
+            self.day_hours = np.concatenate([self.day_hours, np.zeros(grow - len(self.day_hours))])
+            self.done_before = np.concatenate([self.done_before, np.zeros(grow - len(self.done_before))])
+        pieces = self.tasks.setdefault(key, {})
+        if day not in pieces:
+            self.days[day].append(key)
+        pieces[day] = pieces.get(day, 0.0) + hours
+        self._set_day_hours(day, self.day_hours[day] + hours)
+
+    def _set_day_hours(self, day, hours):
+        self.day_hours[day] = hours
+        self._free.set(day, self.day_capacity(day) - hours)
+        self._dirty = min(self._dirty, day + 1)
+        self._first_changed = day if self._first_changed is None else min(self._first_changed, day)
+
+    def _last_day(self):
+        # Trailing days left empty by removed tasks are not part of the plan
+        while self.days and not self.days[-1]:
+            self.days.pop()
+        return len(self.days) - 1
+
+
+class _CapacityTree:
+    def __init__(self, hours_of_days):
+        """
+        Max segment tree over the hours still free in every day, finds the first day a task fits in O(log n).
+        'hours_of_days(first, n)' gives the hours of days that were never used (they are fully free)
+        """
+        self.hours_of_days = hours_of_days
+        self.size = 1
+        self.tree = [0.0] + hours_of_days(0, 1)
+
+    def set(self, day, free):
+        while day >= self.size:
+            self._grow()
+        i = day + self.size
+        self.tree[i] = free
+        i >>= 1
+        while i:
+            self.tree[i] = max(self.tree[2 * i], self.tree[2 * i + 1])
+            i >>= 1
+
+    def first_fit(self, hours):
+        """First day with at least 'hours' free, None if no day has that much free"""
+        if self.tree[1] < hours:
+            return None
+        i = 1
+        while i < self.size:
+            i = 2 * i if self.tree[2 * i] >= hours else 2 * i + 1
+        return i - self.size
+
+    def _grow(self):
+        leaves = self.tree[self.size:] + self.hours_of_days(self.size, self.size)
+        self.size *= 2
+        tree = [0.0] * self.size + leaves
+        for i in range(self.size - 1, 0, -1):
+            tree[i] = max(tree[2 * i], tree[2 * i + 1])
+        self.tree = tree
+
+
+def _task_keys(df):
+    """(task, occurrence) key of every row of a to-do list, numbered by the same function as in 'diff_tasks'"""
+    codes, names = pd.factorize(df["Task"], sort=False)
+    occurrences = _row_keys(codes, len(names)) // max(len(names), 1)
+    return [(task, int(occurrence)) for task, occurrence in zip(df["Task"].tolist(), occurrences)]
+
+
+def _hours(hours):
+    hours = pd.to_numeric(hours, errors="coerce")
+    return 0.0 if pd.isna(hours) else float(hours)
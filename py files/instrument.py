@@ -0,0 +1,273 @@
+import asyncio
+import contextlib
+import cProfile
+import functools
+import os
+import re
+import threading
+from time import perf_counter
+from events import emit, LoggerSink
+
+# Timings and counters of the package. Off by default: instrumented calls then cost one global lookup, stages
+# and counters nothing more than a function call. Turned on with 'enable' (the command line also turns it on with
+# --metrics or the BURNDOWN_METRICS environment variable, see 'cli.main')
+
+# Recorder of the current run, None while instrumentation is off
+_recorder = None
+
+# Context manager of the stages while instrumentation is off (nullcontext can be entered any number of times)
+_NO_STAGE = contextlib.nullcontext()
+
+# Profilers 'enable' accepts
+PROFILERS = ("cprofile", "pyinstrument")
+
+
+class Recorder:
+    def __init__(self, profile=None, profile_dir="profiles"):
+        """
+        Collects the time spent in every instrumented call and stage, and the counters (rows, files and bytes
+        read...). Thread safe, calls in different threads are all added up
+
+        Parameters:
+            profile - None, "cprofile" or "pyinstrument": every outermost instrumented call is also profiled,
+                      and its profile saved in 'profile_dir' (one file per call)
+            profile_dir - folder the profiles are saved in
+        """
+        if profile is not None and profile not in PROFILERS:
+            raise Exception(f"Unknown profiler '{profile}'. Choose one of {list(PROFILERS)}")
+        if profile == "pyinstrument":
+            try:
+                import pyinstrument
+            except ImportError:
+                raise Exception("pyinstrument is not installed (pip install pyinstrument), or use profile='cprofile'")
+        self.profile = profile
+        self.profile_dir = profile_dir
+        # name -> [calls, seconds, max seconds of one call]
+        self.timings = {}
+        self.counters = {}
+        self.profiles = []
+        self.lock = threading.Lock()
+        # Depth of the instrumented calls in every thread, only the outermost one is profiled
+        self.local = threading.local()
+        # Only one profiler can run at a time in the whole process
+        self.profiling = threading.Lock()
+
+    def record(self, name, seconds):
+        with self.lock:
+            timing = self.timings.get(name)
+            if timing is None:
+                self.timings[name] = [1, seconds, seconds]
+            else:
+                timing[0] += 1
+                timing[1] += seconds
+                timing[2] = max(timing[2], seconds)
+
+    def add(self, name, n=1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def call(self, name, function, args, kwargs):
+        """Runs an instrumented function, timing it (and profiling it if it is the outermost call)"""
+        depth = getattr(self.local, "depth", 0)
+        profiler = None
+        if self.profile is not None and depth == 0 and self.profiling.acquire(blocking=False):
+            profiler = self._start_profiler()
+        self.local.depth = depth + 1
+        start = perf_counter()
+        try:
+            return function(*args, **kwargs)
+        finally:
+            self.record(name, perf_counter() - start)
+            self.local.depth = depth
+            if profiler is not None:
+                try:
+                    self._save_profile(name, profiler)
+                finally:
+                    self.profiling.release()
+
+    async def call_async(self, name, function, args, kwargs):
+        """Same as 'call' for coroutines (timed from start to end, awaits included, never profiled)"""
+        start = perf_counter()
+        try:
+            return await function(*args, **kwargs)
+        finally:
+            self.record(name, perf_counter() - start)
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = perf_counter()
+        try:
+            yield self
+        finally:
+            self.record(name, perf_counter() - start)
+
+    def stats(self):
+        """
+        Everything recorded so far, as plain values
+
+        Returns:
+            dict - {"timings": {name: {"calls", "seconds", "max_seconds"}}, "counters": {name: value}}
+        """
+        with self.lock:
+            timings = {name: {"calls": calls, "seconds": seconds, "max_seconds": longest}
+                       for name, (calls, seconds, longest) in self.timings.items()}
+            return {"timings": timings, "counters": dict(self.counters)}
+
+    def reset(self):
+        with self.lock:
+            self.timings = {}
+            self.counters = {}
+
+    def events(self):
+        """One record per timing and per counter, for the sinks of 'events' (a structured log)"""
+        stats = self.stats()
+        records = []
+        for name, timing in sorted(stats["timings"].items(), key=lambda i: -i[1]["seconds"]):
+            records.append({"kind": "timing", "name": name, **timing,
+                            "message": f"{name}: {timing['seconds']:.4f}s in {timing['calls']} call(s), "
+                                       f"longest {timing['max_seconds']:.4f}s"})
+        for name, value in sorted(stats["counters"].items()):
+            records.append({"kind": "counter", "name": name, "value": value, "message": f"{name}: {value}"})
+        return records
+
+    def log(self, sink=None):
+        """Sends the timings and counters to a sink (a LoggerSink by default), in one batch"""
+        emit(LoggerSink() if sink is None else sink, self.events())
+
+    def to_prometheus(self, prefix="burndown"):
+        """The timings and counters in the Prometheus text format (for a node_exporter textfile collector)"""
+        stats = self.stats()
+        lines = []
+        metrics = [("call_seconds_total", "counter", "Seconds spent in instrumented calls and stages", "seconds"),
+                   ("calls_total", "counter", "Instrumented calls and stages run", "calls"),
+                   ("call_seconds_max", "gauge", "Longest instrumented call or stage", "max_seconds")]
+        for metric, kind, description, key in metrics:
+            if not stats["timings"]:
+                break
+            lines.append(f"# HELP {prefix}_{metric} {description}")
+            lines.append(f"# TYPE {prefix}_{metric} {kind}")
+            for name, timing in sorted(stats["timings"].items()):
+                lines.append(f'{prefix}_{metric}{{name="{_label(name)}"}} {timing[key]}')
+        for name, value in sorted(stats["counters"].items()):
+            metric = f"{prefix}_{_metric_name(name)}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, file, prefix="burndown"):
+        """Writes 'to_prometheus' to a file, through a temporary file so scrapers never read half a file"""
+        temporary = f"{file}.tmp"
+        with open(temporary, "w") as f:
+            f.write(self.to_prometheus(prefix))
+        os.replace(temporary, file)
+        return file
+
+    def _start_profiler(self):
+        try:
+            if self.profile == "pyinstrument":
+                from pyinstrument import Profiler
+                profiler = Profiler()
+                profiler.start()
+            else:
+                profiler = cProfile.Profile()
+                profiler.enable()
+            return profiler
+        except Exception:
+            # Another profiling tool is running (a debugger, an outside profiler...), the call is only timed
+            self.profiling.release()
+            return None
+
+    def _save_profile(self, name, profiler):
+        os.makedirs(self.profile_dir, exist_ok=True)
+        file = os.path.join(self.profile_dir, f"{_metric_name(name)}-{len(self.profiles) + 1}")
+        if self.profile == "pyinstrument":
+            profiler.stop()
+            file += ".txt"
+            with open(file, "w") as f:
+                f.write(profiler.output_text())
+        else:
+            profiler.disable()
+            # Readable with pstats, snakeviz...
+            file += ".prof"
+            profiler.dump_stats(file)
+        self.profiles.append(file)
+
+
+def enable(profile=None, profile_dir="profiles"):
+    """
+    Turns instrumentation on, recording from scratch
+
+    Parameters:
+        profile - None, "cprofile" or "pyinstrument" to also profile every outermost instrumented call
+        profile_dir - folder the profiles are saved in
+
+    Returns:
+        Recorder - where everything is recorded (see 'Recorder.stats', 'log' and 'write_prometheus')
+    """
+    global _recorder
+    _recorder = Recorder(profile, profile_dir)
+    return _recorder
+
+
+def disable():
+    """Turns instrumentation off, and returns the Recorder of the run (None if it was off)"""
+    global _recorder
+    recorder, _recorder = _recorder, None
+    return recorder
+
+
+def recorder():
+    """Recorder of the current run (None while instrumentation is off)"""
+    return _recorder
+
+
+def timed(name=None):
+    """
+    Decorator that times every call of a function (or coroutine function) while instrumentation is on
+
+    Parameters:
+        name - name the time is recorded under, the qualified name of the function by default
+                ("DataHandler.update_tasks")
+    """
+    def decorator(function):
+        label = function.__qualname__ if name is None else name
+        if asyncio.iscoroutinefunction(function):
+            @functools.wraps(function)
+            async def wrapper(*args, **kwargs):
+                if _recorder is None:
+                    return await function(*args, **kwargs)
+                return await _recorder.call_async(label, function, args, kwargs)
+        else:
+            @functools.wraps(function)
+            def wrapper(*args, **kwargs):
+                if _recorder is None:
+                    return function(*args, **kwargs)
+                return _recorder.call(label, function, args, kwargs)
+        return wrapper
+    return decorator
+
+
+def stage(name):
+    """
+    Context manager timing a part of a function while instrumentation is on
+
+    >>> with stage("BurndownChart.render"):
+    ...     renderer.save(file)
+    """
+    if _recorder is None:
+        return _NO_STAGE
+    return _recorder.stage(name)
+
+
+def count(name, n=1):
+    """Adds 'n' to a counter (rows_read, files_read, bytes_read...) while instrumentation is on"""
+    if _recorder is not None:
+        _recorder.add(name, n)
+
+
+def _metric_name(name):
+    return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def _label(value):
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
@@ -0,0 +1,45 @@
+import os
+import sys
+
+# Charts shown on screen (pyplot). Nothing from matplotlib is imported until a chart is asked for: importing
+# pyplot takes longer than everything else the planner imports, and most runs (diffs, saving plans, cron
+# jobs writing files) never show a chart. Charts written to files use 'chartrender.ChartRenderer' instead
+
+
+def pyplot():
+    """
+    Imports pyplot on first use. Without a display (cron, ssh, containers) the non-GUI Agg backend is used,
+    so nothing tries to open a window
+    """
+    if "matplotlib.pyplot" not in sys.modules:
+        import matplotlib
+        if sys.platform.startswith("linux") and not os.environ.get("DISPLAY") and not os.environ.get("WAYLAND_DISPLAY") \
+                and "ipykernel" not in sys.modules:
+            matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def show_plan(xaxis, yaxis):
+    """Shows the bars of a plan (dates and the hours left at the start of each of them)"""
+    plt = pyplot()
+    # Setting boundaries of matplotlib chart
+    plt.figure(num=None, figsize=(8, 6), dpi=80, facecolor='w', edgecolor='k')
+    # labeling x-axis
+    plt.xticks(rotation=90)
+    # plotting bar graph
+    plt.bar(xaxis, yaxis, color='lightgray')
+    return plt.show()
+
+
+def show_progress(xaxis, yaxis, line_x, line_y, velocity_x, velocity_y):
+    """Shows the bars of a plan with the completion line (red) and the velocity line (dotted) over them"""
+    plt = pyplot()
+    ##Determing window size of matplotlib
+    fig = plt.figure(num=None, figsize=(10, 6), dpi=80, facecolor='w', edgecolor='k')
+    plt.ylim(0, max(yaxis) + 10)
+    plt.xticks(rotation=90, figure=fig)
+    plt.bar(xaxis, yaxis, color='lightgray', figure=fig)
+    plt.plot(line_x, line_y, linewidth=5, color="red", figure=fig)
+    plt.plot(velocity_x, velocity_y, color='black', linewidth=3, linestyle=':', figure=fig)
+    return plt.show()
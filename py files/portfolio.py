@@ -0,0 +1,153 @@
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+import os
+import numpy as np
+import pandas as pd
+from burndownchart import BurndownChart
+from burndownseries import daily_remaining, completion_line, progress_status
+from forecast import VelocityEstimator, progress_forecast
+from datahandler import DataHandler
+from dates import parse_days, format_days, day_string, today
+
+
+class Portfolio:
+    def __init__(self, roots, file="sample_todo_list.csv", max_hours=8, start_date=None, strategy="greedy",
+                 workers=None, dayfirst=False):
+        """
+        Many projects, one directory each, planned and checked in parallel. Every project is handled in a
+        worker process with its own DataHandler and BurndownChart pointed at the project directory, so
+        nothing depends on the working directory
+
+        Parameters:
+            roots - list of project directories
+            file - name of the to-do list in every project directory
+            max_hours - max hours in a workday
+            start_date - start date of the projects that don't have a saved Proposed plan yet (today by default)
+            strategy - packer used for those projects (see 'daypacker.PACKERS')
+            workers - max number of worker processes (number of CPUs by default)
+            dayfirst - read ambiguous dates such as 09/11/2020 day first (see 'dates.parse_days')
+        """
+        self.roots = [os.path.abspath(i) for i in roots]
+        self.file = file
+        self.max_hours = max_hours
+        self.start_date = day_string(today()) if start_date is None else start_date
+        self.strategy = strategy
+        self.workers = workers
+        # Given to every worker with its job, workers share no state with this process
+        self.dayfirst = dayfirst
+        # Results of the last 'run', one dictionary per project
+        self.results = []
+
+    def run(self):
+        """
+        Plans every project, checks its progress and fits its burndown velocity
+
+        Returns:
+            df - summary dataframe, one row per project
+        """
+        jobs = [(root, self.file, self.max_hours, self.start_date, self.strategy, self.dayfirst)
+                for root in self.roots]
+        workers = min(self.workers or os.cpu_count() or 1, max(len(jobs), 1))
+        with ProcessPoolExecutor(workers) as pool:
+            self.results = list(pool.map(_run_project, jobs, chunksize=max(1, len(jobs) // (4 * workers))))
+        return self.summary()
+
+    def summary(self):
+        """Summary dataframe of the last 'run', one row per project"""
+        columns = ["Project", "Tasks Left", "Hours Left", "Start", "Planned End", "Days", "Hours Completed",
+                   "Velocity", "Forecast End", "P50 End", "P85 End", "P95 End", "Status", "Error"]
+        rows = [{key: result.get(key) for key in columns} for result in self.results]
+        return pd.DataFrame(rows, columns=columns).set_index("Project")
+
+    def remaining_by_day(self):
+        """
+        Hours left per day across all projects. Every project keeps its planned hours left between its first
+        and last day, and counts as 0 after its last day
+
+        Returns:
+            df - one column per project plus a 'Total' column, indexed by date
+        """
+        series = {}
+        for result in self.results:
+            if result.get("Error") is None and len(result["Dates"]):
+                series[result["Project"]] = pd.Series(result["Remaining"], index=parse_days(result["Dates"]))
+        if not series:
+            return pd.DataFrame(columns=["Total"])
+        df = pd.DataFrame(series).sort_index()
+        df = df.reindex(np.arange(df.index[0], df.index[-1] + 1))
+        # Days before a project starts have no value (NaN), days after it ends have 0 hours left
+        ends = {name: values.index[-1] for name, values in series.items()}
+        for name, end in ends.items():
+            df.loc[df.index > end, name] = 0.0
+        df = df.ffill()
+        df["Total"] = df.sum(axis=1)
+        df.index = format_days(df.index.to_numpy())
+        df.index.name = "Day"
+        return df
+
+
+def _run_project(job):
+    """Plan, progress and velocity of one project, run inside a worker process"""
+    root, file, max_hours, start_date, strategy, dayfirst = job
+    result = {"Project": root, "Error": None}
+    try:
+        datahandler = DataHandler(file, directory=root, dayfirst=dayfirst)
+        chart = BurndownChart(max_hours)
+        tasks = datahandler.get_tasks_file()
+        result["Tasks Left"] = int((tasks["Completed"] == False).sum())
+
+        # Plan: the saved Proposed plan, or a new one if the project has none
+        proposed = datahandler.get_latest_file("Proposed")
+        if proposed is not None:
+            plan = datahandler.read_file(proposed)
+        else:
+            plan = chart.see_new_plan(tasks, start_date, strategy=strategy).reset_index()
+        dates, left = daily_remaining(plan)
+        result.update({"Dates": dates, "Remaining": left, "Start": dates[0], "Planned End": dates[-1],
+                       "Days": len(dates), "Hours Left": float(left[0])})
+
+        # Progress and velocity, once something was completed
+        progress = datahandler.get_latest_file("Progress")
+        if progress is not None:
+            progress = datahandler.read_file(progress, normalize_days=True)
+            _, line, offsets = completion_line(progress, plan["ETA"].sum(), dates[0])
+            if len(line):
+                result["Hours Left"] = float(line[-1])
+                result["Hours Completed"] = float(plan["ETA"].sum() - line[-1])
+                result["Status"] = progress_status(left, line, offsets)
+                # Same forecast as 'BurndownChart.check_bdc_progress', fewer trials (Monte Carlo, see 'forecast')
+                forecast = progress_forecast(offsets, line, dates[0], VelocityEstimator(), trials=2000, seed=0)
+                result.update({key if key in ("Velocity", "Forecast End") else f"{key} End": value
+                               for key, value in forecast.items()})
+    except Exception as error:
+        # One broken project should not stop the others
+        result["Error"] = f"{type(error).__name__}: {error}"
+    return result
+
+
+async def check_progress_async(roots, file="sample_todo_list.csv", max_hours=8, limit=8, sink=None,
+                               dayfirst=False):
+    """
+    Runs 'BurndownChart.check_plan_progress_async' for many projects, at most 'limit' of them at a time
+
+    Parameters:
+        roots - list of project directories
+        file - name of the to-do list in every project directory
+        max_hours - max hours in a workday
+        limit - max number of projects checked at the same time
+        sink - where the messages of every project go (see 'events'), printed by default
+        dayfirst - read ambiguous dates such as 09/11/2020 day first (see 'dates.parse_days')
+
+    Returns:
+        dict - project directory -> dataframe of updated tasks (or the exception raised for that project)
+    """
+    semaphore = asyncio.Semaphore(limit)
+
+    async def check(root):
+        async with semaphore:
+            datahandler = DataHandler(file, directory=root, sink=sink, dayfirst=dayfirst)
+            return await BurndownChart(max_hours).check_plan_progress_async(datahandler)
+
+    roots = [os.path.abspath(i) for i in roots]
+    results = await asyncio.gather(*(check(root) for root in roots), return_exceptions=True)
+    return dict(zip(roots, results))
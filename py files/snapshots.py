@@ -0,0 +1,169 @@
+import argparse
+import os
+import tempfile
+import pandas as pd
+from artifactindex import ArtifactIndex
+from dates import NO_DAY, parse_days, format_days
+
+# File extension of every snapshot format. 'csv' is the original text format (saved as .txt)
+FORMATS = {"csv": ".txt", "feather": ".feather", "parquet": ".parquet"}
+
+# First bytes of the binary formats, used to detect the format of a file without trusting its extension
+_MAGIC = {b"ARROW1": "feather", b"PAR1": "parquet"}
+
+
+def snapshot_format(file):
+    """
+    Detects the format of a saved file from its first bytes
+
+    Returns:
+        str - 'feather', 'parquet' or 'csv'
+    """
+    with open(file, "rb") as f:
+        head = f.read(6)
+    for magic, fmt in _MAGIC.items():
+        if head.startswith(magic):
+            return fmt
+    return "csv"
+
+
+def snapshot_name(file, fmt):
+    """Gives the file name the extension of the format ('Tasks 2020_9_10_8.txt' -> 'Tasks 2020_9_10_8.feather')"""
+    if fmt not in FORMATS:
+        raise Exception(f"Unknown snapshot format '{fmt}'. Choose one of {list(FORMATS)}")
+    return os.path.splitext(file)[0] + FORMATS[fmt]
+
+
+def read_snapshot(file):
+    """
+    Reads a Tasks/Proposed/Progress file in any of the formats. Binary files are memory-mapped and come back
+    in the same shape as the csv ones: dates as 'YYYY-MM-DD' strings and blank strings instead of Na values
+
+    Returns:
+        df - dataframe
+    """
+    fmt = snapshot_format(file)
+    if fmt == "csv":
+        return pd.read_csv(file).fillna('')
+
+    pyarrow = _import_pyarrow(fmt)
+    if fmt == "feather":
+        from pyarrow import feather
+        table = feather.read_table(file, memory_map=True)
+    else:
+        from pyarrow import parquet
+        table = parquet.read_table(file, memory_map=True)
+
+    df = table.to_pandas(date_as_object=False)
+    for col in df.columns:
+        if pyarrow.types.is_date32(table.schema.field(col).type):
+            # date32 values are already day numbers (missing dates become blank strings)
+            days = table.column(col).cast(pyarrow.int32()).fill_null(NO_DAY).to_numpy()
+            df[col] = format_days(days)
+        elif pyarrow.types.is_float32(table.schema.field(col).type):
+            # float32 can't hold values such as 0.1 exactly, rounding gives back what was written
+            df[col] = df[col].astype(float).round(6)
+    return df.fillna('')
+
+
+def write_snapshot(df, file, fmt="csv"):
+    """
+    Writes a dataframe in the given format. In the binary formats 'Day' columns are stored as date32,
+    'ETA' as float32 and 'Completed' as bool. The file is written under a temporary name and then renamed,
+    so readers never see a half-written file
+
+    Parameters:
+        df - dataframe to save
+        file - file name, its extension is replaced by the one of the format
+        fmt - 'csv', 'feather' or 'parquet'
+
+    Returns:
+        str - name of the file written
+    """
+    file = snapshot_name(file, fmt)
+    # Temporary name without any of the words files are looked up by
+    handle, temp = tempfile.mkstemp(prefix=".", suffix=".tmp", dir=os.path.dirname(os.path.abspath(file)))
+    os.close(handle)
+    try:
+        _write(df, temp, fmt)
+        os.replace(temp, file)
+    finally:
+        if os.path.exists(temp):
+            os.remove(temp)
+    return file
+
+
+def _write(df, file, fmt):
+    if fmt == "csv":
+        df.to_csv(file, index=False)
+        return
+
+    pyarrow = _import_pyarrow(fmt)
+    columns = {}
+    for col in df.columns:
+        values = df[col]
+        if col == "Day" or col.endswith(" Day"):
+            days = parse_days(values)
+            columns[col] = pyarrow.array(days, mask=days == NO_DAY).cast(pyarrow.date32())
+        elif col == "ETA":
+            columns[col] = pyarrow.array(pd.to_numeric(values, errors="coerce"), type=pyarrow.float32(), from_pandas=True)
+        elif col == "Completed":
+            columns[col] = pyarrow.array((values == True).to_numpy(), type=pyarrow.bool_())
+        elif values.dtype == object:
+            columns[col] = pyarrow.array(values.astype(str).to_numpy(), type=pyarrow.string())
+        else:
+            columns[col] = pyarrow.array(values.to_numpy(), from_pandas=True)
+    table = pyarrow.table(columns)
+
+    if fmt == "feather":
+        from pyarrow import feather
+        feather.write_feather(table, file)
+    else:
+        from pyarrow import parquet
+        parquet.write_table(table, file)
+
+
+def migrate(directory=".", fmt="feather", words=("Tasks", "Proposed", "Progress"), remove=False):
+    """
+    Converts the csv/txt snapshots of a directory into a binary format. Files are converted from oldest
+    to newest, so the newest snapshot is still the one picked up as 'latest'
+
+    Parameters:
+        directory - the folder the files are saved in
+        fmt - 'feather' or 'parquet'
+        words - only files that have one of these words in their name are converted
+        remove - delete the csv/txt file once it is converted
+
+    Returns:
+        list - (old file, new file) tuples
+    """
+    files = [i for i in os.scandir(directory) if i.is_file() and any(word in i.name for word in words)
+             and os.path.splitext(i.name)[1] in (".txt", ".csv") and snapshot_format(i.path) == "csv"]
+    converted = []
+    for entry in sorted(files, key=lambda i: i.stat().st_ctime):
+        new_file = write_snapshot(read_snapshot(entry.path), entry.path, fmt)
+        ArtifactIndex.for_directory(directory).add(new_file)
+        if remove:
+            os.remove(entry.path)
+        converted.append((entry.name, os.path.basename(new_file)))
+    return converted
+
+
+def _import_pyarrow(fmt):
+    """pyarrow is only needed for the binary formats, so it is only imported when one is used"""
+    try:
+        import pyarrow
+    except ImportError:
+        raise Exception(f"The '{fmt}' snapshot format needs pyarrow (pip install pyarrow)")
+    return pyarrow
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Convert csv/txt Tasks, Proposed and Progress files to a binary format")
+    parser.add_argument("command", choices=["migrate"])
+    parser.add_argument("directory", nargs="?", default=".")
+    parser.add_argument("--format", default="feather", choices=["feather", "parquet"])
+    parser.add_argument("--remove", action="store_true", help="delete the csv/txt files once converted")
+    args = parser.parse_args()
+    for old, new in migrate(args.directory, args.format, remove=args.remove):
+        print(f"Converted '{old}' to '{new}'")
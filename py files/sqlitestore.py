@@ -0,0 +1,276 @@
+import json
+import os
+import sqlite3
+import threading
+from time import time
+import numpy as np
+import pandas as pd
+from dates import NO_DAY, parse_days, format_days, to_day
+from taskstore import to_bool
+
+# Table the rows of every kind of saved file go to, and its columns: (dataframe column, table column, type)
+KINDS = {
+    "Tasks": ("tasks", [("Completed", "completed", "bool"), ("Task", "task", "text"), ("ETA", "eta", "real"),
+                        ("Day", "day", "day"), ("Depends On", "depends_on", "text")]),
+    "Proposed": ("plans", [("Day", "day", "day"), ("Task", "task", "text"), ("ETA", "eta", "real"),
+                           ("Completed", "completed", "bool"), ("Amount Left", "amount_left", "real")]),
+    "Progress": ("progress", [("Task", "task", "text"), ("ETA", "eta", "real"), ("Completed", "completed", "bool"),
+                              ("Day", "day", "day"), ("Proposed Day", "proposed_day", "day")]),
+}
+
+_SQL_TYPES = {"bool": "INTEGER", "text": "TEXT", "real": "REAL", "day": "INTEGER"}
+
+# Every table of 'KINDS' refers to its row of 'snapshots' through this column
+_ID = {"tasks": "snapshot_id", "plans": "plan_id", "progress": "snapshot_id"}
+
+_INDEXES = ["CREATE INDEX IF NOT EXISTS snapshots_kind ON snapshots (kind, id)",
+            "CREATE INDEX IF NOT EXISTS tasks_task_snapshot ON tasks (task, snapshot_id)",
+            "CREATE INDEX IF NOT EXISTS tasks_snapshot_day ON tasks (snapshot_id, day)",
+            "CREATE INDEX IF NOT EXISTS plans_plan_day ON plans (plan_id, day)",
+            "CREATE INDEX IF NOT EXISTS progress_snapshot ON progress (snapshot_id, position)",
+            "CREATE INDEX IF NOT EXISTS extras_snapshot ON extras (snapshot_id, position)"]
+
+
+class SqliteStore:
+    def __init__(self, file):
+        """
+        The saved Tasks, Proposed and Progress files of a project, kept as rows of one SQLite database instead of
+        a folder of csv files. Every saved file is a row of 'snapshots' (its name, kind and the columns it had),
+        and its rows go to the 'tasks', 'plans' or 'progress' table. Dates are stored as day numbers (see
+        'dates'), so date ranges are plain integer comparisons on an index. Columns those tables don't have (any
+        column a user adds to the to-do list) are kept in 'extras', one JSON list of values per row
+
+        Files are still found by the names DataHandler gives them ("Tasks 2020_9_10_8.txt"...), the latest
+        saved file of a kind is the one with the highest id
+
+        Parameters:
+            file - path of the database (created if it does not exist)
+        """
+        self.file = file
+        # DataHandler runs reads in threads (async loaders), one connection is shared under a lock
+        self.lock = threading.RLock()
+        self.connection = sqlite3.connect(file, check_same_thread=False)
+        with self.lock:
+            # Readers never wait on a writer, and commits only sync the write-ahead log
+            self.connection.execute("PRAGMA journal_mode=WAL")
+            self.connection.execute("PRAGMA synchronous=NORMAL")
+            self._create_tables()
+
+    def _create_tables(self):
+        with self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS snapshots (id INTEGER PRIMARY KEY, kind TEXT NOT NULL, "
+                                    "name TEXT NOT NULL UNIQUE, created REAL NOT NULL, columns TEXT NOT NULL)")
+            for table, columns in KINDS.values():
+                definition = ", ".join(f"{name} {_SQL_TYPES[kind]}" for _, name, kind in columns)
+                self.connection.execute(f"CREATE TABLE IF NOT EXISTS {table} ({_ID[table]} INTEGER NOT NULL, "
+                                        f"position INTEGER NOT NULL, {definition})")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS extras (snapshot_id INTEGER NOT NULL, "
+                                    "position INTEGER NOT NULL, data TEXT NOT NULL)")
+            for index in _INDEXES:
+                self.connection.execute(index)
+
+    def close(self):
+        with self.lock:
+            self.connection.close()
+
+    @staticmethod
+    def kind_of(name):
+        """Kind of a saved file from its name ('Proposed plan starting ...' -> 'Proposed'), None if not stored here"""
+        word = os.path.basename(str(name)).split(" ")[0]
+        return word if word in KINDS else None
+
+    def write(self, df, name):
+        """
+        Saves a dataframe under a file name, in one transaction (rows inserted with executemany). Saving a name
+        again replaces it, and makes it the latest of its kind
+
+        Columns other than the ones of KINDS are saved as JSON in 'extras' and come back as they were written
+        (numbers, strings, blank strings for missing values)
+
+        Returns:
+            str - the name
+        """
+        kind = self.kind_of(name)
+        if kind is None:
+            raise Exception(f"'{name}' is not a Tasks, Proposed or Progress file")
+        table, columns = KINDS[kind]
+        columns = [i for i in columns if i[0] in df.columns]
+        values = [_to_sql(df[column], kind_) for column, _, kind_ in columns]
+        extras = [i for i in df.columns if i not in {column for column, _, _ in KINDS[kind][1]}]
+        with self.lock, self.connection:
+            self._delete(name)
+            snapshot = self.connection.execute(
+                "INSERT INTO snapshots (kind, name, created, columns) VALUES (?, ?, ?, ?)",
+                (kind, name, time(), json.dumps([str(i) for i in df.columns]))).lastrowid
+            placeholders = ", ".join("?" * (len(columns) + 2))
+            names = ", ".join([_ID[table], "position"] + [i[1] for i in columns])
+            self.connection.executemany(f"INSERT INTO {table} ({names}) VALUES ({placeholders})",
+                                        zip([snapshot] * len(df), range(len(df)), *values))
+            if extras:
+                self.connection.executemany("INSERT INTO extras (snapshot_id, position, data) VALUES (?, ?, ?)",
+                                            zip([snapshot] * len(df), range(len(df)), _to_json(df[extras])))
+        return name
+
+    def read(self, name):
+        """
+        Reads a saved file back, in the same form as the csv files: dates as 'YYYY-MM-DD' strings and blank
+        strings where there is no value
+
+        Returns:
+            df - dataframe
+        """
+        with self.lock:
+            row = self.connection.execute("SELECT id, kind, columns FROM snapshots WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            raise Exception(f"'{name}' is not in the database '{self.file}'")
+        return self._read_snapshot(*row)
+
+    def _read_snapshot(self, snapshot, kind, saved_columns, where="", parameters=()):
+        """Rows of one snapshot (optionally filtered by 'where', an SQL condition) as a dataframe"""
+        table, columns = KINDS[kind]
+        saved_columns = json.loads(saved_columns)
+        columns = [i for i in columns if i[0] in saved_columns]
+        names = ", ".join(["position"] + [i[1] for i in columns])
+        with self.lock:
+            rows = self.connection.execute(f"SELECT {names} FROM {table} WHERE {_ID[table]} = ? {where} "
+                                           f"ORDER BY position", (snapshot, *parameters)).fetchall()
+        values = list(zip(*rows)) if rows else [()] * (len(columns) + 1)
+        df = pd.DataFrame({column: _from_sql(value, kind_) for (column, _, kind_), value in zip(columns, values[1:])},
+                          columns=[i[0] for i in columns])
+        extras = [i for i in saved_columns if i not in df.columns]
+        if extras:
+            with self.lock:
+                data = dict(self.connection.execute("SELECT position, data FROM extras WHERE snapshot_id = ?",
+                                                    (snapshot,)).fetchall())
+            rows = [json.loads(data[i]) if i in data else [None] * len(extras) for i in values[0]]
+            for column, value in zip(extras, zip(*rows) if rows else [()] * len(extras)):
+                df[column] = np.array(['' if i is None else i for i in value], dtype=object)
+        # Columns in the order they were saved in
+        return df[saved_columns]
+
+    def __contains__(self, name):
+        with self.lock:
+            return self.connection.execute("SELECT 1 FROM snapshots WHERE name = ?", (name,)).fetchone() is not None
+
+    def latest(self, kind):
+        """Name of the latest saved file of a kind ('Tasks', 'Proposed' or 'Progress'), None if there is none"""
+        with self.lock:
+            row = self.connection.execute("SELECT name FROM snapshots WHERE kind = ? ORDER BY id DESC LIMIT 1",
+                                          (kind,)).fetchone()
+        return None if row is None else row[0]
+
+    def names(self, kind=None):
+        """Names of the saved files (of one kind), oldest first"""
+        query, parameters = "SELECT name FROM snapshots ORDER BY id", ()
+        if kind is not None:
+            query, parameters = "SELECT name FROM snapshots WHERE kind = ? ORDER BY id", (kind,)
+        with self.lock:
+            return [i[0] for i in self.connection.execute(query, parameters)]
+
+    def latest_plan(self, first_day=None, last_day=None):
+        """
+        Rows of the latest Proposed plan, only the ones planned between 'first_day' and 'last_day' if they are
+        given (read through the (plan_id, day) index). The task-less first row is kept when it is in range
+        """
+        snapshot = self._latest_row("Proposed")
+        where, parameters = _day_range(first_day, last_day)
+        return self._read_snapshot(*snapshot, where, parameters)
+
+    def completed_between(self, first_day, last_day, name=None):
+        """
+        Tasks marked completed between two dates (both included) in a saved Tasks file, the latest one by default
+
+        Returns:
+            df - dataframe, same columns as the Tasks file
+        """
+        if name is None:
+            snapshot = self._latest_row("Tasks")
+        else:
+            with self.lock:
+                snapshot = self.connection.execute("SELECT id, kind, columns FROM snapshots WHERE name = ?",
+                                                   (name,)).fetchone()
+        where, parameters = _day_range(first_day, last_day)
+        return self._read_snapshot(*snapshot, "AND completed = 1 " + where, parameters)
+
+    def task_history(self, task):
+        """
+        Every saved version of one task (through the (task, snapshot) index)
+
+        Returns:
+            df - one row per Tasks file the task is in: the name of the file, and the values of the task in it
+        """
+        with self.lock:
+            rows = self.connection.execute(
+                "SELECT snapshots.name, tasks.completed, tasks.eta, tasks.day FROM tasks "
+                "JOIN snapshots ON snapshots.id = tasks.snapshot_id WHERE tasks.task = ? "
+                "ORDER BY tasks.snapshot_id, tasks.position", (task,)).fetchall()
+        names, completed, eta, day = list(zip(*rows)) if rows else ([], [], [], [])
+        return pd.DataFrame({"File": list(names), "Completed": _from_sql(completed, "bool"),
+                             "ETA": _from_sql(eta, "real"), "Day": _from_sql(day, "day")})
+
+    def remove(self, name):
+        with self.lock, self.connection:
+            self._delete(name)
+
+    def _latest_row(self, kind):
+        with self.lock:
+            row = self.connection.execute("SELECT id, kind, columns FROM snapshots WHERE kind = ? "
+                                          "ORDER BY id DESC LIMIT 1", (kind,)).fetchone()
+        if row is None:
+            raise Exception(f"There is no {kind} file in the database '{self.file}'")
+        return row
+
+    def _delete(self, name):
+        row = self.connection.execute("SELECT id, kind FROM snapshots WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return
+        table = KINDS[row[1]][0]
+        self.connection.execute(f"DELETE FROM {table} WHERE {_ID[table]} = ?", (row[0],))
+        self.connection.execute("DELETE FROM extras WHERE snapshot_id = ?", (row[0],))
+        self.connection.execute("DELETE FROM snapshots WHERE id = ?", (row[0],))
+
+
+def _day_range(first_day, last_day):
+    """SQL condition on the 'day' column for a range of dates (either end can be None)"""
+    where, parameters = "", []
+    if first_day is not None:
+        where += "AND day >= ? "
+        parameters.append(to_day(first_day))
+    if last_day is not None:
+        where += "AND day <= ? "
+        parameters.append(to_day(last_day))
+    return where, parameters
+
+
+def _to_sql(values, kind):
+    """A column of a dataframe as a list of values sqlite3 takes (None where there is no value)"""
+    if kind == "bool":
+        return to_bool(values).astype(int).tolist()
+    if kind == "real":
+        numbers = pd.to_numeric(values.replace('', np.nan), errors="coerce").to_numpy(dtype=float)
+        return [None if i != i else i for i in numbers.tolist()]
+    if kind == "day":
+        days = parse_days(values)
+        return [None if i == NO_DAY else i for i in days.tolist()]
+    return values.fillna('').astype(str).tolist()
+
+
+def _to_json(df):
+    """Rows of a dataframe as JSON lists (None where there is no value, numpy values as python ones)"""
+    values = df.astype(object).where(df.notna(), None).to_numpy().tolist()
+    return [json.dumps(row, default=lambda i: i.item() if hasattr(i, "item") else str(i)) for row in values]
+
+
+def _from_sql(values, kind):
+    """Values read from a table back into a column, as read from a csv file (blank strings for missing values)"""
+    if kind == "bool":
+        return np.array(values, dtype=bool)
+    if kind == "real":
+        numbers = np.array([np.nan if i is None else i for i in values], dtype=float)
+        if np.isnan(numbers).any():
+            numbers = numbers.astype(object)
+            numbers[pd.isna(numbers)] = ''
+        return numbers
+    if kind == "day":
+        return format_days(np.array([NO_DAY if i is None else i for i in values], dtype=np.int64))
+    return np.array(values, dtype=object)
@@ -0,0 +1,136 @@
+import numpy as np
+import pandas as pd
+from dates import parse_days, format_days, day_string
+
+# The columns a TaskStore keeps, in the order of the to-do list
+COLUMNS = ("Completed", "Task", "ETA", "Day")
+
+
+class TaskRecord:
+    __slots__ = ("task", "eta", "completed", "day")
+
+    def __init__(self, task, eta, completed, day):
+        """One task of a TaskStore ('day' is a 'YYYY-MM-DD' string, '' if the task has no day)"""
+        self.task = task
+        self.eta = eta
+        self.completed = completed
+        self.day = day
+
+    def __repr__(self):
+        return f"TaskRecord({self.task!r}, eta={self.eta}, completed={self.completed}, day={self.day!r})"
+
+
+class TaskStore:
+    __slots__ = ("names", "name_ids", "eta", "completed", "day")
+
+    def __init__(self, names, name_ids, eta, completed, day):
+        """
+        Task list kept as plain arrays instead of an object dataframe. Task names are stored once, in one
+        arrow string buffer (see '_name_array'), and every task refers to its name by an integer id, ETAs are
+        float32, completion a bool array and days int32 day numbers (NO_DAY for tasks without one). Dataframes
+        are only made at the edges (see 'from_frame' and 'to_frame')
+
+        Parameters:
+            names - string array of the distinct task names
+            name_ids - int32 array, position in 'names' of the name of every task
+            eta - float32 array of hours (NaN for a missing ETA)
+            completed - bool array
+            day - int32 array of days since 1970-01-01
+        """
+        self.names = names
+        self.name_ids = name_ids
+        self.eta = eta
+        self.completed = completed
+        self.day = day
+
+    @classmethod
+    def from_frame(cls, df, dayfirst=False):
+        """
+        Builds the store from a to-do list dataframe (only the Completed, Task, ETA and Day columns are kept),
+        ambiguous slash dates are read day first with 'dayfirst' (see 'dates.parse_days')
+        """
+        name_ids, names = pd.factorize(df["Task"].fillna(''), sort=False)
+        eta = pd.to_numeric(df["ETA"].replace('', np.nan), errors="coerce").to_numpy(dtype=np.float32)
+        return cls(_name_array(names), name_ids.astype(np.int32), eta,
+                   to_bool(df["Completed"]), parse_days(df["Day"], dayfirst=dayfirst))
+
+    def to_frame(self):
+        """
+        The task list as a dataframe, in the same form DataHandler reads it: dates as 'YYYY-MM-DD' strings, blank
+        strings where there is no day or ETA
+        """
+        eta = self.hours()
+        eta = eta.astype(object) if np.isnan(eta).any() else eta
+        if eta.dtype == object:
+            eta[pd.isna(eta)] = ''
+        return pd.DataFrame({"Completed": self.completed.copy(), "Task": self.task_names(), "ETA": eta,
+                             "Day": self.day_strings()}, columns=list(COLUMNS))
+
+    def __len__(self):
+        return len(self.name_ids)
+
+    def __getitem__(self, i):
+        return TaskRecord(str(self.names[self.name_ids[i]]), float(self.hours_of(i)), bool(self.completed[i]),
+                          day_string(self.day[i]))
+
+    def __iter__(self):
+        names, hours, days = self.task_names(), self.hours(), self.day_strings()
+        for i in range(len(self)):
+            yield TaskRecord(names[i], float(hours[i]), bool(self.completed[i]), days[i])
+
+    @property
+    def nbytes(self):
+        """Memory used by the store, names included"""
+        return int(self.name_ids.nbytes + self.eta.nbytes + self.completed.nbytes + self.day.nbytes
+                   + pd.Series(self.names).memory_usage(index=False, deep=True))
+
+    def memory_usage(self, deep=True):
+        """Same as 'nbytes' (lets the FileCache weigh stores like dataframes)"""
+        return pd.Series([self.nbytes])
+
+    def copy(self):
+        # The names are never modified, they can be shared
+        return TaskStore(self.names, self.name_ids.copy(), self.eta.copy(), self.completed.copy(), self.day.copy())
+
+    def select(self, rows):
+        """Store of some of the tasks ('rows' is a bool mask or an array of positions). Names are shared"""
+        return TaskStore(self.names, self.name_ids[rows], self.eta[rows], self.completed[rows], self.day[rows])
+
+    def incomplete(self):
+        return self.select(~self.completed)
+
+    def task_names(self):
+        """Object array of the name of every task"""
+        return np.asarray(self.names.take(self.name_ids), dtype=object)
+
+    def hours(self):
+        """ETAs as float64. float32 can't hold values such as 0.1 exactly, rounding gives back what was written"""
+        return self.eta.astype(np.float64).round(6)
+
+    def hours_of(self, i):
+        return round(float(self.eta[i]), 6)
+
+    def day_strings(self):
+        """'YYYY-MM-DD' string of every day ('' for tasks without a day)"""
+        return format_days(self.day)
+
+
+def _name_array(values):
+    """
+    Distinct task names as one string buffer with offsets (pyarrow backed), instead of one python object per
+    name. Falls back to an object array when pyarrow isn't installed
+    """
+    try:
+        return pd.array(np.asarray(values, dtype=object), dtype="string[pyarrow]")
+    except ImportError:
+        return pd.array(np.asarray(values, dtype=object), dtype=object)
+
+
+def to_bool(values):
+    """Completed column into a bool array, whether it was read as bools or as strings"""
+    if values.dtype == bool:
+        return values.to_numpy()
+    codes, uniques = pd.factorize(values)
+    truth = np.array([i is True or i is np.True_ or str(i).strip().lower() == "true" for i in uniques] + [False])
+    return truth[codes]
+
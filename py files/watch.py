@@ -0,0 +1,425 @@
+import ctypes
+import io
+import os
+import select
+import struct
+import sys
+import threading
+from time import perf_counter, sleep
+import numpy as np
+import pandas as pd
+from burndownseries import daily_remaining, completion_line_arrays, velocity_line
+from changeset import diff_tasks
+from dates import NO_DAY, parse_days, format_days, to_day
+from events import info
+from forecast import finish_dates
+from instrument import stage, count
+from taskstore import to_bool
+
+# inotify events that mean the to-do list was written (editors often write a new file and rename it over the old)
+_IN_MODIFY, _IN_CLOSE_WRITE, _IN_MOVED_TO, _IN_CREATE = 0x2, 0x8, 0x80, 0x100
+_EVENT = struct.Struct("iIII")
+
+
+class WatchSession:
+    def __init__(self, datahandler, chart, chart_file=None):
+        """
+        The to-do list, the latest plan and its progress kept in memory, updated from the rows of the to-do list
+        that changed instead of reading and diffing everything again (see 'refresh')
+
+        The to-do list is kept as arrays in file order (task name ids, ETAs, completion and day numbers), with
+        the bytes of the file it was parsed from. On a change, the part of the file that differs is found
+        (the longest common start and end of the old and new bytes), and only the rows in between are parsed
+
+        Parameters:
+            datahandler - instance of DataHandler class (the to-do list is 'chart.file')
+            chart - instance of BurndownChart class
+            chart_file - file the progress chart is written to by 'write_outputs' (no chart if None)
+        """
+        self.datahandler = datahandler
+        self.chart = chart
+        self.chart_file = chart_file
+        self.path = datahandler.full_path(chart.file)
+        # Latest plan and the bars of its burndown chart, they do not change while watching
+        proposed = datahandler.get_latest_file("Proposed")
+        if proposed is None:
+            raise Exception("There is no Proposed plan to watch the progress of, save a plan first")
+        self.proposed = datahandler.read_file(proposed)
+        self.start_date = self.proposed.loc[:, "Day"][0]
+        self.total = self.proposed["ETA"].sum()
+        self.xaxis, self.yaxis = daily_remaining(self.proposed)
+        self.velocity = chart.velocity_of(datahandler, self.start_date)
+        self.saved = datahandler.get_latest_tasks_file()
+        # Distinct task names, and whether each of them is in the plan
+        self.names = np.array([], dtype=object)
+        self.name_ids = {}
+        self.in_plan = np.array([], dtype=bool)
+        self.plan_tasks = set(self.proposed["Task"].astype(str).tolist()[1:])
+        self.version = 0
+        self.data = None
+        self._load(self._read())
+
+    def _read(self):
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def _load(self, data):
+        """Parses the whole file"""
+        self.header = data[:data.find(b"\n") + 1] if b"\n" in data else data + b"\n"
+        self.ids, self.eta, self.completed, self.day = self._parse(data)
+        self.data = data
+        self._update_line()
+
+    def _parse(self, data):
+        """Rows of csv bytes (with their header) as arrays, read the same way as DataHandler reads the to-do list"""
+        df = pd.read_csv(io.BytesIO(data)).fillna('')
+        count("rows_read", len(df))
+        names = df["Task"].astype(str).tolist()
+        new = [i for i in dict.fromkeys(names) if i not in self.name_ids]
+        if new:
+            self.name_ids.update(zip(new, range(len(self.names), len(self.names) + len(new))))
+            self.names = np.concatenate([self.names, np.array(new, dtype=object)])
+            self.in_plan = np.concatenate([self.in_plan, np.array([i in self.plan_tasks for i in new], dtype=bool)])
+        ids = np.array([self.name_ids[i] for i in names], dtype=np.int64)
+        eta = pd.to_numeric(df["ETA"].replace('', np.nan), errors="coerce").to_numpy(dtype=float)
+        return ids, eta, to_bool(df["Completed"]), parse_days(df["Day"], dayfirst=self.datahandler.dayfirst)
+
+    def refresh(self):
+        """
+        Reads the to-do list again and updates everything from the rows that changed
+
+        Returns:
+            Changeset - what changed since the last refresh (None if the file did not change)
+        """
+        start = perf_counter()
+        data = self._read()
+        if data == self.data:
+            return None
+        with stage("WatchSession.refresh"):
+            changeset, line_changed = self._apply(data)
+            if line_changed:
+                self._update_line()
+        self.version += 1
+        self.seconds = perf_counter() - start
+        return changeset
+
+    def _apply(self, data):
+        """
+        Updates the arrays from the rows of 'data' that differ from the last version read
+
+        Returns:
+            tuple - (Changeset of the rows that differ, whether the completion line can have changed)
+        """
+        old = self.data
+        region = _changed_region(old, data, len(self.header))
+        if region is not None:
+            begin, old_end, new_end = region
+            before = old.count(b"\n", len(self.header), begin)
+            after = old.count(b"\n", old_end) + (0 if old.endswith(b"\n") or old_end == len(old) else 1)
+            old_rows = len(self.ids) - before - after
+            if old_rows < 0 or _rows(old[begin:old_end]) != old_rows:
+                # Blank lines or line breaks inside quotes, rows and lines do not match
+                region = None
+        if region is None:
+            old_frame = self.to_frame()
+            self._load(data)
+            return diff_tasks(old_frame, self.to_frame()), False
+
+        rows = slice(before, before + old_rows)
+        old_frame = self.to_frame(rows)
+        old_ids = self.ids[rows]
+        # Only rows of completed tasks of the plan are on the completion line
+        line_changed = self._done(rows).any()
+        ids, eta, completed, day = self._parse(self.header + data[begin:new_end])
+        self.ids = np.concatenate([self.ids[:rows.start], ids, self.ids[rows.stop:]])
+        self.eta = np.concatenate([self.eta[:rows.start], eta, self.eta[rows.stop:]])
+        self.completed = np.concatenate([self.completed[:rows.start], completed, self.completed[rows.stop:]])
+        self.day = np.concatenate([self.day[:rows.start], day, self.day[rows.stop:]])
+        self.data = data
+        rows = slice(before, before + len(ids))
+        new_frame = self.to_frame(rows)
+
+        # Rows are matched by (name, occurrence) as in a diff of the whole lists. The rows after the change whose
+        # name now shows up a different number of times in it get new occurrences, so they are compared too
+        n_names = len(self.names)
+        moved = np.bincount(old_ids, minlength=n_names) != np.bincount(ids, minlength=n_names)
+        if moved.any():
+            after = rows.stop + np.flatnonzero(moved[self.ids[rows.stop:]])
+            old_frame = pd.concat([old_frame, self.to_frame(after)], ignore_index=True)
+            new_frame = pd.concat([new_frame, self.to_frame(after)], ignore_index=True)
+        changeset = diff_tasks(old_frame, new_frame)
+        # Occurrences were numbered from the first changed row, the rows above it are the same in both versions
+        _shift_occurrences(changeset, np.bincount(self.ids[:rows.start], minlength=n_names), self.name_ids)
+        return changeset, line_changed or self._done(rows).any()
+
+    def _done(self, rows=slice(None)):
+        """Mask of the rows that are completed tasks of the plan with a completion day"""
+        return self.completed[rows] & (self.day[rows] != NO_DAY) & self.in_plan[self.ids[rows]]
+
+    def to_frame(self, rows=slice(None)):
+        """The to-do list (or some of its rows), in file order, with the columns of the to-do list"""
+        eta = self.eta[rows].astype(object)
+        eta[np.isnan(self.eta[rows])] = ''
+        return pd.DataFrame({"Completed": self.completed[rows], "Task": self.names[self.ids[rows]],
+                             "ETA": eta if (eta == '').any() else self.eta[rows], "Day": format_days(self.day[rows])})
+
+    def todo_list(self):
+        """The to-do list as 'DataHandler.get_tasks_file' returns it (Completed Tasks first)"""
+        return self.to_frame(np.argsort(~self.completed, kind="stable"))
+
+    def _update_line(self):
+        """Completion line of the tasks of the plan that are completed, as in 'check_bdc_progress'"""
+        done = self._done()
+        self.line = completion_line_arrays(self.day[done], self.ids[done], self.names, self.eta[done],
+                                           self.total, self.start_date)
+        dates, left, offsets = self.line
+        self.velocity.update_line(offsets, left)
+
+    @property
+    def hours_left(self):
+        """Hours of the plan left after the last completion day"""
+        return float(self.line[1][-1]) if len(self.line[1]) else float(self.total)
+
+    def write_outputs(self):
+        """
+        Writes the Progress file (as 'check_plan_progress' does) and the progress chart of the current state,
+        and sends the forecast to the sink of the DataHandler
+
+        Returns:
+            list - names of the files written
+        """
+        progress, start_date = self.chart.plan_progress(self.proposed, self.todo_list(), self.saved)
+        written = [self.datahandler.write_file(progress, f"Progress on Project started on {start_date}.txt")]
+        dates, left, offsets = self.line
+        messages = [f"{self.hours_left:g} hours left"]
+        if self.velocity.velocity is not None and len(offsets):
+            forecast = finish_dates(left[-1], self.velocity, to_day(self.start_date) + int(offsets[-1]))
+            messages.append(f"Velocity: {self.velocity.velocity:.2f} hours/day. Projected finish: "
+                            + ", ".join(f"{date or 'never'} ({key})" for key, date in forecast.items()))
+        if self.chart_file is not None:
+            velocity = velocity_line(offsets, left, len(self.xaxis)) if len(offsets) > 1 else ([], [])
+            with stage("BurndownChart.render"):
+                self.chart.get_renderer().draw(self.xaxis, self.yaxis, (offsets, left), velocity,
+                                            f"Progress from {self.xaxis[0]} to {self.xaxis[-1]}")
+                written.append(self.chart.get_renderer().save(self.chart_file))
+        self.datahandler.emit([info(i) for i in messages])
+        return written
+
+
+class Watcher:
+    def __init__(self, session, debounce=0.2, interval=0.5, inotify=None):
+        """
+        Keeps a WatchSession up to date with the to-do list: waits for the file to change (inotify on Linux,
+        checking its modification time every 'interval' seconds elsewhere), waits for the saves to stop for
+        'debounce' seconds, then refreshes the session and sends what changed to the sink of its DataHandler.
+        Output files are written by a background thread, only for the latest version, so a slow chart never
+        delays the next refresh
+
+        Parameters:
+            session - WatchSession
+            debounce - seconds without a new save before the file is read
+            interval - seconds between two checks of the file when polling
+            inotify - force inotify on (True) or off (False). On by default where it is available
+        """
+        self.session = session
+        self.debounce = debounce
+        self.interval = interval
+        self.stopping = threading.Event()
+        self.inotify = _Inotify(session.path) if inotify is not False and _Inotify.available() else None
+        if inotify and self.inotify is None:
+            raise Exception("inotify is not available on this system")
+        self.writer = _LatestOnly(session.write_outputs, self._write_failed)
+        self.updates = 0
+
+    def run(self, timeout=None):
+        """Watches until 'stop' is called (or for 'timeout' seconds)"""
+        end = None if timeout is None else perf_counter() + timeout
+        emit = self.session.datahandler.emit
+        emit([info(f"Watching '{self.session.path}' ({'inotify' if self.inotify else 'polling'})")])
+        stamp = _stamp(self.session.path)
+        try:
+            while not self.stopping.is_set() and (end is None or perf_counter() < end):
+                if not self._wait(stamp, self.interval):
+                    continue
+                # Waiting for the burst of saves to end
+                stamp = _stamp(self.session.path)
+                while self._wait(stamp, self.debounce):
+                    stamp = _stamp(self.session.path)
+                try:
+                    changeset = self.session.refresh()
+                except Exception as error:
+                    # Half-written file, the next save triggers a new read
+                    emit([info(f"Could not read '{self.session.path}': {error}")])
+                    continue
+                if changeset is None:
+                    continue
+                self.updates += 1
+                events = changeset.events() if not changeset.empty else []
+                emit(events + [info(f"Updated in {self.session.seconds * 1000:.0f} ms, "
+                                    f"{self.session.hours_left:g} hours left")])
+                self.writer.submit()
+        finally:
+            self.writer.close()
+            if self.inotify is not None:
+                self.inotify.close()
+
+    def start(self):
+        """Runs the watcher in a background thread"""
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.stopping.set()
+        if getattr(self, "thread", None) is not None:
+            self.thread.join()
+
+    def _write_failed(self, error):
+        self.session.datahandler.emit([info(f"Could not write the outputs: {error}")])
+
+    def _wait(self, stamp, timeout):
+        """Waits up to 'timeout' seconds for the file to change, returns whether it changed"""
+        if self.inotify is not None:
+            return self.inotify.wait(timeout)
+        deadline = perf_counter() + timeout
+        while perf_counter() < deadline and not self.stopping.is_set():
+            if _stamp(self.session.path) != stamp:
+                return True
+            sleep(min(0.05, timeout))
+        return _stamp(self.session.path) != stamp
+
+
+class _LatestOnly:
+    def __init__(self, function, on_error):
+        """
+        Runs 'function' in a background thread, once per 'submit', skipping the calls that piled up meanwhile.
+        Exceptions it raises go to 'on_error', the thread keeps running
+        """
+        self.function = function
+        self.on_error = on_error
+        self.pending = threading.Event()
+        self.closing = False
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self):
+        self.pending.set()
+
+    def close(self):
+        self.closing = True
+        self.pending.set()
+        self.thread.join()
+
+    def _run(self):
+        while True:
+            self.pending.wait()
+            self.pending.clear()
+            if self.closing:
+                return
+            try:
+                self.function()
+            except Exception as error:
+                self.on_error(error)
+
+
+class _Inotify:
+    def __init__(self, path):
+        """inotify watch of the folder of a file, through libc (no extra package), only reporting that file"""
+        self.name = os.fsencode(os.path.basename(path))
+        libc = ctypes.CDLL(None, use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+        if libc.inotify_add_watch(self.fd, os.fsencode(os.path.dirname(os.path.abspath(path))), mask) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), "inotify_add_watch failed")
+
+    @staticmethod
+    def available():
+        return sys.platform.startswith("linux") and hasattr(ctypes.CDLL(None), "inotify_init1")
+
+    def wait(self, timeout):
+        """Waits up to 'timeout' seconds for an event on the file, returns whether there was one"""
+        deadline = perf_counter() + timeout
+        while True:
+            # Events on other files of the folder (e.g. the temporary file an editor saves to) keep waiting
+            left = deadline - perf_counter()
+            if left <= 0 or not select.select([self.fd], [], [], left)[0]:
+                return False
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                continue
+            position = 0
+            while position + _EVENT.size <= len(data):
+                _, _, _, length = _EVENT.unpack_from(data, position)
+                if data[position + _EVENT.size:position + _EVENT.size + length].rstrip(b"\0") == self.name:
+                    return True
+                position += _EVENT.size + length
+
+    def close(self):
+        os.close(self.fd)
+
+
+def _stamp(path):
+    try:
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+    except FileNotFoundError:
+        return None
+
+
+def _changed_region(old, new, header):
+    """
+    Byte ranges of the whole lines that differ between two versions of a file: everything before 'begin' and
+    after 'old_end' (in 'old') / 'new_end' (in 'new') is the same in both
+
+    Returns:
+        tuple - (begin, old_end, new_end), or None if the header changed
+    """
+    n = min(len(old), len(new))
+    prefix = _common_length(old, new, n)
+    # The common end can't overlap the common start
+    suffix = _common_length(old, new, n - prefix, from_end=True)
+    if prefix < header:
+        return None
+    # Moving both ends to line boundaries
+    begin = old.rfind(b"\n", 0, prefix) + 1
+    old_end = len(old) - suffix
+    if old_end > 0 and old[old_end - 1:old_end] != b"\n":
+        found = old.find(b"\n", old_end)
+        old_end = len(old) if found < 0 else found + 1
+    new_end = old_end + len(new) - len(old)
+    return begin, old_end, new_end
+
+
+def _common_length(old, new, n, from_end=False, block=1 << 20):
+    """
+    Length of the common start (or end) of two byte strings, up to 'n'. Compared a block at a time (a memcmp),
+    so a change near the start of a big file is found without comparing the rest of it
+    """
+    for start in range(0, n, block):
+        stop = min(start + block, n)
+        if from_end:
+            a, b = old[len(old) - stop:len(old) - start], new[len(new) - stop:len(new) - start]
+        else:
+            a, b = old[start:stop], new[start:stop]
+        if a != b:
+            differ = np.frombuffer(a, dtype=np.uint8) != np.frombuffer(b, dtype=np.uint8)
+            return start + int(np.argmax(differ[::-1] if from_end else differ))
+    return n
+
+
+def _shift_occurrences(changeset, offsets, name_ids):
+    """Adds to the Occurrence of every row of a Changeset the offset of its task name ('offsets' by name id)"""
+    for name in ("added", "removed", "completed", "uncompleted", "changes"):
+        frame = getattr(changeset, name)
+        if len(frame):
+            ids = np.array([name_ids[i] for i in frame["Task"].astype(str).tolist()], dtype=np.int64)
+            frame["Occurrence"] = frame["Occurrence"].to_numpy(dtype=np.int64) + offsets[ids]
+
+
+def _rows(data):
+    """Number of lines in some bytes of a file (the last one may not end with a line break)"""
+    return data.count(b"\n") + (1 if data and not data.endswith(b"\n") else 0)
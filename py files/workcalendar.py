@@ -0,0 +1,118 @@
+import numpy as np
+from dates import to_day, parse_days, format_days
+
+# Weekday of day number 0 (1970-01-01 was a Thursday, Monday is 0)
+_EPOCH_WEEKDAY = 3
+
+_WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+
+class WorkCalendar:
+    def __init__(self, hours=8, weekmask="1111111", holidays=(), overrides=None):
+        """
+        Hours of work available on every date. The planner packs tasks into the days that have hours (the
+        workdays), each day up to its own hours, instead of giving every calendar day the same 'max_hours'
+
+        Parameters:
+            hours - hours of every workday, or 7 values (Monday to Sunday) for part-time days
+            weekmask - days of the week that are worked, as for np.busday_offset ("1111100" or "Mon Tue Wed Thu Fri")
+            holidays - dates that are not worked
+            overrides - {date: hours} for single dates (a half day, a Saturday worked...), wins over everything else
+        """
+        week_hours = np.broadcast_to(np.asarray(hours, dtype=float), (7,)).copy()
+        week_hours[~_weekmask(weekmask)] = 0.0
+        self.week_hours = week_hours
+        self.holidays = np.unique(parse_days(list(holidays))).astype(np.int64)
+        overrides = {} if overrides is None else overrides
+        days = parse_days(list(overrides))
+        order = np.argsort(days, kind="stable")
+        self.override_days = days[order].astype(np.int64)
+        self.override_hours = np.asarray(list(overrides.values()), dtype=float)[order]
+
+    @property
+    def min_hours(self):
+        """Fewest hours of any workday"""
+        hours = np.concatenate([self.week_hours, self.override_hours])
+        hours = hours[hours > 0]
+        if len(hours) == 0:
+            raise Exception("The calendar has no workdays")
+        return float(hours.min())
+
+    def days_needed(self, hours):
+        """Number of workdays that is always enough to plan tasks of these hours, whatever the packer"""
+        hours = np.asarray(hours, dtype=float)
+        return len(hours) + int(np.ceil(np.nansum(hours) / self.min_hours)) + 1
+
+    def capacity(self, start, n_days):
+        """
+        Hours available on 'n_days' consecutive dates from 'start'
+
+        Returns:
+            array - float hours, one value per date (0 on days off)
+        """
+        days = np.arange(to_day(start), to_day(start) + n_days, dtype=np.int64)
+        hours = self.week_hours[(days + _EPOCH_WEEKDAY) % 7]
+        hours[np.isin(days, self.holidays)] = 0.0
+        if len(self.override_days):
+            position = np.minimum(np.searchsorted(self.override_days, days), len(self.override_days) - 1)
+            found = self.override_days[position] == days
+            hours[found] = self.override_hours[position[found]]
+        return hours
+
+    def workdays(self, start, n):
+        """
+        The first 'n' workdays on or after 'start'
+
+        Returns:
+            tuple - 2 arrays (int32 day numbers, hours of each of those days)
+        """
+        start = to_day(start)
+        if n <= 0:
+            return np.array([], dtype=np.int32), np.array([])
+        # Dates up to the n-th regular workday (weekmask and holidays). Overridden dates only add workdays,
+        # except the ones set to 0 hours, which count as holidays
+        mask = self.week_hours > 0
+        if mask.any():
+            holidays = np.union1d(self.holidays, self.override_days[self.override_hours <= 0])
+            end = np.busday_offset(np.datetime64(int(start), 'D'), n - 1, roll="forward", weekmask=mask,
+                                   holidays=holidays.astype("datetime64[D]"))
+            span = int(end.astype(np.int64)) - start + 1
+        elif not len(self.override_days) or self.override_days[-1] < start:
+            raise Exception("The calendar has no workdays")
+        else:
+            span = int(self.override_days[-1]) - start + 1
+        hours = self.capacity(start, span)
+        days = np.flatnonzero(hours > 0)
+        if len(days) < n:
+            raise Exception(f"The calendar only has {len(days)} workdays from {format_days([start])[0]}")
+        days = days[:n]
+        return (days + start).astype(np.int32), hours[days]
+
+    def workday_index(self, start, days):
+        """Number of workdays from 'start' up to (not including) each of 'days' (position of a workday in 'workdays')"""
+        start = to_day(start)
+        days = np.asarray(days, dtype=np.int64)
+        if len(days) == 0:
+            return np.array([], dtype=np.int64)
+        worked = np.concatenate([[0], np.cumsum(self.capacity(start, max(int(days.max()) - start + 1, 0)) > 0)])
+        return worked[np.clip(days - start, 0, len(worked) - 1)]
+
+    def to_dict(self):
+        """The calendar as plain values (saved with the day structure of a plan)"""
+        return {"hours": self.week_hours.tolist(),
+                "holidays": format_days(self.holidays).tolist(),
+                "overrides": dict(zip(format_days(self.override_days).tolist(), self.override_hours.tolist()))}
+
+    @classmethod
+    def from_dict(cls, values):
+        return cls(values["hours"], holidays=values["holidays"], overrides=values["overrides"])
+
+
+def _weekmask(weekmask):
+    """np.busday_offset-style weekmask into 7 bools"""
+    if isinstance(weekmask, str):
+        if set(weekmask) <= {"0", "1"} and len(weekmask) == 7:
+            return np.array([i == "1" for i in weekmask])
+        worked = weekmask.split()
+        return np.array([day in worked for day in _WEEKDAYS])
+    return np.asarray(weekmask, dtype=bool)
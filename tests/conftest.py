@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The modules live in "py files" (not a package), they are imported the way the scripts there import each other
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "py files"))
@@ -0,0 +1,61 @@
+import numpy as np
+import pandas as pd
+import pytest
+from changeset import diff_tasks
+from taskstore import TaskStore
+
+
+def todo_list(rows):
+    return pd.DataFrame(rows, columns=["Completed", "Task", "ETA", "Day"])
+
+
+OLD = todo_list([[False, "write", 2.0, ""], [True, "read", 1.0, "2020-09-10"], [False, "test", 3.0, ""],
+                 [False, "test", 4.0, ""], [False, "deploy", 1.0, ""]])
+NEW = todo_list([[True, "write", 2.0, "2020-09-11"], [False, "read", 1.0, ""], [False, "test", 3.0, ""],
+                 [False, "test", 5.0, ""], [False, "review", 2.0, ""]])
+
+
+def keys(df):
+    return sorted(zip(df["Task"].tolist(), df["Occurrence"].astype(int).tolist()))
+
+
+@pytest.mark.parametrize("as_store", [False, True])
+def test_diff_finds_every_kind_of_change(as_store):
+    old, new = (TaskStore.from_frame(OLD), TaskStore.from_frame(NEW)) if as_store else (OLD, NEW)
+    changeset = diff_tasks(old, new)
+    assert keys(changeset.added) == [("review", 0)]
+    assert keys(changeset.removed) == [("deploy", 0)]
+    assert keys(changeset.completed) == [("write", 0)]
+    assert keys(changeset.uncompleted) == [("read", 0)]
+    changes = {(task, int(occurrence), column): (float(old_value) if column == "ETA" else old_value,
+                                                  float(new_value) if column == "ETA" else new_value)
+               for task, occurrence, column, old_value, new_value in changeset.changes.itertuples(index=False)}
+    # The second 'test' is matched with the second one, only its ETA changed
+    assert changes[("test", 1, "ETA")] == (4.0, 5.0)
+    assert ("test", 0, "ETA") not in changes
+    assert changes[("write", 0, "Day")] == ("", "2020-09-11")
+    assert len(changeset) == 4 + len(changeset.changes)
+
+
+def test_no_changes():
+    changeset = diff_tasks(OLD, OLD.copy())
+    assert len(changeset) == 0
+
+
+def test_dataframes_and_stores_give_the_same_changes():
+    rng = np.random.default_rng(0)
+    names = np.array([f"task {i}" for i in range(30)], dtype=object)
+    for _ in range(30):
+        n = int(rng.integers(1, 60))
+        old = todo_list({"Completed": rng.random(n) < 0.3, "Task": rng.choice(names, n),
+                         "ETA": rng.choice([1.0, 2.0, 4.0], n), "Day": ""})
+        new = old.sample(frac=0.9, random_state=int(rng.integers(1000))).sort_index()
+        new = pd.concat([new, old.sample(3, replace=True, random_state=1)], ignore_index=True)
+        new.loc[rng.random(len(new)) < 0.2, "Completed"] = True
+        new.loc[rng.random(len(new)) < 0.2, "ETA"] = 3.0
+        frames = diff_tasks(old, new)
+        stores = diff_tasks(TaskStore.from_frame(old), TaskStore.from_frame(new))
+        for side in ["added", "removed", "completed", "uncompleted"]:
+            assert keys(getattr(frames, side)) == keys(getattr(stores, side)), side
+        assert sorted(zip(frames.changes["Task"], frames.changes["Occurrence"].astype(int), frames.changes["Column"])) \
+            == sorted(zip(stores.changes["Task"], stores.changes["Occurrence"].astype(int), stores.changes["Column"]))
@@ -0,0 +1,34 @@
+import os
+import subprocess
+import sys
+import pandas as pd
+
+SOURCE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "py files")
+
+
+def run_python(code, cwd, **env):
+    """Runs 'code' in a new interpreter that imports from the package folder"""
+    return subprocess.run([sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True, check=True,
+                          env={**os.environ, "PYTHONPATH": SOURCE, **env})
+
+
+def test_importing_instrument_does_not_turn_metrics_on(tmp_path):
+    out = run_python("import instrument; print(instrument.recorder() is None)", tmp_path,
+                     BURNDOWN_METRICS=str(tmp_path / "metrics.prom"))
+    assert out.stdout.strip() == "True"
+    assert not (tmp_path / "metrics.prom").exists()
+
+
+def test_metrics_environment_variable_instruments_a_command_line_run(tmp_path):
+    pd.DataFrame({"Completed": False, "Task": ["a", "b"], "ETA": [4.0, 6.0], "Day": ""}).to_csv(
+        tmp_path / "todo.csv", index=False)
+    run_python("import cli; cli.main(['--directory', '.', 'plan', '2020-09-10'])", tmp_path,
+               BURNDOWN_METRICS="metrics.prom")
+    assert "rows_read" in (tmp_path / "metrics.prom").read_text()
+
+
+def test_importing_the_command_line_loads_no_heavy_module(tmp_path):
+    code = ("import sys, cli; cli.build_parser().parse_args(['diff']); "
+            "print(' '.join(sorted(m for m in sys.modules if m.split('.')[0] in "
+            "('matplotlib', 'pandas', 'numpy', 'pyarrow', 'datahandler', 'burndownchart', 'plotting'))))")
+    assert run_python(code, tmp_path).stdout.strip() == ""
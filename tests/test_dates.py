@@ -0,0 +1,37 @@
+from dates import parse_days, format_days
+
+
+def days(values, **kwargs):
+    return list(format_days(parse_days(values, **kwargs)))
+
+
+def test_slash_dates_are_month_first_whatever_they_are_read_with():
+    assert days(["9/11/2020"]) == ["2020-09-11"]
+    assert days(["9/11/2020", "9/25/2020"]) == ["2020-09-11", "2020-09-25"]
+
+
+def test_dates_that_can_only_be_read_one_way_are_read_that_way():
+    assert days(["9/11/2020", "25/9/2020"]) == ["2020-09-11", "2020-09-25"]
+    assert days(["9/11/2020", "9/25/2020"], dayfirst=True) == ["2020-11-09", "2020-09-25"]
+    assert days(["31/31/2020"]) == [""]
+
+
+def test_day_first_only_changes_ambiguous_dates():
+    assert days(["9/11/2020"], dayfirst=True) == ["2020-11-09"]
+    assert days(["25/9/2020"], dayfirst=True) == days(["25/9/2020"]) == ["2020-09-25"]
+
+
+def test_day_first_is_set_per_datahandler(tmp_path):
+    import pandas as pd
+    from datahandler import DataHandler
+    from events import NullSink
+    from filecache import FileCache
+    pd.DataFrame({"Completed": [True, True], "Task": ["a", "b"], "ETA": [1.0, 2.0],
+                  "Day": ["9/11/2020", "25/9/2020"]}).to_csv(tmp_path / "todo.csv", index=False)
+    # Both read through the same cache, each gets the dates it asked for
+    cache = FileCache()
+    month_first = DataHandler("todo.csv", cache=cache, directory=str(tmp_path), sink=NullSink())
+    day_first = DataHandler("todo.csv", cache=cache, directory=str(tmp_path), sink=NullSink(), dayfirst=True)
+    assert month_first.get_tasks_file()["Day"].tolist() == ["2020-09-11", "2020-09-25"]
+    assert day_first.get_tasks_file()["Day"].tolist() == ["2020-11-09", "2020-09-25"]
+    assert day_first.get_tasks_store().day_strings().tolist() == ["2020-11-09", "2020-09-25"]
@@ -0,0 +1,173 @@
+import numpy as np
+import pandas as pd
+import pytest
+from burndownchart import BurndownChart
+from daypacker import pack, iter_days
+
+
+def baseline_day_blocks(df, max_hours):
+    """BurndownChart._day_blocks as it was before the day packer, kept as the reference"""
+    lst2 = []
+    freeze = 0
+    a = df["ETA"]
+    for i in range(len(a) + 1):
+        df2 = df["ETA"].iloc
+        if df2[freeze:i].sum() > max_hours:
+            increment = 0
+            if df2[freeze:i + increment + 1].drop(i - 1).sum() < max_hours:
+                while df2[freeze:i + increment + 1].drop(i - 1).sum() < max_hours:
+                    check = df2[freeze:i + increment + 1].drop(i - 1)
+                    increment += 1
+                    if check.equals(df2[freeze:i + increment + 1].drop(i - 1)):
+                        break
+                temp = df.iloc[i - 1]
+                df.iloc[i - 1:i + increment + 1] = df.iloc[i - 1:i + increment + 1].shift(-1).fillna(temp)
+                lst2.append(df.iloc[freeze:i + increment - 1])
+                freeze = i + increment - 1
+            else:
+                lst2.append(df.iloc[freeze:i - 1])
+                freeze = i - 1
+    lst2.append(df.iloc[freeze:])
+    return lst2
+
+
+def baseline_days(eta, max_hours):
+    """Days of the reference as lists of task positions"""
+    df = pd.DataFrame({"ETA": np.asarray(eta, dtype=float), "Position": np.arange(len(eta), dtype=float)})
+    return [day["Position"].astype(int).tolist() for day in baseline_day_blocks(df, max_hours)]
+
+
+def packed_days(result):
+    return [result.order[result.bounds[k]:result.bounds[k + 1]].tolist() for k in range(result.days)]
+
+
+def same_days(expected, got):
+    # The reference ends with an empty day when the last task closed a day, the packer does not keep it
+    expected = [day for day in expected if day] or [[]]
+    got = [day for day in got if day] or [[]]
+    return expected == got
+
+
+EDGE_CASES = [
+    ([], 8),
+    ([3.0], 8),
+    ([12.0], 8),
+    ([12.0, 1.0, 2.0], 8),
+    ([1.0, 12.0, 1.0], 8),
+    ([4.0, 4.0, 4.0, 4.0], 8),
+    ([8.0, 8.0, 8.0], 8),
+    ([2.0, 6.0, 8.0, 0.5, 7.5], 8),
+    ([5.0, 4.0, 3.0, 1.0, 2.0], 6),
+    ([0.25] * 40, 6),
+    ([7.0, 7.0, 1.0, 1.0, 9.0, 0.5], 6),
+]
+
+
+@pytest.mark.parametrize("eta, max_hours", EDGE_CASES)
+def test_greedy_matches_baseline_edge_cases(eta, max_hours):
+    assert same_days(baseline_days(eta, max_hours), packed_days(pack(np.array(eta, dtype=float), max_hours, "greedy")))
+
+
+def test_greedy_matches_baseline_random():
+    rng = np.random.default_rng(0)
+    for _ in range(300):
+        n = int(rng.integers(0, 40))
+        max_hours = float(rng.choice([4, 6, 8]))
+        eta = rng.choice([0.25, 0.5, 1, 1.5, 2, 3, 4, 5, 6, 8, 10], n).astype(float)
+        assert same_days(baseline_days(eta, max_hours), packed_days(pack(eta, max_hours, "greedy"))), (eta, max_hours)
+
+
+def test_day_blocks_matches_baseline():
+    rng = np.random.default_rng(1)
+    chart = BurndownChart(6)
+    for _ in range(100):
+        eta = rng.choice([0.5, 1, 2, 3, 4, 6, 7], int(rng.integers(1, 30))).astype(float)
+        df = pd.DataFrame({"Task": [f"Task {i}" for i in range(len(eta))], "ETA": eta})
+        assert same_days(baseline_days(eta, 6), packed_days(chart._day_blocks(df)))
+
+
+def test_streamed_chunks_match_baseline():
+    rng = np.random.default_rng(2)
+    for _ in range(50):
+        eta = rng.choice([0.5, 1, 2, 3, 5, 9], int(rng.integers(1, 60))).astype(float)
+        chunks = np.array_split(eta, int(rng.integers(1, 6)))
+        days = [positions.tolist() for positions, hours in iter_days(chunks, 8, "greedy")]
+        assert same_days(baseline_days(eta, 8), days), eta
+
+
+def random_backlogs(seed, n_backlogs=100):
+    rng = np.random.default_rng(seed)
+    for _ in range(n_backlogs):
+        yield rng.choice([0.5, 1, 2, 3, 4, 6, 7, 8, 10], int(rng.integers(1, 50))).astype(float)
+
+
+def day_hours(result):
+    return [result.hours[result.bounds[k]:result.bounds[k + 1]].sum() for k in range(result.days)]
+
+
+@pytest.mark.parametrize("strategy", ["greedy", "next_fit", "first_fit_decreasing", "best_fit"])
+def test_packers_plan_every_task_once(strategy):
+    for eta in random_backlogs(3):
+        result = pack(eta, 8, strategy)
+        assert sorted(result.order.tolist()) == list(range(len(eta)))
+        assert np.array_equal(result.hours, eta[result.order])
+
+
+# "greedy" is left out: like the original _day_blocks, it can leave a task that does not fit at the end of a day
+@pytest.mark.parametrize("strategy", ["next_fit", "first_fit_decreasing", "best_fit"])
+def test_days_hold_at_most_the_max_hours(strategy):
+    for eta in random_backlogs(3):
+        result = pack(eta, 8, strategy)
+        # A day only goes over the max hours when it holds a single task longer than a day
+        for k, hours in enumerate(day_hours(result)):
+            assert hours <= 8 or result.counts[k] == 1
+
+
+def test_next_fit_keeps_the_order_of_the_list():
+    for eta in random_backlogs(4):
+        assert pack(eta, 8, "next_fit").order.tolist() == list(range(len(eta)))
+    assert packed_days(pack([5.0, 4.0, 3.0, 1.0], 8, "next_fit")) == [[0], [1, 2, 3]]
+
+
+@pytest.mark.parametrize("strategy", ["first_fit_decreasing", "best_fit"])
+def test_bin_packers_never_use_more_days_than_next_fit(strategy):
+    for eta in random_backlogs(5):
+        assert pack(eta, 8, strategy).days <= pack(eta, 8, "next_fit").days
+    # 5 + 3 and 4 + 4 fill two days where the list order needs three
+    assert pack([5.0, 4.0, 4.0, 3.0], 8, strategy).days == 2
+
+
+def test_spill_fills_every_day_but_the_last():
+    for eta in random_backlogs(6):
+        result = pack(eta, 8, "spill")
+        hours = day_hours(result)
+        assert np.allclose(hours[:-1], 8)
+        assert 0 < hours[-1] <= 8
+        # The pieces of every task add up to its ETA, in the order of the list
+        assert np.allclose(np.bincount(result.order, weights=result.hours, minlength=len(eta)), eta)
+        assert np.all(np.diff(result.order) >= 0)
+
+
+@pytest.mark.parametrize("strategy", ["next_fit", "first_fit_decreasing", "best_fit", "spill"])
+def test_packers_follow_the_hours_of_every_day(strategy):
+    # Hours of the workdays of a calendar (see 'WorkCalendar.workdays'), the last one repeats
+    capacity = np.array([4.0, 8.0, 8.0, 6.0])
+    for eta in random_backlogs(7, 50):
+        result = pack(eta, capacity, strategy)
+        for k, hours in enumerate(day_hours(result)):
+            assert hours <= capacity[min(k, len(capacity) - 1)] + 1e-9 or result.counts[k] == 1
+
+
+@pytest.mark.parametrize("strategy", ["next_fit", "spill"])
+def test_streamed_packers_match_pack(strategy):
+    for eta in random_backlogs(8, 30):
+        expected = pack(eta, 8, strategy)
+        chunks = np.array_split(eta, 3)
+        days = list(iter_days(chunks, 8, strategy))
+        assert [positions.tolist() for positions, _ in days] == packed_days(expected)
+        assert np.allclose(np.concatenate([hours for _, hours in days]), expected.hours)
+
+
+def test_unknown_strategy():
+    with pytest.raises(Exception, match="Unknown strategy"):
+        pack([1.0], 8, "random")
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+from burndownchart import BurndownChart
+from dependencies import DependencyGraph, has_dependencies
+
+
+def todo_list(tasks, eta, depends, completed=None):
+    completed = [False] * len(tasks) if completed is None else completed
+    return pd.DataFrame({"Completed": completed, "Task": tasks, "ETA": [float(i) for i in eta],
+                         "Day": [""] * len(tasks), "Depends On": depends})
+
+
+def names(graph, order):
+    return [graph.names[i] for i in order]
+
+
+def test_tasks_come_after_what_they_depend_on():
+    df = todo_list(["deploy", "write", "test", "docs"], [1, 4, 2, 1], ["test", "", "write", ""])
+    graph = DependencyGraph.from_tasks(df)
+    assert graph.edges == 2
+    # To-do list order wherever the dependencies allow it
+    assert names(graph, graph.topological_order()) == ["write", "test", "deploy", "docs"]
+
+
+def test_several_dependencies_and_repeated_names():
+    df = todo_list(["release", "fix", "fix", "review"], [1, 2, 3, 1], ["fix; review", "", "", "fix"])
+    graph = DependencyGraph.from_tasks(df)
+    order = names(graph, graph.topological_order())
+    # Both 'fix' rows come before 'review' and 'release'
+    assert order == ["fix", "fix", "review", "release"]
+
+
+def test_dependencies_on_completed_tasks_are_met():
+    df = todo_list(["done", "next"], [1, 1], ["", "done"], completed=[True, False])
+    graph = DependencyGraph.from_tasks(df)
+    assert len(graph) == 1 and graph.edges == 0
+
+
+def test_unknown_dependency_raises():
+    with pytest.raises(Exception, match="'b' depends on 'nothing'"):
+        DependencyGraph.from_tasks(todo_list(["a", "b"], [1, 1], ["", "nothing"]))
+
+
+@pytest.mark.parametrize("method", ["topological_order", "schedule"])
+def test_cycle_is_named(method):
+    df = todo_list(["a", "b", "c", "d"], [1, 1, 1, 1], ["", "d", "b", "c"])
+    graph = DependencyGraph.from_tasks(df)
+    with pytest.raises(Exception, match="cycle") as error:
+        graph.topological_order() if method == "topological_order" else graph.schedule(df["ETA"], 8)
+    assert "'a'" not in str(error.value)
+    assert all(f"'{i}'" in str(error.value) for i in "bcd")
+
+
+def test_schedule_keeps_dependencies_in_earlier_days_or_earlier_the_same_day():
+    df = todo_list(["c", "a", "b", "d"], [3, 5, 4, 2], ["b", "", "a", ""])
+    graph = DependencyGraph.from_tasks(df)
+    packed = graph.schedule(df["ETA"], 8)
+    position = {graph.names[i]: k for k, i in enumerate(packed.order)}
+    assert position["a"] < position["b"] < position["c"]
+    hours = np.bincount(np.repeat(np.arange(packed.days), packed.counts), weights=packed.hours)
+    assert (hours <= 8).all()
+    assert np.isclose(hours.sum(), 14.0)
+
+
+def test_plan_follows_the_dependencies():
+    df = todo_list(["deploy", "write", "test"], [2, 6, 3], ["test", "", "write"])
+    assert has_dependencies(df)
+    plan = BurndownChart(8).see_new_plan(df, "2020-09-10").reset_index().iloc[1:]
+    assert plan["Task"].tolist() == ["write", "test", "deploy"]
+    assert not has_dependencies(df.drop(columns="Depends On"))
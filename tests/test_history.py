@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+from history import TaskHistory
+
+
+def completed_first(df):
+    """Task lists are saved with the Completed Tasks first"""
+    return pd.concat([df[df["Completed"] == True], df[df["Completed"] == False]]).reset_index(drop=True)
+
+
+def versions(seed, n_versions):
+    """Successive versions of a task list, each one an edit of the one before"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({"Completed": False, "Task": [f"task {i % 7}" for i in range(12)],
+                       "ETA": rng.choice([1.0, 2.0, 3.0], 12), "Day": ""})
+    for _ in range(n_versions):
+        df = df.copy()
+        done = rng.random(len(df)) < 0.2
+        df.loc[done, "Completed"] = True
+        df.loc[done, "Day"] = "2020-09-1" + str(int(rng.integers(0, 10)))
+        df.loc[rng.random(len(df)) < 0.2, "ETA"] = float(rng.choice([0.5, 4.0, 5.0]))
+        df = df[rng.random(len(df)) > 0.1]
+        added = pd.DataFrame({"Completed": False, "Task": [f"task {int(i)}" for i in rng.integers(0, 9, 2)],
+                              "ETA": 2.0, "Day": ""})
+        df = completed_first(pd.concat([df, added], ignore_index=True))
+        yield df
+
+
+def same_list(expected, got):
+    assert got["Task"].tolist() == expected["Task"].tolist()
+    assert got["Completed"].astype(bool).tolist() == expected["Completed"].tolist()
+    assert got["ETA"].astype(float).tolist() == expected["ETA"].tolist()
+    assert got["Day"].astype(str).tolist() == expected["Day"].tolist()
+
+
+def test_every_save_is_rebuilt_from_its_checkpoint_and_changesets(tmp_path):
+    history = TaskHistory(str(tmp_path), checkpoint_interval=4)
+    saved = list(versions(0, 11))
+    for df in saved:
+        history.record(df)
+    for seq, df in enumerate(saved):
+        same_list(df, history._rebuild(seq))
+    # A new TaskHistory on the same folder finds the saves through the index file
+    reopened = TaskHistory(str(tmp_path), checkpoint_interval=4)
+    assert len(reopened) == len(saved)
+    same_list(saved[-1], reopened.latest())
+
+
+def test_as_of_gives_the_version_saved_last_before_a_time(tmp_path):
+    history = TaskHistory(str(tmp_path), checkpoint_interval=2)
+    saved = list(versions(1, 5))
+    for df in saved:
+        history.record(df)
+    times = [entry[1] for entry in history.index]
+    for time, df in zip(times, saved):
+        same_list(df, history.as_of(time))
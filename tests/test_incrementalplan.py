@@ -0,0 +1,66 @@
+import pandas as pd
+import pytest
+from burndownchart import BurndownChart
+from changeset import diff_tasks
+from incrementalplan import IncrementalPlan
+
+
+def todo_list(tasks, eta):
+    return pd.DataFrame({"Completed": [False] * len(tasks), "Task": tasks, "ETA": [float(i) for i in eta],
+                         "Day": [""] * len(tasks)})
+
+
+def planned_hours(plan):
+    """(task, hours) of every planned row, the task-less first one left out"""
+    rows = plan.reset_index().iloc[1:]
+    return list(zip(rows["Task"], rows["ETA"].astype(float)))
+
+
+@pytest.mark.parametrize("strategy", ["spill", "greedy"])
+def test_completing_a_split_task_removes_all_its_pieces(strategy, tmp_path):
+    df = todo_list(["b", "a", "x", "x"], [2, 9, 5, 2])
+    plan = IncrementalPlan.from_plan(BurndownChart(8).see_new_plan(df, "2020-09-10", strategy=strategy), df, 8)
+    # Saved and loaded back, as 'update_plan' does
+    plan = IncrementalPlan.load(plan.save(tmp_path / "packed.json"))
+    new = df.copy()
+    new.loc[1, "Completed"] = True
+    plan.apply(diff_tasks(df, new))
+    assert "a" not in [task for task, _ in planned_hours(plan.to_frame())]
+    assert plan.total == 9
+
+
+def test_repeated_names_keep_the_hours_of_their_rows():
+    df = todo_list(["x", "b", "x"], [5, 2, 2])
+    plan = IncrementalPlan.from_plan(BurndownChart(8).see_new_plan(df, "2020-09-10"), df, 8)
+    assert sum(plan.tasks[("x", 0)].values()) == 5
+    assert sum(plan.tasks[("x", 1)].values()) == 2
+    # Removing the second 'x' only takes its 2 hours out
+    plan.apply(diff_tasks(df, df.iloc[:2]))
+    assert plan.total == 7
+    assert sorted(planned_hours(plan.to_frame())) == [("b", 2.0), ("x", 5.0)]
+
+
+def test_update_plan_saves_the_proposed_plan(tmp_path):
+    from datahandler import DataHandler
+    from events import NullSink
+    from filecache import FileCache
+    df = todo_list(["b", "a", "x", "y"], [2, 5, 5, 3])
+    df.to_csv(tmp_path / "todo.csv", index=False)
+    datahandler = DataHandler("todo.csv", cache=FileCache(), directory=str(tmp_path), sink=NullSink())
+    chart = BurndownChart(8)
+    chart.file = "todo.csv"
+    datahandler.save_data(datahandler.get_tasks_file())
+    chart.save_new_plan(datahandler, chart.see_new_plan(datahandler.get_tasks_file(), "2020-09-10"), confirm=True)
+    new = df.copy()
+    new.loc[1, "Completed"] = True
+    new.loc[3, "ETA"] = 1.0
+    plan = chart.update_plan(datahandler, diff_tasks(df, new))
+
+    proposed = datahandler.get_latest_file("Proposed")
+    saved = DataHandler("todo.csv", cache=FileCache(), directory=str(tmp_path), sink=NullSink()).read_file(proposed)
+    assert saved["Task"].fillna("").tolist() == plan.reset_index()["Task"].tolist()
+    assert saved["ETA"].astype(float).tolist() == plan["ETA"].tolist()
+    assert saved["Amount Left"].astype(float).tolist()[0] == 8.0
+    # The packed days were saved with it, a second update starts from this plan
+    assert IncrementalPlan.load(datahandler.full_path(IncrementalPlan.file_of(proposed))).total == 8.0
+    assert not [i for i in tmp_path.iterdir() if i.name.endswith(".tmp")]
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+from burndownseries import progress_status
+
+
+def test_status_compares_with_the_plan_on_the_last_completion_day():
+    planned = np.array([20.0, 15.0, 10.0, 5.0])
+    assert progress_status(planned, np.array([18.0, 12.0]), np.array([0, 1])) == "Ahead"
+    assert progress_status(planned, np.array([18.0, 10.0]), np.array([0, 2])) == "On time"
+    assert progress_status(planned, np.array([18.0, 6.0]), np.array([0, 3])) == "Behind"
+    assert progress_status(planned, np.array([]), np.array([], dtype=np.int64)) is None
+
+
+def test_status_of_completions_outside_the_plan():
+    planned = np.array([20.0, 15.0, 10.0, 5.0])
+    # Completed before the plan started: compared with the first day, not wrapped around to the last one
+    assert progress_status(planned, np.array([19.0]), np.array([-2])) == "Ahead"
+    # Completed after the plan ended: compared with the last day
+    assert progress_status(planned, np.array([6.0]), np.array([10])) == "Behind"
+
+
+def progress_messages(tmp_path, completed, chart=None):
+    """Messages of 'check_bdc_progress' on a plan of ten 4 hour tasks (8 hour days from 2020-09-10), with the
+    first tasks of the list completed on the given days"""
+    from burndownchart import BurndownChart
+    from datahandler import DataHandler
+    from events import ListSink
+    from filecache import FileCache
+    todo = pd.DataFrame({"Completed": False, "Task": [f"task {i}" for i in range(10)], "ETA": 4.0, "Day": ""})
+    todo.to_csv(tmp_path / "todo.csv", index=False)
+    sink = ListSink()
+    datahandler = DataHandler("todo.csv", cache=FileCache(), directory=str(tmp_path), sink=sink)
+    chart = BurndownChart(8) if chart is None else chart
+    chart.file = "todo.csv"
+    datahandler.save_data(datahandler.get_tasks_file())
+    chart.save_new_plan(datahandler, chart.see_new_plan(datahandler.get_tasks_file(), "2020-09-10"), confirm=True)
+    todo.loc[:len(completed) - 1, "Completed"] = True
+    todo.loc[:len(completed) - 1, "Day"] = completed
+    todo.to_csv(tmp_path / "todo.csv", index=False)
+    chart.check_plan_progress(datahandler)
+    sink.events.clear()
+    chart.check_bdc_progress(datahandler, file=str(tmp_path / "chart.png"))
+    return [event["message"] for event in sink.events]
+
+
+def test_check_bdc_progress_status_is_judged_on_the_last_completion_day(tmp_path):
+    # 24 hours done by 2020-09-14, when the plan has 8 hours left: behind. The status used to be judged on the
+    # plan day numbered like the completion days (the second day, 32 hours left) and said ahead
+    messages = progress_messages(tmp_path, ["2020-09-10"] + ["2020-09-14"] * 6)
+    assert "We're behind! We have to work faster!" in messages
+    # 24 hours done by the second day, when the plan has 32 hours left: ahead
+    messages = progress_messages(tmp_path, ["2020-09-10"] + ["2020-09-11"] * 6)
+    assert "Good job!! You're ahead of schedule!" in messages
+
+
+def test_projects_checked_with_one_chart_keep_their_own_velocity(tmp_path):
+    from burndownchart import BurndownChart
+    # The slow project ends on the same point of the line as the fast one: one estimator for both took the
+    # slow line for the fast one and kept its velocity
+    fast, slow = ["2020-09-10", "2020-09-11", "2020-09-12"], ["2020-09-10", "2020-09-10", "2020-09-12"]
+    for name in ("fast", "slow", "alone"):
+        (tmp_path / name).mkdir()
+    chart = BurndownChart(8)
+    progress_messages(tmp_path / "fast", fast, chart)
+    shared = [i for i in progress_messages(tmp_path / "slow", slow, chart) if i.startswith("Velocity")]
+    alone = [i for i in progress_messages(tmp_path / "alone", slow) if i.startswith("Velocity")]
+    assert shared == alone
+    assert len(chart.velocities) == 2
+
+
+def test_plan_banner_goes_to_the_sink(tmp_path, monkeypatch):
+    import burndownchart
+    from burndownchart import BurndownChart
+    from events import ListSink
+
+    class Handler:
+        def __init__(self):
+            self.sink = ListSink()
+
+        def emit(self, events):
+            self.sink.emit(events)
+
+    monkeypatch.setattr(burndownchart, "show_plan", lambda xaxis, yaxis: None)
+    todo = pd.DataFrame({"Completed": False, "Task": ["a", "b", "c"], "ETA": [4.0, 4.0, 4.0], "Day": ""})
+    chart = BurndownChart(8)
+    handler = Handler()
+    chart.create_burndown_chart(chart.see_new_plan(todo, "2020-09-10"), datahandler=handler)
+    messages = [event["message"] for event in handler.sink.events]
+    assert messages[0] == "Below is the Proposed Plan from 2020-09-10 to 2020-09-11, Average Velocity: 8 hours per day"
+    assert messages[1].startswith("Plan Proposed on ")
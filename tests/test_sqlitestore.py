@@ -0,0 +1,64 @@
+import pandas as pd
+import pytest
+from sqlitestore import SqliteStore
+
+TASKS = pd.DataFrame({"Completed": [True, False, False], "Task": ["write", "test", "deploy"],
+                      "ETA": [2.0, 3.5, ""], "Day": ["2020-09-10", "", ""],
+                      "Depends On": ["", "write", "test"], "Owner": ["ann", "", "bo"], "Points": [3, 5, 8]})
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SqliteStore(str(tmp_path / "project.db"))
+    yield store
+    store.close()
+
+
+def test_tasks_round_trip_with_extra_columns(store):
+    store.write(TASKS, "Tasks 2020_9_10_8.txt")
+    back = store.read("Tasks 2020_9_10_8.txt")
+    assert list(back.columns) == list(TASKS.columns)
+    for column in TASKS.columns:
+        assert back[column].tolist() == TASKS[column].tolist(), column
+
+
+def test_latest_file_and_replacing_a_name(store):
+    store.write(TASKS, "Tasks 1.txt")
+    store.write(TASKS.iloc[:1], "Tasks 2.txt")
+    assert store.latest("Tasks") == "Tasks 2.txt"
+    store.write(TASKS.iloc[:2], "Tasks 1.txt")
+    assert store.latest("Tasks") == "Tasks 1.txt"
+    assert store.read("Tasks 1.txt")["Owner"].tolist() == ["ann", ""]
+    store.remove("Tasks 1.txt")
+    assert "Tasks 1.txt" not in store
+    assert store.connection.execute("SELECT COUNT(*) FROM extras").fetchone()[0] == 1
+
+
+def test_date_range_queries_keep_the_extra_columns(store):
+    store.write(TASKS, "Tasks 1.txt")
+    done = store.completed_between("2020-09-01", "2020-09-30")
+    assert done["Task"].tolist() == ["write"]
+    assert done["Owner"].tolist() == ["ann"]
+    plan = pd.DataFrame({"Day": ["2020-09-10", "2020-09-10", "2020-09-11"], "Task": ["", "test", "deploy"],
+                         "ETA": [0.0, 3.5, 1.0], "Completed": [True, False, False], "Amount Left": [4.5, 1.0, 0.0]})
+    store.write(plan, "Proposed plan 1.txt")
+    assert store.latest_plan("2020-09-11")["Task"].tolist() == ["deploy"]
+
+
+def test_only_tasks_proposed_and_progress_files_are_stored(store):
+    with pytest.raises(Exception, match="not a Tasks, Proposed or Progress file"):
+        store.write(TASKS, "Burndown.png")
+
+
+def test_datahandler_saves_through_the_database(tmp_path):
+    from datahandler import DataHandler
+    from events import NullSink
+    from filecache import FileCache
+    TASKS.to_csv(tmp_path / "todo.csv", index=False)
+    datahandler = DataHandler("todo.csv", cache=FileCache(), directory=str(tmp_path), sink=NullSink(),
+                              database="project.db")
+    datahandler.save_data(datahandler.get_tasks_file())
+    saved = datahandler.get_latest_tasks_file()
+    assert saved["Owner"].tolist() == ["ann", "", "bo"]
+    assert [int(i) for i in saved["Points"]] == [3, 5, 8]
+    assert not [i for i in tmp_path.iterdir() if i.name.startswith("Tasks")]
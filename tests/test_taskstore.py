@@ -0,0 +1,21 @@
+import numpy as np
+from benchmark import generate_backlog
+from taskstore import TaskStore
+
+
+def test_round_trip_keeps_the_task_list():
+    df = generate_backlog(1000, seed=3)
+    back = TaskStore.from_frame(df).to_frame()
+    assert back["Task"].tolist() == df["Task"].tolist()
+    assert back["Completed"].tolist() == df["Completed"].tolist()
+    assert np.allclose(back["ETA"].astype(float), df["ETA"].astype(float))
+    assert back["Day"].tolist() == df["Day"].tolist()
+
+
+def test_store_is_smaller_than_the_dataframe_with_unique_names():
+    # Almost every name is unique, so interning the names alone saves nothing
+    df = generate_backlog(100_000)
+    store = TaskStore.from_frame(df)
+    assert store.nbytes < df.memory_usage(deep=True).sum()
+    # Against object columns (how the to-do list is passed around once blanks are filled in)
+    assert store.nbytes * 5 < df.astype(object).memory_usage(deep=True).sum()
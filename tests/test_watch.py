@@ -0,0 +1,117 @@
+import pandas as pd
+import pytest
+from burndownchart import BurndownChart
+from datahandler import DataHandler
+from events import NullSink
+from filecache import FileCache
+from watch import WatchSession
+
+
+def write_todo_list(path, rows):
+    pd.DataFrame(rows, columns=["Completed", "Task", "ETA", "Day"]).to_csv(path, index=False)
+
+
+@pytest.fixture
+def project(tmp_path):
+    rows = [[False, f"task {i}", 1 + i % 5, ""] for i in range(40)]
+    rows[3] = [True, "task 3", 4, "9/10/2020"]
+    write_todo_list(tmp_path / "todo.csv", rows)
+    datahandler = DataHandler("todo.csv", cache=FileCache(), directory=str(tmp_path), sink=NullSink())
+    chart = BurndownChart(8)
+    chart.file = "todo.csv"
+    datahandler.save_data(datahandler.get_tasks_file())
+    chart.save_new_plan(datahandler, chart.see_new_plan(datahandler.get_tasks_file(), "2020-09-10"), confirm=True)
+    return tmp_path, rows
+
+
+def full_read(directory):
+    """The to-do list read from scratch, as a new DataHandler reads it"""
+    return DataHandler("todo.csv", cache=FileCache(), directory=str(directory), sink=NullSink()).get_tasks_file()
+
+
+def assert_same_list(session, directory):
+    watched, read = session.todo_list(), full_read(directory)
+    assert watched["Task"].tolist() == read["Task"].tolist()
+    assert watched["Completed"].tolist() == read["Completed"].tolist()
+    assert watched["ETA"].astype(float).tolist() == read["ETA"].astype(float).tolist()
+    assert watched["Day"].tolist() == read["Day"].tolist()
+
+
+def test_watch_state_matches_a_full_read_after_edits(project):
+    directory, rows = project
+    datahandler = DataHandler("todo.csv", cache=FileCache(), directory=str(directory), sink=NullSink())
+    chart = BurndownChart(8)
+    chart.file = "todo.csv"
+    session = WatchSession(datahandler, chart)
+    assert_same_list(session, directory)
+
+    # Only the edited row is parsed again: a date that reads either way on its own must not change order
+    rows[10] = [True, "task 10", 1, "9/11/2020"]
+    write_todo_list(directory / "todo.csv", rows)
+    assert session.refresh() is not None
+    assert_same_list(session, directory)
+
+    rows[20] = [True, "task 20", 1, "9/25/2020"]
+    rows[30][2] = 7
+    rows.append([False, "new task", 2, ""])
+    write_todo_list(directory / "todo.csv", rows)
+    session.refresh()
+    assert_same_list(session, directory)
+    assert session.todo_list().set_index("Task").loc["task 10", "Day"] == "2020-09-11"
+
+    del rows[5]
+    write_todo_list(directory / "todo.csv", rows)
+    session.refresh()
+    assert_same_list(session, directory)
+
+
+def events_of(changeset):
+    return sorted((e["kind"], e["task"], int(e["occurrence"]), str(e.get("column")), str(e.get("old")),
+                   str(e.get("new"))) for e in changeset.events())
+
+
+def test_refresh_numbers_repeated_names_as_a_full_diff(project):
+    from changeset import diff_tasks
+    directory, rows = project
+    for i in (2, 12, 22, 32):
+        rows[i] = [False, "review", 1, ""]
+    write_todo_list(directory / "todo.csv", rows)
+    datahandler = DataHandler("todo.csv", cache=FileCache(), directory=str(directory), sink=NullSink())
+    chart = BurndownChart(8)
+    chart.file = "todo.csv"
+    session = WatchSession(datahandler, chart)
+
+    edits = [lambda: rows[22].__setitem__(2, 3),                   # the third 'review' re-estimated
+             lambda: rows.insert(15, [False, "review", 2, ""]),    # an extra 'review' between the second and third
+             lambda: rows.__delitem__(2)]                          # the first one removed
+    for edit in edits:
+        before = session.to_frame()
+        edit()
+        write_todo_list(directory / "todo.csv", rows)
+        changeset = session.refresh()
+        assert events_of(changeset) == events_of(diff_tasks(before, session.to_frame()))
+        assert_same_list(session, directory)
+
+
+def test_output_errors_go_to_the_sink(project):
+    from time import sleep
+    from events import ListSink
+    from watch import Watcher
+    directory, _ = project
+    sink = ListSink()
+    datahandler = DataHandler("todo.csv", cache=FileCache(), directory=str(directory), sink=sink)
+    chart = BurndownChart(8)
+    chart.file = "todo.csv"
+    session = WatchSession(datahandler, chart)
+
+    def fail():
+        raise Exception("disk full")
+    session.write_outputs = fail
+    watcher = Watcher(session, inotify=False)
+    watcher.writer.submit()
+    for _ in range(100):
+        if sink.events:
+            break
+        sleep(0.01)
+    watcher.writer.close()
+    assert [event["message"] for event in sink.events] == ["Could not write the outputs: disk full"]
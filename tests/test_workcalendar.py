@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+from burndownchart import BurndownChart
+from dates import format_days, parse_days, to_day
+from workcalendar import WorkCalendar
+
+# 2020-09-10 is a Thursday
+START = "2020-09-10"
+
+
+def workdays(calendar, n, start=START):
+    days, hours = calendar.workdays(start, n)
+    return list(format_days(days)), hours.tolist()
+
+
+def test_weekends_and_holidays_are_skipped():
+    calendar = WorkCalendar(8, "1111100", holidays=["2020-09-14"])
+    assert workdays(calendar, 3) == (["2020-09-10", "2020-09-11", "2020-09-15"], [8.0, 8.0, 8.0])
+
+
+def test_overrides_win_over_the_week():
+    calendar = WorkCalendar(8, "Mon Tue Wed Thu Fri", overrides={"2020-09-12": 4, "2020-09-11": 0})
+    # The Saturday is worked half a day, the Friday is off
+    assert workdays(calendar, 3) == (["2020-09-10", "2020-09-12", "2020-09-14"], [8.0, 4.0, 8.0])
+
+
+def test_part_time_week():
+    calendar = WorkCalendar([8, 8, 4, 8, 6, 0, 0])
+    assert workdays(calendar, 4) == (["2020-09-10", "2020-09-11", "2020-09-14", "2020-09-15"],
+                                     [8.0, 6.0, 8.0, 8.0])
+    assert calendar.min_hours == 4.0
+
+
+def test_workday_index_is_the_position_in_workdays():
+    calendar = WorkCalendar(8, "1111100", holidays=["2020-09-15"])
+    days, _ = calendar.workdays(START, 6)
+    assert calendar.workday_index(START, days).tolist() == list(range(6))
+    # A day off counts as the next workday
+    assert calendar.workday_index(START, [to_day("2020-09-12")]).tolist() == [2]
+
+
+def test_round_trip_through_a_dict():
+    calendar = WorkCalendar([8, 8, 8, 8, 6, 0, 0], holidays=["2020-09-14"], overrides={"2020-09-12": 3})
+    back = WorkCalendar.from_dict(calendar.to_dict())
+    assert workdays(back, 10) == workdays(calendar, 10)
+
+
+def test_calendar_without_workdays_raises():
+    with pytest.raises(Exception, match="no workdays"):
+        WorkCalendar(8, "0000000").workdays(START, 1)
+
+
+def test_plan_only_uses_workdays_up_to_their_hours():
+    calendar = WorkCalendar(8, "1111100", overrides={"2020-09-11": 4})
+    df = pd.DataFrame({"Completed": [False] * 5, "Task": list("abcde"), "ETA": [3.0, 4.0, 2.0, 5.0, 6.0],
+                       "Day": [""] * 5})
+    # 'spill' (greedy may overfill the last day, as the original planner did)
+    plan = BurndownChart(8, calendar=calendar).see_new_plan(df, START, strategy="spill").reset_index().iloc[1:]
+    allowed, capacity = calendar.workdays(START, 10)
+    capacity = dict(zip(allowed.tolist(), capacity.tolist()))
+    hours = plan.groupby(parse_days(plan["Day"]))["ETA"].sum()
+    assert set(hours.index) <= set(capacity)
+    assert all(hours[day] <= capacity[day] for day in hours.index)
+    assert np.isclose(hours.sum(), 20.0)